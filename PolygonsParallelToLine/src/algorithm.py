@@ -7,15 +7,20 @@ from qgis.core import (
     QgsFields,
     QgsProcessing,
     QgsProcessingAlgorithm,
+    QgsProcessingFeatureSourceDefinition,
     QgsProcessingParameterBoolean,
+    QgsProcessingParameterDefinition,
     QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterEnum,
     QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterFileDestination,
     QgsProcessingParameterNumber,
 )
 from qgis.PyQt.QtCore import QMetaType  # type: ignore[import-not-found]
 
 from .const import COLUMN_NAME
-from .pptl import Params, ParallelToReference
+from .index_cache import CacheLocation
+from .pptl import GEOMETRY_BACKENDS, TRAVERSAL_ORDERS, Params, ParallelToReference
 
 if TYPE_CHECKING:
     from qgis.core import (
@@ -33,6 +38,16 @@ class Algorithm(QgsProcessingAlgorithm):
     NO_MULTI = "NO_MULTI"
     DISTANCE = "DISTANCE"
     ANGLE = "ANGLE"
+    WORKERS = "WORKERS"
+    LOW_MEMORY = "LOW_MEMORY"
+    PROFILE = "PROFILE"
+    PROFILE_REPORT = "PROFILE_REPORT"
+    INCREMENTAL_CACHE = "INCREMENTAL_CACHE"
+    CACHE_REFERENCE_INDEX = "CACHE_REFERENCE_INDEX"
+    TRAVERSAL_ORDER = "TRAVERSAL_ORDER"
+    TILE_SIZE = "TILE_SIZE"
+    NEAREST_CANDIDATES = "NEAREST_CANDIDATES"
+    GEOMETRY_BACKEND = "GEOMETRY_BACKEND"
 
     def createInstance(self) -> Algorithm:  # noqa: N802
         return self.__class__()
@@ -99,6 +114,89 @@ class Algorithm(QgsProcessingAlgorithm):
                 defaultValue=89.9,
             )
         )
+        self._add_advanced_parameter(
+            QgsProcessingParameterNumber(
+                self.WORKERS,
+                "Number of worker processes (1 = run in the current process)",
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=1,
+                defaultValue=1,
+            )
+        )
+        self._add_advanced_parameter(
+            QgsProcessingParameterBoolean(
+                self.LOW_MEMORY,
+                "Low memory mode (keep only reference bounding boxes in memory, fetch geometries on demand)",
+                defaultValue=False,
+            )
+        )
+        self._add_advanced_parameter(
+            QgsProcessingParameterBoolean(
+                self.PROFILE, "Report per-stage timings and feature counts in the log", defaultValue=False
+            )
+        )
+        report = QgsProcessingParameterFileDestination(
+            self.PROFILE_REPORT, "Timing report (JSON)", fileFilter="JSON files (*.json)", optional=True
+        )
+        report.setCreateByDefault(False)
+        self._add_advanced_parameter(report)
+        cache = QgsProcessingParameterFileDestination(
+            self.INCREMENTAL_CACHE,
+            "Incremental cache (reuse the results of unchanged targets from the previous run)",
+            fileFilter="SQLite files (*.sqlite)",
+            optional=True,
+        )
+        cache.setCreateByDefault(False)
+        self._add_advanced_parameter(cache)
+        self._add_advanced_parameter(
+            QgsProcessingParameterBoolean(
+                self.CACHE_REFERENCE_INDEX,
+                "Cache the reference index on disk (file-based reference layers only)",
+                defaultValue=False,
+            )
+        )
+        self._add_advanced_parameter(
+            QgsProcessingParameterEnum(
+                self.TRAVERSAL_ORDER,
+                "Target processing order",
+                options=[
+                    "Provider order",
+                    "Spatial (Hilbert curve), output in provider order",
+                    "Spatial (Hilbert curve), output in spatial order",
+                ],
+                defaultValue=0,
+            )
+        )
+        self._add_advanced_parameter(
+            QgsProcessingParameterNumber(
+                self.TILE_SIZE,
+                "Tile size for tiled processing (in target layer units, 0 = off)",
+                type=QgsProcessingParameterNumber.Double,
+                minValue=0.0,
+                defaultValue=0.0,
+            )
+        )
+        self._add_advanced_parameter(
+            QgsProcessingParameterNumber(
+                self.NEAREST_CANDIDATES,
+                "Reference candidates ranked by distance to the whole target (1 = nearest to the target centre)",
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=1,
+                defaultValue=1,
+            )
+        )
+        self._add_advanced_parameter(
+            QgsProcessingParameterEnum(
+                self.GEOMETRY_BACKEND,
+                "Geometry backend",
+                options=["QGIS (QgsGeometry)", "Shapely 2 (needs the shapely package)"],
+                defaultValue=0,
+            )
+        )
+
+    def _add_advanced_parameter(self, parameter: QgsProcessingParameterDefinition) -> None:
+        parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(parameter)
 
     def _create_output_fields(self, source_layer: QgsProcessingFeatureSource) -> QgsFields:
         fields = source_layer.fields()
@@ -106,6 +204,27 @@ class Algorithm(QgsProcessingAlgorithm):
             fields.append(QgsField(COLUMN_NAME, QMetaType.Type.Bool))
         return fields
 
+    def _reference_index_cache(
+        self,
+        parameters: dict[str, Any],
+        context: QgsProcessingContext,
+        reference_layer: QgsProcessingFeatureSource,
+        feedback: QgsProcessingFeedback,
+    ) -> CacheLocation | None:
+        if not self.parameterAsBool(parameters, self.CACHE_REFERENCE_INDEX, context):
+            return None
+        value = parameters.get(self.REFERENCE_LAYER)
+        layer = self.parameterAsVectorLayer(parameters, self.REFERENCE_LAYER, context)
+        location = None
+        # A selection is not part of the layer source, so it could not invalidate the cache.
+        if layer is not None and not (
+            isinstance(value, QgsProcessingFeatureSourceDefinition) and value.selectedFeaturesOnly
+        ):
+            location = CacheLocation.for_layer(layer, reference_layer.featureCount())
+        if location is None:
+            feedback.pushInfo("The reference index is only cached for whole layers read from a file; not caching")
+        return location
+
     def processAlgorithm(  # noqa: N802
         self, parameters: dict[str, Any], context: QgsProcessingContext, feedback: QgsProcessingFeedback
     ) -> dict[str, str]:
@@ -119,8 +238,9 @@ class Algorithm(QgsProcessingAlgorithm):
             geometryType=target_layer.wkbType(),
             crs=target_layer.sourceCrs(),
         )
+        reference_layer = self.parameterAsSource(parameters, self.REFERENCE_LAYER, context)
         params = Params(
-            reference_layer=self.parameterAsSource(parameters, self.REFERENCE_LAYER, context),
+            reference_layer=reference_layer,
             target_layer=target_layer,
             by_longest=self.parameterAsBool(parameters, self.LONGEST, context),
             no_multi=self.parameterAsBool(parameters, self.NO_MULTI, context),
@@ -128,6 +248,21 @@ class Algorithm(QgsProcessingAlgorithm):
             angle=self.parameterAsDouble(parameters, self.ANGLE, context),
             fields=output_fields,
             sink=sink,
+            workers=self.parameterAsInt(parameters, self.WORKERS, context),
+            low_memory=self.parameterAsBool(parameters, self.LOW_MEMORY, context),
+            profile=self.parameterAsBool(parameters, self.PROFILE, context),
+            profile_report=self.parameterAsFileOutput(parameters, self.PROFILE_REPORT, context),
+            incremental_cache=self.parameterAsFileOutput(parameters, self.INCREMENTAL_CACHE, context),
+            reference_index_cache=self._reference_index_cache(parameters, context, reference_layer, feedback),
+            traversal=TRAVERSAL_ORDERS[self.parameterAsEnum(parameters, self.TRAVERSAL_ORDER, context)],
+            tile_size=self.parameterAsDouble(parameters, self.TILE_SIZE, context),
+            candidates=self.parameterAsInt(parameters, self.NEAREST_CANDIDATES, context),
+            backend=GEOMETRY_BACKENDS[self.parameterAsEnum(parameters, self.GEOMETRY_BACKEND, context)],
         )
         ParallelToReference(feedback, params).run()
-        return {self.OUTPUT_LAYER: dest_id}
+        results = {self.OUTPUT_LAYER: dest_id}
+        if params.profile_report:
+            results[self.PROFILE_REPORT] = params.profile_report
+        if params.incremental_cache:
+            results[self.INCREMENTAL_CACHE] = params.incremental_cache
+        return results
@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
 
 def normalize_azimuth_to_positive_range(azimuth: float) -> float:
     if azimuth == -180:
@@ -21,3 +28,20 @@ def calc_delta_azimuth(segment_azimuth: float, line_azimuth: float) -> float:
     return normalize_azimuth_to_90_range(
         normalize_azimuth_to_positive_range(segment_azimuth) - normalize_azimuth_to_positive_range(line_azimuth)
     )
+
+
+# Element-wise versions of the functions above for NumPy arrays (scalars broadcast), with the same edge cases.
+def normalize_azimuths_to_positive_range(azimuths: ArrayLike) -> np.ndarray:
+    azimuths = np.asarray(azimuths, dtype=np.float64)
+    return np.where(azimuths == -180, 180.0, np.where(azimuths < 0, azimuths + 180, azimuths))
+
+
+def normalize_azimuths_to_90_range(azimuths: ArrayLike) -> np.ndarray:
+    azimuths = np.asarray(azimuths, dtype=np.float64)
+    return np.where(azimuths > 90, azimuths - 180, np.where(azimuths < -90, azimuths + 180, azimuths))
+
+
+def calc_delta_azimuths(segment_azimuths: ArrayLike, line_azimuths: ArrayLike) -> np.ndarray:
+    return normalize_azimuths_to_90_range(
+        normalize_azimuths_to_positive_range(segment_azimuths) - normalize_azimuths_to_positive_range(line_azimuths)
+    )
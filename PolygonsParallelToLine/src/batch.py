@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Literal
+
+import numpy as np
+from qgis.core import QgsGeometry, QgsPointXY, QgsProcessingException
+
+from .kernel import Chunk, VertexNotFoundError, line_angles, needs_rotation, polygon_angles, rotate_xy
+from .parallelizer import compute_parallel_geometry
+from .stats import ABOVE_ANGLE, ALREADY_PARALLEL, ROTATED, UNCHANGED
+from .wkb import Ring, parse_rings, write_xy
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from .reference import ReferenceFeature
+
+# QGIS adapter of kernel.py: the GEOS lookups per target and the conversion to and from QgsGeometry.
+
+
+def compute_parallel_geometries(  # noqa: PLR0913
+    references: Sequence[ReferenceFeature],
+    target_geoms: Sequence[QgsGeometry],
+    target_kind: Literal["line", "polygon"],
+    *,
+    by_longest: bool,
+    angle_threshold: float = math.inf,
+    centers: Sequence[QgsPointXY] | None = None,
+    outcomes: list[str] | None = None,
+) -> list[QgsGeometry | None]:
+    """
+    Batch counterpart of compute_parallel_geometry: ``references[i]`` is the reference matched to
+    ``target_geoms[i]``. Only the per-target GEOS lookups run in Python; segment azimuths, deltas and
+    the rotation itself are evaluated for the whole chunk at once. When ``outcomes`` is given, it is
+    filled with the stats path of each target (rotated, above angle threshold, ...).
+    """
+    results: list[QgsGeometry | None] = [None] * len(target_geoms)
+    if centers is None:
+        centers = [geom.centroid().asPoint() for geom in target_geoms]
+
+    batched: list[int] = []
+    wkbs: list[bytes] = []
+    rings: list[list[Ring]] = []
+    for i, geom in enumerate(target_geoms):
+        wkb = bytes(geom.asWkb())
+        try:
+            target_rings = parse_rings(wkb)
+        except ValueError:
+            # Curved or otherwise unusual geometries keep going through the QgsGeometry code path.
+            results[i] = compute_parallel_geometry(
+                references[i], geom, target_kind, by_longest=by_longest, angle_threshold=angle_threshold
+            )
+            continue
+        batched.append(i)
+        wkbs.append(wkb)
+        rings.append(target_rings)
+
+    if not batched:
+        _fill_outcomes(outcomes, results, batched, np.empty(0))
+        return results
+
+    chunk = Chunk.from_wkbs(wkbs, rings)
+    chunk_refs = [references[i] for i in batched]
+    chunk_geoms = [target_geoms[i] for i in batched]
+    center_xy = np.array([(centers[i].x(), centers[i].y()) for i in batched], dtype=np.float64).reshape(-1, 2)
+
+    if target_kind == "polygon":
+        angles = _polygon_angles(chunk, chunk_refs, chunk_geoms, angle_threshold, by_longest=by_longest)
+    else:
+        angles = _line_angles(chunk, chunk_refs, center_xy, angle_threshold, by_longest=by_longest)
+
+    rotate = needs_rotation(angles)
+    rotated_xy = rotate_xy(chunk.xy, chunk.vertex_owner, np.where(rotate, angles, 0.0), center_xy)
+
+    for owner in np.flatnonzero(rotate):
+        geom = QgsGeometry()
+        xy = rotated_xy[chunk.vertex_start[owner] : chunk.vertex_start[owner + 1]]
+        geom.fromWkb(write_xy(chunk.wkbs[owner], chunk.rings[owner], xy))
+        results[batched[owner]] = geom
+
+    _fill_outcomes(outcomes, results, batched, angles)
+    return results
+
+
+def _fill_outcomes(
+    outcomes: list[str] | None, results: list[QgsGeometry | None], batched: list[int], angles: np.ndarray
+) -> None:
+    # Only batched targets know why they were left unchanged: NaN means no candidate within the threshold.
+    if outcomes is None:
+        return
+    outcomes[:] = [ROTATED if result is not None else UNCHANGED for result in results]
+    for owner, i in enumerate(batched):
+        if results[i] is None:
+            outcomes[i] = ABOVE_ANGLE if np.isnan(angles[owner]) else ALREADY_PARALLEL
+
+
+def _line_angles(
+    chunk: Chunk,
+    references: list[ReferenceFeature],
+    center_xy: np.ndarray,
+    angle_threshold: float,
+    *,
+    by_longest: bool,
+) -> np.ndarray:
+    ref_azimuth = np.array(
+        [ref.get_closest_azimuth(QgsPointXY(x, y)) for ref, (x, y) in zip(references, center_xy)],
+        dtype=np.float64,
+    )
+    return line_angles(chunk, ref_azimuth, angle_threshold, by_longest=by_longest)
+
+
+def _polygon_angles(
+    chunk: Chunk,
+    references: list[ReferenceFeature],
+    target_geoms: list[QgsGeometry],
+    angle_threshold: float,
+    *,
+    by_longest: bool,
+) -> np.ndarray:
+    # QGIS numbers the vertices of a geometry in WKB order, so a vertex ID is an offset into the chunk's `xy`.
+    pivot_ids = np.empty(len(references), dtype=np.int64)
+    ref_azimuth = np.empty(len(references))
+    for i, (reference, geom) in enumerate(zip(references, target_geoms)):
+        nearest_point_on_ref = reference.geom.nearestPoint(geom)
+        _, closest_vertex_idx = geom.closestVertexWithContext(nearest_point_on_ref.asPoint())
+        pivot_ids[i] = chunk.vertex_start[i] + closest_vertex_idx
+        ref_azimuth[i] = reference.get_closest_azimuth(QgsPointXY(geom.vertexAt(closest_vertex_idx)))
+
+    try:
+        return polygon_angles(chunk, pivot_ids, ref_azimuth, angle_threshold, by_longest=by_longest)
+    except VertexNotFoundError as e:
+        raise QgsProcessingException(str(e)) from e
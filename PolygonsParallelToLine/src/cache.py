@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Mapping that evicts the least recently used entries once their total weight exceeds `max_weight`.
+    Without `weigh` every entry weighs 1, so `max_weight` is a plain entry count.
+    """
+
+    def __init__(self, max_weight: int, weigh: Callable[[V], int] | None = None):
+        if max_weight < 1:
+            msg = f"max_weight must be at least 1, got {max_weight}"
+            raise ValueError(msg)
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key: K, value: V) -> None:
+        if key in self._entries:
+            self.weight -= self._entries.pop(key)[1]
+        weight = self.weigh(value) if self.weigh is not None else 1
+        self._entries[key] = (value, weight)
+        self.weight += weight
+        # The newest entry always stays, even when it alone is heavier than the budget.
+        while self.weight > self.max_weight and len(self._entries) > 1:
+            _, (_, evicted_weight) = self._entries.popitem(last=False)
+            self.weight -= evicted_weight
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.weight = 0
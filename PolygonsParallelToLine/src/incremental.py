@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+    from qgis.core import QgsFeature
+
+# Bump when the cached results may differ for the same inputs (rotation logic, cache layout).
+CACHE_FORMAT = 1
+# Stays below SQLite's historic limit of 999 bound parameters per statement.
+LOOKUP_BATCH_SIZE = 500
+
+
+def geometry_digest(wkb: bytes) -> bytes:
+    return hashlib.blake2b(wkb, digest_size=16).digest()
+
+
+def run_key(reference_wkbs: Iterable[tuple[int, bytes]], options: dict[str, Any]) -> str:
+    """Fingerprint of everything besides the target geometry that the output depends on."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps({"format": CACHE_FORMAT, **options}, sort_keys=True).encode())
+    for fid, wkb in reference_wkbs:
+        digest.update(fid.to_bytes(8, "little", signed=True))
+        digest.update(len(wkb).to_bytes(8, "little"))
+        digest.update(wkb)
+    return digest.hexdigest()
+
+
+class IncrementalCache:
+    """
+    Sidecar SQLite file mapping target geometry digests to their result (rotated WKB, or NULL when the
+    target is left unchanged). Results only depend on the target geometry once the references and the
+    parameters are fixed, so the whole file is discarded when `key` (see run_key) changes. Use it as a context
+    manager: leaving the block always closes the file, and an exception rolls back the run's uncommitted writes.
+    """
+
+    def __init__(self, path: str, key: str):
+        self.connection = sqlite3.connect(path)
+        try:
+            self.prepare(key)
+        except BaseException:
+            self.connection.close()
+            raise
+
+    def __enter__(self) -> IncrementalCache:  # noqa: PYI034
+        """Return the cache itself; `close` still decides whether the run's results are kept."""
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        """Close the file, discarding the uncommitted writes of a run that raised."""
+        if exc_type is not None:
+            self.connection.rollback()
+        self.connection.close()
+
+    def prepare(self, key: str) -> None:
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results (digest BLOB PRIMARY KEY, rotated_wkb BLOB)")
+        # Rows seen in this run; they replace `results` once the run completes, dropping deleted targets.
+        self.connection.execute("DROP TABLE IF EXISTS current")
+        self.connection.execute("CREATE TABLE current (digest BLOB PRIMARY KEY, rotated_wkb BLOB)")
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'key'").fetchone()
+        if row is None or row[0] != key:
+            self.connection.execute("DELETE FROM results")
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('key', ?)", (key,))
+
+    def split(self, features: list[QgsFeature]) -> tuple[list[bytes], list[bytes | None], list[int]]:
+        """Return the digest and cached result of every feature, and the positions that still need processing."""
+        digests = [geometry_digest(bytes(feature.geometry().asWkb())) for feature in features]
+        cached: dict[bytes, bytes | None] = {}
+        unique = list(dict.fromkeys(digests))
+        for start in range(0, len(unique), LOOKUP_BATCH_SIZE):
+            batch = unique[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            query = f"SELECT digest, rotated_wkb FROM results WHERE digest IN ({placeholders})"  # noqa: S608
+            cached.update(self.connection.execute(query, batch).fetchall())
+        misses = [i for i, digest in enumerate(digests) if digest not in cached]
+        return digests, [cached.get(digest) for digest in digests], misses
+
+    def record(self, digests: list[bytes], rotated_wkbs: list[bytes | None]) -> None:
+        self.connection.executemany("INSERT OR REPLACE INTO current VALUES (?, ?)", zip(digests, rotated_wkbs))
+
+    def close(self, *, completed: bool) -> None:
+        # A cancelled run only covers part of the layer, so its results are merged instead of replacing the rest.
+        if completed:
+            self.connection.execute("DELETE FROM results")
+        self.connection.execute("INSERT OR REPLACE INTO results SELECT digest, rotated_wkb FROM current")
+        self.connection.execute("DROP TABLE current")
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import dataclasses
+from functools import cached_property
+import hashlib
+import json
+from pathlib import Path
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from qgis.core import (
+    QgsApplication,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsFields,
+    QgsGeometry,
+    QgsProviderRegistry,
+    QgsRectangle,
+    QgsSpatialIndex,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+    QgsWkbTypes,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# Bump when the layout of the cached arrays changes.
+CACHE_FORMAT = 2
+_ARRAYS = ("fids", "bboxes", "offsets", "start", "end", "azimuth")
+# The bounding boxes once more as a GeoPackage layer of rectangles, feature i + 1 being reference fids[i], so
+# QgsSpatialIndex bulk-loads them from a provider iterator instead of taking one addFeature() call per reference.
+_BBOX_LAYER = "bboxes.gpkg"
+
+
+@dataclasses.dataclass
+class CachedReferences:
+    """
+    Bounding boxes and segments of every reference feature. Feature ``fids[i]`` owns the segments
+    ``offsets[i]:offsets[i + 1]`` of ``start``/``end``/``azimuth``; loaded arrays are memory-mapped.
+    """
+
+    fids: np.ndarray
+    bboxes: np.ndarray
+    offsets: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    azimuth: np.ndarray
+    bbox_layer: Path | None = None
+
+    @classmethod
+    def from_features(cls, features: Iterable[QgsFeature]) -> CachedReferences | None:
+        """Return None when a reference has no plain vertex layout (curves), which the arrays cannot hold."""
+        from .reference import SegmentIndex  # noqa: PLC0415 - reference.py imports this module
+
+        fids, bboxes, indexes = [], [], []
+        for feature in features:
+            geom = feature.geometry()
+            if (segment_index := SegmentIndex.from_geometry(geom)) is None:
+                return None
+            rect = geom.boundingBox()
+            fids.append(feature.id())
+            bboxes.append((rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum()))
+            indexes.append(segment_index)
+
+        offsets = np.zeros(len(indexes) + 1, dtype=np.int64)
+        np.cumsum([index.count for index in indexes], out=offsets[1:])
+        return cls(
+            fids=np.array(fids, dtype=np.int64),
+            bboxes=np.array(bboxes, dtype=np.float64).reshape(-1, 4),
+            offsets=offsets,
+            start=np.concatenate([index.start for index in indexes] or [np.empty((0, 2))]),
+            end=np.concatenate([index.end for index in indexes] or [np.empty((0, 2))]),
+            azimuth=np.concatenate([index.azimuth for index in indexes] or [np.empty(0)]),
+        )
+
+    def segments(self, position: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        segment_slice = slice(int(self.offsets[position]), int(self.offsets[position + 1]))
+        return self.start[segment_slice], self.end[segment_slice], self.azimuth[segment_slice]
+
+    @cached_property
+    def fid_order(self) -> np.ndarray:
+        return np.argsort(self.fids, kind="stable")
+
+    def position(self, fid: int) -> int:
+        return int(self.fid_order[np.searchsorted(self.fids, fid, sorter=self.fid_order)])
+
+    def fids_at(self, keys: list[int]) -> list[int]:
+        """Reference IDs of the keys of spatial_index()."""
+        return self.fids[np.asarray(keys, dtype=np.int64) - 1].tolist()
+
+    def spatial_index(self) -> QgsSpatialIndex:
+        """R-tree of the bounding boxes, keyed by position + 1 (see fids_at())."""
+        if self.bbox_layer is not None:
+            layer = QgsVectorLayer(str(self.bbox_layer), "bboxes", "ogr")
+            if layer.isValid() and layer.featureCount() == len(self.fids):
+                return QgsSpatialIndex(layer.getFeatures(QgsFeatureRequest().setNoAttributes()))
+        return bulk_spatial_index(self.bboxes)
+
+
+def bulk_spatial_index(bboxes: np.ndarray) -> QgsSpatialIndex:
+    """
+    R-tree of (xmin, ymin, xmax, ymax) rows keyed by row + 1, bulk-loaded (sort-tile-recursive) from a memory
+    layer of the rectangles instead of growing it by one addFeature() call per row.
+    """
+    layer = QgsVectorLayer("Polygon", "bboxes", "memory")
+    layer.dataProvider().addFeatures(_rectangle_features(bboxes))
+    return QgsSpatialIndex(layer.getFeatures(QgsFeatureRequest().setNoAttributes()))
+
+
+def _rectangle_features(bboxes: np.ndarray) -> list[QgsFeature]:
+    features = []
+    for x_min, y_min, x_max, y_max in bboxes.tolist():
+        feature = QgsFeature()
+        feature.setGeometry(QgsGeometry.fromRect(QgsRectangle(x_min, y_min, x_max, y_max)))
+        features.append(feature)
+    return features
+
+
+def _write_bbox_layer(path: Path, bboxes: np.ndarray) -> None:
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    writer = QgsVectorFileWriter.create(
+        str(path),
+        QgsFields(),
+        QgsWkbTypes.Polygon,
+        QgsCoordinateReferenceSystem(),
+        QgsCoordinateTransformContext(),
+        options,
+    )
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        raise OSError(writer.errorMessage())
+    added = writer.addFeatures(_rectangle_features(bboxes))
+    del writer  # Closes the file.
+    if not added:
+        msg = f"Could not write the bounding boxes to {path}"
+        raise OSError(msg)
+
+
+def cache_root() -> Path:
+    return Path(QgsApplication.qgisSettingsDirPath()) / "parallelizer" / "reference_index"
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheLocation:
+    directory: Path
+    key: dict[str, Any]
+
+    @classmethod
+    def for_layer(cls, layer: QgsVectorLayer, feature_count: int) -> CacheLocation | None:
+        """Return None when the layer has no source file whose modification time could invalidate the cache."""
+        path = QgsProviderRegistry.instance().decodeUri(layer.providerType(), layer.source()).get("path")
+        if not path or not Path(path).is_file():
+            return None
+        name = hashlib.blake2b(f"{layer.providerType()}|{layer.source()}".encode(), digest_size=16).hexdigest()
+        return cls(
+            directory=cache_root() / name,
+            key={
+                "format": CACHE_FORMAT,
+                "source": layer.source(),
+                "feature_count": feature_count,
+                "modified": Path(path).stat().st_mtime_ns,
+            },
+        )
+
+    def load(self) -> CachedReferences | None:
+        try:
+            if json.loads((self.directory / "key.json").read_text()) != self.key:
+                return None
+            arrays = {name: np.load(self.directory / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        except (OSError, ValueError):
+            return None
+        return CachedReferences(**arrays, bbox_layer=self.directory / _BBOX_LAYER)
+
+    def save(self, references: CachedReferences) -> None:
+        # Written next to the final location and swapped in, so an interrupted run never leaves a
+        # half-written cache behind.
+        self.directory.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.directory.parent))
+        for name in _ARRAYS:
+            np.save(staging / f"{name}.npy", getattr(references, name))
+        _write_bbox_layer(staging / _BBOX_LAYER, references.bboxes)
+        (staging / "key.json").write_text(json.dumps(self.key))
+        shutil.rmtree(self.directory, ignore_errors=True)
+        staging.rename(self.directory)
+        references.bbox_layer = self.directory / _BBOX_LAYER
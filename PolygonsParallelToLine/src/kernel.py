@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import dataclasses
+from functools import cached_property
+import math
+import sys
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import numpy as np
+
+from .azimuth import calc_delta_azimuths
+from .wkb import Ring, read_xy
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Rotation math on coordinate arrays. Like azimuth.py and wkb.py, this module must not import qgis: it loads
+# without QgsApplication, so it can be benchmarked and tested on its own. The GEOS lookups it needs (closest
+# reference azimuths, polygon pivots, centres) are done by the QGIS adapters in batch.py and rotator.py.
+
+# Rotations up to this many degrees are treated as "already parallel".
+ABSOLUTE_TOLERANCE = 1e-8
+# Default tolerance of QgsGeometry.removeDuplicateNodes().
+DUPLICATE_NODE_EPSILON = 4 * sys.float_info.epsilon
+# QgsCurvePolygon.removeDuplicateNodes() leaves rings this short untouched.
+MIN_CLEANABLE_RING_SIZE = 5
+# Defaults of QgsGeometry.closestSegmentWithContext() (DEFAULT_SEGMENT_EPSILON) and qgsDoubleNear().
+SEGMENT_EPSILON = 1e-8
+DOUBLE_EPSILON = 4 * sys.float_info.epsilon
+
+
+_Values = TypeVar("_Values", np.ndarray, float)
+
+
+class VertexNotFoundError(ValueError):
+    pass
+
+
+@dataclasses.dataclass
+class Chunk:
+    """Vertices of every target in a chunk, concatenated ring by ring."""
+
+    wkbs: list[bytes]
+    rings: list[list[Ring]]
+    xy: np.ndarray
+    ring_start: np.ndarray
+    ring_size: np.ndarray
+    ring_owner: np.ndarray
+    ring_index: np.ndarray
+
+    @classmethod
+    def from_wkbs(cls, wkbs: list[bytes], rings: list[list[Ring]]) -> Chunk:
+        flat_rings = [(owner, ring) for owner, target_rings in enumerate(rings) for ring in target_rings]
+        ring_size = np.fromiter((ring.size for _, ring in flat_rings), dtype=np.int64, count=len(flat_rings))
+        ring_start = np.zeros(len(flat_rings), dtype=np.int64)
+        np.cumsum(ring_size[:-1], out=ring_start[1:])
+        xy_parts = [read_xy(wkb, target_rings) for wkb, target_rings in zip(wkbs, rings)]
+        return cls(
+            wkbs=wkbs,
+            rings=rings,
+            xy=np.concatenate(xy_parts) if xy_parts else np.empty((0, 2)),
+            ring_start=ring_start,
+            ring_size=ring_size,
+            ring_owner=np.fromiter((owner for owner, _ in flat_rings), dtype=np.int64, count=len(flat_rings)),
+            ring_index=np.fromiter((ring.index for _, ring in flat_rings), dtype=np.int64, count=len(flat_rings)),
+        )
+
+    @property
+    def target_count(self) -> int:
+        return len(self.wkbs)
+
+    @cached_property
+    def vertex_ring(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.ring_size)), self.ring_size)
+
+    @cached_property
+    def vertex_owner(self) -> np.ndarray:
+        return self.ring_owner[self.vertex_ring]
+
+    @cached_property
+    def vertex_start(self) -> np.ndarray:
+        """Target ``i`` owns the vertices ``vertex_start[i]:vertex_start[i + 1]`` of ``xy``."""
+        vertex_start = np.zeros(self.target_count + 1, dtype=np.int64)
+        np.add.at(vertex_start, self.ring_owner + 1, self.ring_size)
+        np.cumsum(vertex_start, out=vertex_start)
+        return vertex_start
+
+    @cached_property
+    def exterior_rings(self) -> ExteriorRings:
+        return ExteriorRings.from_chunk(self)
+
+    def segment_starts(self) -> np.ndarray:
+        # A segment joins vertex k and k + 1 of the same ring; the last vertex of each ring starts none.
+        is_start = np.ones(len(self.xy), dtype=bool)
+        ring_end = self.ring_start + self.ring_size - 1
+        is_start[ring_end[self.ring_size > 0]] = False
+        return np.flatnonzero(is_start)
+
+
+def segment_azimuths(dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    # Same formula as QgsPoint.azimuth: -180..180, clockwise from north.
+    return np.arctan2(dx, dy) * 180.0 / math.pi
+
+
+def ring_segments(rings: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Start and end points of the segments of every ring; no segment joins one ring (or part) to the next."""
+    if not rings:
+        return np.empty((0, 2)), np.empty((0, 2))
+    return np.concatenate([xy[:-1] for xy in rings]), np.concatenate([xy[1:] for xy in rings])
+
+
+def segment_sqr_distances(
+    x: float | np.ndarray, y: float | np.ndarray, start: np.ndarray, end: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorised QgsGeometryUtilsBase::sqrDistToLine() from (x, y) to every segment ``start[i]``-``end[i]``;
+    point arrays of shape (m, 1) give an (m, n) matrix.
+    """
+    x1, y1 = start.T
+    x2, y2 = end.T
+    dx, dy = x2 - x1, y2 - y1
+    degenerate = (np.abs(dx) <= DOUBLE_EPSILON) & (np.abs(dy) <= DOUBLE_EPSILON)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(degenerate, 0.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy))
+    closest_x = np.where(t > 1, x2, np.where(t > 0, x1 + dx * t, x1))
+    closest_y = np.where(t > 1, y2, np.where(t > 0, y1 + dy * t, y1))
+    offset_x, offset_y = x - closest_x, y - closest_y
+    sqr_dist = offset_x * offset_x + offset_y * offset_y
+    return np.where(sqr_dist <= SEGMENT_EPSILON, 0.0, sqr_dist)
+
+
+def line_angles(chunk: Chunk, ref_azimuth: np.ndarray, angle_threshold: float, *, by_longest: bool) -> np.ndarray:
+    """
+    Rotation angle of every line target in the chunk towards ``ref_azimuth[i]``, the azimuth of the reference
+    segment closest to target ``i``, or NaN when no target segment is within the angle threshold.
+    """
+    angles = np.full(chunk.target_count, np.nan)
+
+    starts = chunk.segment_starts()
+    if not len(starts):
+        return angles
+    owner = chunk.vertex_owner[starts]
+    dx, dy = (chunk.xy[starts + 1] - chunk.xy[starts]).T
+    deltas = calc_delta_azimuths(ref_azimuth[owner], segment_azimuths(dx, dy))
+    key = -np.sqrt(dx * dx + dy * dy) if by_longest else np.abs(deltas)
+
+    # Stable sort keeps segment order within ties, so the first longest / smallest-angle segment wins
+    # exactly like argmax()/argmin() over a single target's segments.
+    order = np.lexsort((key, owner))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = owner[order][1:] != owner[order][:-1]
+    chosen = order[first]
+    chosen_delta = deltas[chosen]
+    within = np.abs(chosen_delta) <= angle_threshold
+    angles[owner[chosen][within]] = chosen_delta[within]
+    return angles
+
+
+def polygon_angles(
+    chunk: Chunk, pivot_ids: np.ndarray, ref_azimuth: np.ndarray, angle_threshold: float, *, by_longest: bool
+) -> np.ndarray:
+    """
+    Rotation angle of every polygon target in the chunk, from the two exterior ring segments meeting at
+    its pivot, vertex ``pivot_ids[i]`` of `xy`, and ``ref_azimuth[i]``, the azimuth of the reference segment
+    closest to that pivot; NaN when neither segment is within the angle threshold.
+    """
+    prev_xy, next_xy = adjacent_vertices(chunk, pivot_ids)
+    pivots = chunk.xy[pivot_ids]
+    prev_dx, prev_dy = (prev_xy - pivots).T
+    next_dx, next_dy = (next_xy - pivots).T
+    return choose_polygon_angles(
+        calc_delta_azimuths(ref_azimuth, segment_azimuths(prev_dx, prev_dy)),
+        calc_delta_azimuths(ref_azimuth, segment_azimuths(next_dx, next_dy)),
+        np.sqrt(prev_dx * prev_dx + prev_dy * prev_dy),
+        np.sqrt(next_dx * next_dx + next_dy * next_dy),
+        angle_threshold,
+        by_longest=by_longest,
+    )
+
+
+def choose_polygon_angles(  # noqa: PLR0913
+    prev_delta: np.ndarray,
+    next_delta: np.ndarray,
+    prev_length: np.ndarray,
+    next_length: np.ndarray,
+    angle_threshold: float,
+    *,
+    by_longest: bool,
+) -> np.ndarray:
+    """
+    Pick the delta azimuth of the previous or the next segment at a polygon's pivot, NaN for neither: a
+    segment within the threshold wins over one beyond it; between two, the longer one (`by_longest`) or
+    the one needing the smaller rotation. Ties go to the smaller angle, then to the previous segment.
+    """
+    return _choose_angle(
+        prev_delta, next_delta, prev_length, next_length, angle_threshold, by_longest=by_longest, where=np.where
+    )
+
+
+def choose_polygon_angle(  # noqa: PLR0913
+    prev_delta: float,
+    next_delta: float,
+    prev_length: float,
+    next_length: float,
+    angle_threshold: float,
+    *,
+    by_longest: bool,
+) -> float:
+    """choose_polygon_angles() for a single target, on plain floats."""
+    return _choose_angle(
+        prev_delta, next_delta, prev_length, next_length, angle_threshold, by_longest=by_longest, where=_where
+    )
+
+
+def _where(condition: bool, x: float, y: float) -> float:  # noqa: FBT001
+    return x if condition else y
+
+
+def _choose_angle(  # noqa: PLR0913
+    prev_delta: _Values,
+    next_delta: _Values,
+    prev_length: _Values,
+    next_length: _Values,
+    angle_threshold: float,
+    *,
+    by_longest: bool,
+    where: Callable[[Any, _Values, _Values], _Values],
+) -> _Values:
+    # The decision table of choose_polygon_angles(), written once for arrays (np.where) and floats (_where).
+    prev_within = abs(prev_delta) <= angle_threshold
+    next_within = abs(next_delta) <= angle_threshold
+    by_angle = where(abs(prev_delta) > abs(next_delta), next_delta, prev_delta)
+    if by_longest:
+        both = where(prev_length > next_length, prev_delta, where(prev_length < next_length, next_delta, by_angle))
+    else:
+        both = by_angle
+    return where(
+        prev_within & next_within,
+        both,
+        where(prev_within, prev_delta, where(next_within, next_delta, math.nan)),
+    )
+
+
+def needs_rotation(angles: np.ndarray) -> np.ndarray:
+    return ~np.isnan(angles) & (np.abs(angles) > ABSOLUTE_TOLERANCE)
+
+
+def angle_needs_rotation(angle: float) -> bool:
+    """needs_rotation() for a single angle."""
+    return not math.isnan(angle) and abs(angle) > ABSOLUTE_TOLERANCE
+
+
+def adjacent_vertices(chunk: Chunk, vertex_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return chunk.exterior_rings.adjacent_vertices(vertex_ids)
+
+
+@dataclasses.dataclass
+class ExteriorRings:
+    """
+    Exterior rings of a chunk as Target.get_adjacent_segments() sees them: interior rings and duplicate nodes
+    dropped, each cleaned ring re-closed. Exterior ring ``i`` holds the vertices ``start[i]:start[i] + size[i]``
+    of `xy`; `owner` and `ring` give the target and the ring of every vertex. Vertex ``k`` of the chunk is
+    vertex ``clean_index[k]`` here (a dropped duplicate maps to the node it repeats), -1 on an interior ring.
+    """
+
+    xy: np.ndarray
+    owner: np.ndarray
+    ring: np.ndarray
+    start: np.ndarray
+    size: np.ndarray
+    clean_index: np.ndarray
+
+    @classmethod
+    def from_chunk(cls, chunk: Chunk) -> ExteriorRings:
+        exterior = np.flatnonzero(chunk.ring_index == 0)
+        sizes = chunk.ring_size[exterior]
+        vertex = np.flatnonzero(chunk.ring_index[chunk.vertex_ring] == 0)
+        ring_of_vertex = chunk.vertex_ring[vertex]
+        xy = chunk.xy[vertex]
+
+        first_in_ring = np.ones(len(vertex), dtype=bool)
+        first_in_ring[1:] = ring_of_vertex[1:] != ring_of_vertex[:-1]
+        step = np.zeros_like(xy)
+        step[1:] = np.abs(xy[1:] - xy[:-1])
+        duplicate = (step <= DUPLICATE_NODE_EPSILON).all(axis=1) & ~first_in_ring
+        duplicate &= np.repeat(sizes >= MIN_CLEANABLE_RING_SIZE, sizes)
+        keep = ~duplicate
+        ring_of_vertex, xy = ring_of_vertex[keep], xy[keep]
+        clean_index = np.full(len(chunk.xy), -1, dtype=np.int64)
+        clean_index[vertex] = np.cumsum(keep) - 1
+
+        # A cleaned ring is re-closed onto its first vertex.
+        ring = np.searchsorted(exterior, ring_of_vertex)
+        clean_size = np.bincount(ring, minlength=len(exterior))
+        clean_start = np.zeros(len(exterior), dtype=np.int64)
+        np.cumsum(clean_size[:-1], out=clean_start[1:])
+        cleaned = clean_size < sizes
+        xy[(clean_start + clean_size - 1)[cleaned]] = xy[clean_start[cleaned]]
+        return cls(
+            xy=xy,
+            owner=chunk.ring_owner[ring_of_vertex],
+            ring=ring,
+            start=clean_start,
+            size=clean_size,
+            clean_index=clean_index,
+        )
+
+    def adjacent_vertices(self, vertex_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Ring neighbours of the chunk vertices `vertex_ids`, which must lie on exterior rings."""
+        vertex_ids = np.asarray(vertex_ids)
+        valid = (vertex_ids >= 0) & (vertex_ids < len(self.clean_index))
+        hit = np.where(valid, self.clean_index[np.where(valid, vertex_ids, 0)], -1)
+        if (hit < 0).any():
+            missing = int(vertex_ids[hit < 0][0])
+            msg = f"Vertex {missing} is not on an exterior ring of the target geometry"
+            raise VertexNotFoundError(msg)
+
+        ring = self.ring[hit]
+        position = hit - self.start[ring]
+        size = self.size[ring]
+        prev_position = np.where(position == 0, size - 2, position - 1)
+        next_position = np.where(position == size - 1, 1, position + 1)
+        return self.xy[self.start[ring] + prev_position], self.xy[self.start[ring] + next_position]
+
+
+def rotate_xy(xy: np.ndarray, owner: np.ndarray, angles: np.ndarray, center_xy: np.ndarray) -> np.ndarray:
+    # QgsGeometry.rotate: positive angle = clockwise around the center.
+    radians = np.radians(angles)
+    cos, sin = np.cos(radians)[owner], np.sin(radians)[owner]
+    offset = xy - center_xy[owner]
+    rotated = np.empty_like(xy)
+    rotated[:, 0] = center_xy[owner, 0] + offset[:, 0] * cos + offset[:, 1] * sin
+    rotated[:, 1] = center_xy[owner, 1] - offset[:, 0] * sin + offset[:, 1] * cos
+    return rotated
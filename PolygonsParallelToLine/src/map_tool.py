@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import dataclasses
+from functools import partial
 from typing import TYPE_CHECKING, Literal
 
+import numpy as np
 from qgis.core import (
     Qgis,
+    QgsApplication,
     QgsCoordinateTransform,
     QgsFeature,
     QgsFeatureRequest,
@@ -11,46 +15,185 @@ from qgis.core import (
     QgsPointXY,
     QgsProject,
     QgsRectangle,
+    QgsTask,
     QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
     QgsWkbTypes,
 )
-from qgis.gui import QgsMapToolIdentify, QgsMapToolIdentifyFeature, QgsRubberBand
-from qgis.PyQt.QtCore import QPoint, Qt  # type: ignore[import-not-found]
+from qgis.gui import QgsMapTool, QgsMapToolIdentify, QgsMapToolIdentifyFeature, QgsRubberBand
+from qgis.PyQt.QtCore import QPoint, Qt, QTimer  # type: ignore[import-not-found]
 from qgis.PyQt.QtGui import QColor  # type: ignore[import-not-found]
+from qgis.PyQt.QtWidgets import QProgressBar, QPushButton  # type: ignore[import-not-found]
 
+from .cache import LRUCache
 from .parallelizer import compute_parallel_geometry
-from .reference import ReferenceFeature, Segment, iter_segments
+from .reference import ReferenceFeature, Segment, SegmentIndex, closest_segment
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from qgis.core import QgsCoordinateReferenceSystem
-    from qgis.gui import QgisInterface, QgsMapMouseEvent
+    from qgis.gui import QgisInterface, QgsMapMouseEvent, QgsMessageBarItem
     from qgis.PyQt.QtGui import QKeyEvent  # type: ignore[import-not-found]
 
     from .settings import MapToolSettings
 
 
-def _closest_segment_of(geom: QgsGeometry, point_xy: QgsPointXY) -> Segment:
-    return ReferenceFeature.from_geometry(geom).get_closest_segment(point_xy)
+def _pick_segment_in_rect(geom: QgsGeometry, rect: QgsRectangle, rect_center: QgsPointXY) -> Segment:
+    """Return the segment with the longest part inside `rect` (first one on ties), else the closest to `rect_center`."""
+    segments = SegmentIndex.from_any_geometry(geom)
+    lengths = _clipped_lengths(segments.start, segments.end, rect)
+    if lengths.size and lengths.max() >= 0:
+        return segments.segment(int(np.argmax(lengths)))
+    return closest_segment(geom, rect_center)
+
+
+def _clipped_lengths(start: np.ndarray, end: np.ndarray, rect: QgsRectangle) -> np.ndarray:
+    """
+    Length of the part of every segment inside `rect` (boundary included), or -1 for segments that miss it,
+    by Liang-Barsky clipping: the segment start + t * delta stays inside while t is in [t_enter, t_exit].
+    """
+    delta = end - start
+    # One row per rectangle edge (left, right, bottom, top): the segment is inside that edge while p * t <= q.
+    p = np.stack([-delta[:, 0], delta[:, 0], -delta[:, 1], delta[:, 1]])
+    q = np.stack(
+        [
+            start[:, 0] - rect.xMinimum(),
+            rect.xMaximum() - start[:, 0],
+            start[:, 1] - rect.yMinimum(),
+            rect.yMaximum() - start[:, 1],
+        ]
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = q / p
+    t_enter = np.max(np.where(p < 0, ratio, 0.0), axis=0, initial=0.0)
+    t_exit = np.min(np.where(p > 0, ratio, 1.0), axis=0, initial=1.0)
+    # Parallel to an edge (p == 0) and outside it (q < 0) misses the rectangle whatever t is.
+    misses = ((p == 0) & (q < 0)).any(axis=0) | (t_enter > t_exit)
+    return np.where(misses, -1.0, (t_exit - t_enter) * np.hypot(delta[:, 0], delta[:, 1]))
+
+
+def _exact_rect_request(rect: QgsRectangle) -> QgsFeatureRequest:
+    """
+    Features whose geometry intersects `rect`, without attributes. The exact test runs in the provider against
+    a prepared rectangle, so features that only share a bounding box never reach Python.
+    """
+    return QgsFeatureRequest().setFilterRect(rect).setFlags(QgsFeatureRequest.ExactIntersect).setNoAttributes()
+
+
+def _commit_geometries(layer: QgsVectorLayer, geometries: dict[int, QgsGeometry], text: str) -> int:
+    """
+    Apply `geometries` (by feature ID) to the edit buffer of `layer` as one undo command and return how many
+    were applied. The per-feature `geometryChanged` signals are blocked; listeners get a single `dataChanged`
+    and the layer is repainted once, after the last change.
+    """
+    if not geometries:
+        return 0
+    layer.beginEditCommand(text)
+    applied = 0
+    layer.blockSignals(True)  # noqa: FBT003
+    try:
+        for fid, geom in geometries.items():
+            if layer.changeGeometry(fid, geom):
+                applied += 1
+    except Exception:
+        layer.blockSignals(False)  # noqa: FBT003
+        layer.destroyEditCommand()
+        raise
+    layer.blockSignals(False)  # noqa: FBT003
+
+    if applied:
+        layer.endEditCommand()
+        layer.dataChanged.emit()
+        layer.triggerRepaint()
+    else:
+        layer.destroyEditCommand()
+    return applied
+
+
+def _crs_key(crs: QgsCoordinateReferenceSystem) -> str:
+    return crs.authid() or crs.toWkt()
 
 
-def _pick_segment_in_rect(geom: QgsGeometry, rect_geom: QgsGeometry, rect_center: QgsPointXY) -> Segment:
-    best: Segment | None = None
-    best_length = 0.0
-    for seg in iter_segments(geom):
-        seg_geom = QgsGeometry.fromPolyline([seg.start, seg.end])
-        clipped = seg_geom.intersection(rect_geom)
-        if clipped.isNull() or clipped.isEmpty():
-            continue
-        length = clipped.length()
-        if length > best_length or best is None:
-            best_length = length
-            best = seg
-    if best is not None:
-        return best
-    return _closest_segment_of(geom, rect_center)
+Kind = Literal["line", "polygon"]
 
 
-Kind = Literal["line", "polygon"]
+@dataclasses.dataclass
+class LayerJob:
+    """One editable layer of a bulk rotation, prepared on the main thread; `rect` and `reference` are in layer CRS."""
+
+    layer_id: str
+    source: QgsVectorLayerFeatureSource
+    rect: QgsRectangle
+    reference: ReferenceFeature
+    kind: Kind
+
+
+class BulkRotationTask(QgsTask):
+    """
+    Computes the rotated geometries of a rectangle drag off the GUI thread. Layers are only read, through
+    feature sources taken on the main thread; `on_finished` runs on the main thread and applies the edits.
+    """
+
+    def __init__(
+        self,
+        jobs: list[LayerJob],
+        *,
+        by_longest: bool,
+        pick_target_segment: bool,
+        on_finished: Callable[[BulkRotationTask, bool], None] | None = None,
+    ) -> None:
+        super().__init__("Parallel to Line (bulk)", QgsTask.CanCancel)
+        self.jobs = jobs
+        self.by_longest = by_longest
+        self.pick_target_segment = pick_target_segment
+        self.on_finished = on_finished
+        # Rotated geometry by feature ID, per layer ID.
+        self.rotated: dict[str, dict[int, QgsGeometry]] = {}
+        self.exception: Exception | None = None
+
+    def run(self) -> bool:
+        try:
+            return self.rotate()
+        except Exception as e:  # noqa: BLE001 - reported on the main thread by the map tool
+            self.exception = e
+            return False
+
+    def rotate(self) -> bool:
+        matches = []
+        for job in self.jobs:
+            if self.isCanceled():
+                return False
+            matches.append(self.matching_features(job))
+
+        total = sum(len(features) for features in matches)
+        done = progress = 0
+        for job, features in zip(self.jobs, matches):
+            rotated = self.rotated.setdefault(job.layer_id, {})
+            for fid, geom in features:
+                if self.isCanceled():
+                    return False
+                target_segment = (
+                    _pick_segment_in_rect(geom, job.rect, job.rect.center()) if self.pick_target_segment else None
+                )
+                rotated_geom = compute_parallel_geometry(
+                    job.reference, geom, job.kind, by_longest=self.by_longest, target_segment=target_segment
+                )
+                if rotated_geom is not None:
+                    rotated[fid] = rotated_geom
+                done += 1
+                # Progress signals cross into the GUI thread; only send them when the percentage changes.
+                if done * 100 // total != progress:
+                    progress = done * 100 // total
+                    self.setProgress(progress)
+        return True
+
+    def matching_features(self, job: LayerJob) -> list[tuple[int, QgsGeometry]]:
+        return [(feature.id(), feature.geometry()) for feature in job.source.getFeatures(_exact_rect_request(job.rect))]
+
+    def finished(self, result: bool) -> None:  # noqa: FBT001
+        if self.on_finished is not None:
+            self.on_finished(self, result)
 
 
 class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
@@ -60,6 +203,11 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
     SELECTION_STROKE = QColor(0, 128, 255, 220)
     SELECTION_FILL = QColor(0, 128, 255, 50)
     DRAG_THRESHOLD_PX = 5
+    PREVIEW_COLOR = QColor(0, 170, 0, 220)
+    PREVIEW_WIDTH = 2
+    # Hover previews are computed at most once per interval, for the latest cursor position.
+    PREVIEW_INTERVAL_MS = 30
+    PREVIEW_CACHE_SIZE = 1000
     REFERENCE_CLEARED_MSG = "Reference cleared. Click a line or polygon feature to set a new reference."
 
     def __init__(self, iface: QgisInterface, settings: MapToolSettings) -> None:
@@ -72,15 +220,44 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
         self._drag_start_pos: QPoint | None = None
         self._drag_start_point: QgsPointXY | None = None
         self._is_dragging: bool = False
+        self._rotation_task: BulkRotationTask | None = None
+        self._progress_message: QgsMessageBarItem | None = None
+        # CRS of reference_geom (the canvas CRS when the reference was set).
+        self.reference_crs: QgsCoordinateReferenceSystem | None = None
+        # Transforms per (source, destination) CRS key and reference_geom reprojected per layer CRS key. Both
+        # are keyed by CRS, so a layer whose CRS changes simply looks up another entry.
+        self._transforms: dict[tuple[str, str], QgsCoordinateTransform] = {}
+        self._layer_references: dict[str, QgsGeometry] = {}
+        # The same references with their segment index, for clicks and hover previews.
+        self._reference_features: dict[str, ReferenceFeature] = {}
+        # Rotated geometries by (layer ID, feature ID, by_longest, picked target segment), with the WKB of the
+        # geometry they were computed from so edited features are recomputed. Cleared with the reference.
+        self._rotations: LRUCache[tuple[object, ...], tuple[bytes, QgsGeometry | None]] = LRUCache(
+            self.PREVIEW_CACHE_SIZE
+        )
+        self._preview_rubber_band: QgsRubberBand | None = None
+        self._preview_pos: QPoint | None = None
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(self.PREVIEW_INTERVAL_MS)
+        self._preview_timer.timeout.connect(self._update_preview)
 
     def activate(self) -> None:
         super().activate()
+        self.iface.mapCanvas().destinationCrsChanged.connect(self._clear_crs_caches)
+        QgsProject.instance().transformContextChanged.connect(self._clear_crs_caches)
         self.setCursor(Qt.CursorShape.CrossCursor)
         self._show_message("Click or drag-rectangle on a line or polygon to set the reference.", Qgis.Info)
 
     def deactivate(self) -> None:
+        if self._rotation_task is not None:
+            self._rotation_task.cancel()
         self._clear_reference()
         self._cancel_drag()
+        self._clear_preview()
+        self.iface.mapCanvas().destinationCrsChanged.disconnect(self._clear_crs_caches)
+        QgsProject.instance().transformContextChanged.disconnect(self._clear_crs_caches)
+        self._clear_crs_caches()
         super().deactivate()
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
@@ -88,6 +265,9 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
             if self._is_dragging:
                 self._cancel_drag()
                 return
+            if self._rotation_task is not None:
+                self._rotation_task.cancel()
+                return
             if self.reference_geom is not None:
                 self._clear_reference()
                 self._show_message(self.REFERENCE_CLEARED_MSG, Qgis.Info)
@@ -104,12 +284,14 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
 
     def canvasMoveEvent(self, event: QgsMapMouseEvent) -> None:
         if self._drag_start_pos is None:
+            self._schedule_preview(event.pos())
             return
         if not self._is_dragging:
             delta = event.pos() - self._drag_start_pos
             if abs(delta.x()) < self.DRAG_THRESHOLD_PX and abs(delta.y()) < self.DRAG_THRESHOLD_PX:
                 return
             self._is_dragging = True
+            self._clear_preview()
             self._start_selection_band()
         self._update_selection_band(self.toMapCoordinates(event.pos()))
 
@@ -178,7 +360,7 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
         ref_geom = feature.geometry()
         if self.settings.pick_reference_segment:
             click_layer = self._point_in_layer_crs(map_point, layer)
-            segment = _closest_segment_of(ref_geom, click_layer)
+            segment = closest_segment(ref_geom, click_layer)
             ref_geom = QgsGeometry.fromPolylineXY([QgsPointXY(segment.start), QgsPointXY(segment.end)])
         self._set_reference(ref_geom, layer.crs())
         self._show_message(
@@ -200,30 +382,100 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
             )
             return
 
-        kind: Kind = "line" if geom_type == QgsWkbTypes.LineGeometry else "polygon"
+        rotated = self._rotated_geometry(layer, feature, geom_type, map_point)
+        if rotated is None:
+            self._show_message("Feature already parallel; no rotation applied.", Qgis.Info)
+            return
+
+        if _commit_geometries(layer, {feature.id(): rotated}, "Parallel to Line"):
+            self._clear_preview()
+        else:
+            self._show_message("Failed to update feature geometry.", Qgis.Warning)
+
+    def _rotated_geometry(
+        self, layer: QgsVectorLayer, feature: QgsFeature, geom_type: int, map_point: QgsPointXY
+    ) -> QgsGeometry | None:
+        """Rotation of a single feature for a click or hover at `map_point`, shared through a cache."""
+        geom = feature.geometry()
         target_segment: Segment | None = None
+        segment_key = None
         if self.settings.pick_target_segment:
-            click_layer = self._point_in_layer_crs(map_point, layer)
-            target_segment = _closest_segment_of(feature.geometry(), click_layer)
+            target_segment = closest_segment(geom, self._point_in_layer_crs(map_point, layer))
+            segment_key = (
+                target_segment.start.x(),
+                target_segment.start.y(),
+                target_segment.end.x(),
+                target_segment.end.y(),
+            )
+        # The layer CRS is part of the key since changing it emits no signal the tool listens to.
+        key = (layer.id(), _crs_key(layer.crs()), feature.id(), self.settings.by_longest, segment_key)
+        wkb = bytes(geom.asWkb())
+        cached = self._rotations.get(key)
+        if cached is not None and cached[0] == wkb:
+            return cached[1]
+
+        kind: Kind = "line" if geom_type == QgsWkbTypes.LineGeometry else "polygon"
         rotated = compute_parallel_geometry(
-            self._reference_for_layer(layer),
-            feature.geometry(),
+            self._reference_feature_for_layer(layer),
+            geom,
             kind,
             by_longest=self.settings.by_longest,
             target_segment=target_segment,
         )
-        if rotated is None:
-            self._show_message("Feature already parallel; no rotation applied.", Qgis.Info)
+        self._rotations.put(key, (wkb, rotated))
+        return rotated
+
+    def _schedule_preview(self, pos: QPoint) -> None:
+        if self.reference_geom is None or self._rotation_task is not None:
             return
+        self._preview_pos = pos
+        if not self._preview_timer.isActive():
+            self._preview_timer.start()
 
-        layer.beginEditCommand("Parallel to Line")
-        ok = layer.changeGeometry(feature.id(), rotated)
-        if ok:
-            layer.endEditCommand()
-            layer.triggerRepaint()
-        else:
-            layer.destroyEditCommand()
-            self._show_message("Failed to update feature geometry.", Qgis.Warning)
+    def _update_preview(self) -> None:
+        if self.reference_geom is None or self._preview_pos is None or self._drag_start_pos is not None:
+            self._clear_preview()
+            return
+        map_point = self.toMapCoordinates(self._preview_pos)
+        hit = self._editable_feature_at(map_point)
+        rotated = None if hit is None else self._rotated_geometry(*hit, map_point)
+        if hit is None or rotated is None:
+            self._clear_preview()
+            return
+
+        if self._preview_rubber_band is None:
+            band = QgsRubberBand(self.iface.mapCanvas(), QgsWkbTypes.geometryType(rotated.wkbType()))
+            band.setColor(self.PREVIEW_COLOR)
+            band.setWidth(self.PREVIEW_WIDTH)
+            band.setFillColor(QColor(0, 0, 0, 0))
+            self._preview_rubber_band = band
+        self._preview_rubber_band.setToGeometry(rotated, hit[0])
+
+    def _editable_feature_at(self, map_point: QgsPointXY) -> tuple[QgsVectorLayer, QgsFeature, int] | None:
+        # A one-feature exact rectangle query per editable layer instead of identify(), which visits every
+        # layer and loads attributes; only editable layers can be rotated by a click anyway.
+        canvas = self.iface.mapCanvas()
+        radius = QgsMapTool.searchRadiusMU(canvas)
+        map_rect = QgsRectangle(
+            map_point.x() - radius, map_point.y() - radius, map_point.x() + radius, map_point.y() + radius
+        )
+        for layer in canvas.layers():
+            if not isinstance(layer, QgsVectorLayer) or not layer.isEditable():
+                continue
+            geom_type = layer.geometryType()
+            if geom_type not in (QgsWkbTypes.LineGeometry, QgsWkbTypes.PolygonGeometry):
+                continue
+            request = _exact_rect_request(self._transform_rect_to_layer(map_rect, layer)).setLimit(1)
+            if (feature := next(iter(layer.getFeatures(request)), None)) is not None:
+                return layer, feature, geom_type
+        return None
+
+    def _clear_preview(self) -> None:
+        self._preview_timer.stop()
+        self._preview_pos = None
+        if self._preview_rubber_band is not None:
+            self.iface.mapCanvas().scene().removeItem(self._preview_rubber_band)
+            self._preview_rubber_band = None
 
     def _set_reference_from_rect(self, map_rect: QgsRectangle) -> None:
         if map_rect.isEmpty():
@@ -232,7 +484,7 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
         canvas = self.iface.mapCanvas()
         # Walk line layers first; only consider polygon layers if no line was found,
         # so a polygon under a line does not steal the reference.
-        found: list[tuple[QgsVectorLayer, QgsFeature, QgsRectangle, QgsGeometry]] = []
+        found: list[tuple[QgsVectorLayer, QgsFeature, QgsRectangle]] = []
         for preferred in (QgsWkbTypes.LineGeometry, QgsWkbTypes.PolygonGeometry):
             for canvas_layer in canvas.layers():
                 if not isinstance(canvas_layer, QgsVectorLayer):
@@ -240,13 +492,8 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
                 if canvas_layer.geometryType() != preferred:
                     continue
                 layer_rect = self._transform_rect_to_layer(map_rect, canvas_layer)
-                rect_geom = QgsGeometry.fromRect(layer_rect)
-                request = QgsFeatureRequest().setFilterRect(layer_rect)
-                found.extend(
-                    (canvas_layer, feature, layer_rect, rect_geom)
-                    for feature in canvas_layer.getFeatures(request)
-                    if feature.geometry().intersects(rect_geom)
-                )
+                request = _exact_rect_request(layer_rect)
+                found.extend((canvas_layer, feature, layer_rect) for feature in canvas_layer.getFeatures(request))
             if found:
                 break
 
@@ -254,10 +501,10 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
             self._show_message("No line or polygon feature in the selection.", Qgis.Info)
             return
 
-        layer, feature, layer_rect, rect_geom = found[0]
+        layer, feature, layer_rect = found[0]
         ref_geom = feature.geometry()
         if self.settings.pick_reference_segment:
-            segment = _pick_segment_in_rect(ref_geom, rect_geom, layer_rect.center())
+            segment = _pick_segment_in_rect(ref_geom, layer_rect, layer_rect.center())
             ref_geom = QgsGeometry.fromPolylineXY([QgsPointXY(segment.start), QgsPointXY(segment.end)])
         self._set_reference(ref_geom, layer.crs())
         suffix = f" ({len(found)} features in selection; using topmost)" if len(found) > 1 else ""
@@ -269,9 +516,12 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
     def _rotate_features_in_rect(self, map_rect: QgsRectangle) -> None:
         if map_rect.isEmpty() or self.reference_geom is None:
             return
+        if self._rotation_task is not None:
+            self._show_message("A rotation is still running; wait for it or press Esc to cancel it.", Qgis.Info)
+            return
 
         canvas = self.iface.mapCanvas()
-        rotated_count = 0
+        jobs: list[LayerJob] = []
         non_editable: list[str] = []
 
         for canvas_layer in canvas.layers():
@@ -282,67 +532,84 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
                 continue
 
             layer_rect = self._transform_rect_to_layer(map_rect, canvas_layer)
-            rect_geom = QgsGeometry.fromRect(layer_rect)
-            request = QgsFeatureRequest().setFilterRect(layer_rect)
-            features = [f for f in canvas_layer.getFeatures(request) if f.geometry().intersects(rect_geom)]
-            if not features:
-                continue
-
             if not canvas_layer.isEditable():
-                non_editable.append(canvas_layer.name())
+                request = _exact_rect_request(layer_rect).setLimit(1)
+                if next(iter(canvas_layer.getFeatures(request)), None) is not None:
+                    non_editable.append(canvas_layer.name())
                 continue
 
-            kind: Kind = "line" if geom_type == QgsWkbTypes.LineGeometry else "polygon"
-            layer_rotated = self._rotate_layer_features(canvas_layer, features, kind, layer_rect=layer_rect)
-            rotated_count += layer_rotated
+            jobs.append(
+                LayerJob(
+                    layer_id=canvas_layer.id(),
+                    source=QgsVectorLayerFeatureSource(canvas_layer),
+                    rect=layer_rect,
+                    # Its own instance: the task builds the segment index lazily off the GUI thread.
+                    reference=ReferenceFeature.from_geometry(self._reference_for_layer(canvas_layer)),
+                    kind="line" if geom_type == QgsWkbTypes.LineGeometry else "polygon",
+                )
+            )
+
+        if not jobs:
+            self._report_bulk_result(0, non_editable)
+            return
+
+        task = BulkRotationTask(
+            jobs,
+            by_longest=self.settings.by_longest,
+            pick_target_segment=self.settings.pick_target_segment,
+            on_finished=partial(self._finish_bulk_rotation, non_editable=non_editable),
+        )
+        self._rotation_task = task
+        self._show_progress(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def _finish_bulk_rotation(self, task: BulkRotationTask, completed: bool, *, non_editable: list[str]) -> None:  # noqa: FBT001
+        self._rotation_task = None
+        self._clear_progress()
+        self._clear_preview()
+        if task.exception is not None:
+            self._show_message(f"Rotation failed: {task.exception}", Qgis.Critical)
+            return
+        if not completed:
+            self._show_message("Rotation cancelled; no features were changed.", Qgis.Info)
+            return
 
+        rotated_count = 0
+        for layer_id, geometries in task.rotated.items():
+            layer = QgsProject.instance().mapLayer(layer_id)
+            if not isinstance(layer, QgsVectorLayer) or not layer.isEditable():
+                # Removed from the project or taken out of edit mode while the task was running.
+                continue
+            rotated_count += self._apply_rotated_geometries(layer, geometries)
         self._report_bulk_result(rotated_count, non_editable)
 
-    def _rotate_layer_features(
-        self,
-        layer: QgsVectorLayer,
-        features: list[QgsFeature],
-        kind: Kind,
-        *,
-        layer_rect: QgsRectangle | None = None,
-    ) -> int:
-        reference = self._reference_for_layer(layer)
-        pick_target = self.settings.pick_target_segment and layer_rect is not None
-        rect_geom: QgsGeometry | None = None
-        rect_center: QgsPointXY | None = None
-        if pick_target and layer_rect is not None:
-            rect_geom = QgsGeometry.fromRect(layer_rect)
-            rect_center = layer_rect.center()
-
-        layer.beginEditCommand("Parallel to Line (bulk)")
-        layer_rotated = 0
+    def _apply_rotated_geometries(self, layer: QgsVectorLayer, geometries: dict[int, QgsGeometry]) -> int:
+        canvas = self.iface.mapCanvas()
+        # Every change triggers canvas refresh requests; frozen, the canvas redraws once at the end.
+        canvas.freeze()
         try:
-            for feature in features:
-                feature_geom = feature.geometry()
-                target_segment: Segment | None = None
-                if pick_target and rect_geom is not None and rect_center is not None:
-                    target_segment = _pick_segment_in_rect(feature_geom, rect_geom, rect_center)
-                rotated = compute_parallel_geometry(
-                    reference,
-                    feature_geom,
-                    kind,
-                    by_longest=self.settings.by_longest,
-                    target_segment=target_segment,
-                )
-                if rotated is None:
-                    continue
-                if layer.changeGeometry(feature.id(), rotated):
-                    layer_rotated += 1
-        except Exception:
-            layer.destroyEditCommand()
-            raise
-
-        if layer_rotated:
-            layer.endEditCommand()
-            layer.triggerRepaint()
-        else:
-            layer.destroyEditCommand()
-        return layer_rotated
+            return _commit_geometries(layer, geometries, "Parallel to Line (bulk)")
+        finally:
+            canvas.freeze(frozen=False)
+            canvas.refresh()
+
+    def _show_progress(self, task: BulkRotationTask) -> None:
+        message_bar = self.iface.messageBar()
+        widget = message_bar.createMessage("Parallel to Line", "Rotating features...")
+        progress_bar = QProgressBar(widget)
+        progress_bar.setMaximum(100)
+        task.progressChanged.connect(lambda value: progress_bar.setValue(int(value)))
+        cancel_button = QPushButton("Cancel", widget)
+        cancel_button.clicked.connect(task.cancel)
+        widget.layout().addWidget(progress_bar)
+        widget.layout().addWidget(cancel_button)
+        self._progress_message = message_bar.pushWidget(widget, Qgis.Info)
+
+    def _clear_progress(self) -> None:
+        if self._progress_message is None:
+            return
+        self.iface.messageBar().popWidget(self._progress_message)
+        self._progress_message = None
 
     def _report_bulk_result(self, rotated_count: int, non_editable: list[str]) -> None:
         if rotated_count > 0 and non_editable:
@@ -363,29 +630,39 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
             self._show_message("No features to rotate in the selection.", Qgis.Info)
 
     def _point_in_layer_crs(self, map_point: QgsPointXY, layer: QgsVectorLayer) -> QgsPointXY:
-        map_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
-        layer_crs = layer.crs()
-        if not (map_crs.isValid() and layer_crs.isValid()) or map_crs == layer_crs:
-            return map_point
-        transform = QgsCoordinateTransform(map_crs, layer_crs, QgsProject.instance())
-        return transform.transform(map_point)
+        transform = self._transform(self.iface.mapCanvas().mapSettings().destinationCrs(), layer.crs())
+        return map_point if transform is None else transform.transform(map_point)
 
     def _transform_rect_to_layer(self, map_rect: QgsRectangle, layer: QgsVectorLayer) -> QgsRectangle:
-        map_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
-        layer_crs = layer.crs()
-        if map_crs == layer_crs:
-            return map_rect
-        transform = QgsCoordinateTransform(map_crs, layer_crs, QgsProject.instance())
-        return transform.transformBoundingBox(map_rect)
+        transform = self._transform(self.iface.mapCanvas().mapSettings().destinationCrs(), layer.crs())
+        return map_rect if transform is None else transform.transformBoundingBox(map_rect)
+
+    def _transform(
+        self, source_crs: QgsCoordinateReferenceSystem, destination_crs: QgsCoordinateReferenceSystem
+    ) -> QgsCoordinateTransform | None:
+        """Return the cached transform between the CRSs, or None when no reprojection is needed."""
+        if not (source_crs.isValid() and destination_crs.isValid()) or source_crs == destination_crs:
+            return None
+        key = (_crs_key(source_crs), _crs_key(destination_crs))
+        if (transform := self._transforms.get(key)) is None:
+            transform = QgsCoordinateTransform(source_crs, destination_crs, QgsProject.instance())
+            self._transforms[key] = transform
+        return transform
+
+    def _clear_crs_caches(self) -> None:
+        self._transforms.clear()
+        self._layer_references.clear()
+        self._reference_features.clear()
+        self._rotations.clear()
 
     def _set_reference(self, geom: QgsGeometry, source_crs: QgsCoordinateReferenceSystem) -> None:
         self._clear_reference()
         reference = QgsGeometry(geom)
         map_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
-        if source_crs.isValid() and map_crs.isValid() and source_crs != map_crs:
-            transform = QgsCoordinateTransform(source_crs, map_crs, QgsProject.instance())
+        if (transform := self._transform(source_crs, map_crs)) is not None:
             reference.transform(transform)
         self.reference_geom = reference
+        self.reference_crs = map_crs
         wkb = QgsWkbTypes.geometryType(reference.wkbType())
         rubber_band = QgsRubberBand(self.iface.mapCanvas(), wkb)
         rubber_band.setColor(self.REFERENCE_COLOR)
@@ -396,20 +673,33 @@ class ParallelToLineMapTool(QgsMapToolIdentifyFeature):
         self.reference_rubber_band = rubber_band
 
     def _reference_for_layer(self, layer: QgsVectorLayer) -> QgsGeometry:
-        if self.reference_geom is None:
+        if self.reference_geom is None or self.reference_crs is None:
             msg = "reference must be set before rotation"
             raise RuntimeError(msg)
-        map_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
         layer_crs = layer.crs()
-        if not (map_crs.isValid() and layer_crs.isValid()) or map_crs == layer_crs:
+        if (transform := self._transform(self.reference_crs, layer_crs)) is None:
             return self.reference_geom
-        transform = QgsCoordinateTransform(map_crs, layer_crs, QgsProject.instance())
-        result = QgsGeometry(self.reference_geom)
-        result.transform(transform)
+        key = _crs_key(layer_crs)
+        if (result := self._layer_references.get(key)) is None:
+            result = QgsGeometry(self.reference_geom)
+            result.transform(transform)
+            self._layer_references[key] = result
+        return result
+
+    def _reference_feature_for_layer(self, layer: QgsVectorLayer) -> ReferenceFeature:
+        key = _crs_key(layer.crs())
+        if (result := self._reference_features.get(key)) is None:
+            result = ReferenceFeature.from_geometry(self._reference_for_layer(layer))
+            self._reference_features[key] = result
         return result
 
     def _clear_reference(self) -> None:
         self.reference_geom = None
+        self.reference_crs = None
+        self._layer_references.clear()
+        self._reference_features.clear()
+        self._rotations.clear()
+        self._clear_preview()
         if self.reference_rubber_band is not None:
             self.iface.mapCanvas().scene().removeItem(self.reference_rubber_band)
             self.reference_rubber_band = None
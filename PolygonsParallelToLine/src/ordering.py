@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import numpy as np
+
+# Cells per axis of the Hilbert curve grid is 2**HILBERT_BITS; 16 bits keep the keys well inside int64.
+HILBERT_BITS = 16
+
+
+def hilbert_keys(x: np.ndarray, y: np.ndarray, bits: int = HILBERT_BITS) -> np.ndarray:
+    """Position of every point along a Hilbert curve laid over the bounding box of all points."""
+    side = (1 << bits) - 1
+    cells = []
+    for values in (np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)):
+        low, span = (float(values.min()), float(np.ptp(values))) if values.size else (0.0, 0.0)
+        scale = side / span if span > 0 else 0.0
+        cells.append(((values - low) * scale).astype(np.int64))
+    cx, cy = cells
+
+    keys = np.zeros(cx.shape, dtype=np.int64)
+    s = 1 << (bits - 1)
+    while s > 0:
+        rx = (cx & s) > 0
+        ry = (cy & s) > 0
+        keys += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve inside it starts and ends next to the neighbouring quadrants.
+        flip = rx & ~ry
+        cx = np.where(flip, side - cx, cx)
+        cy = np.where(flip, side - cy, cy)
+        cx, cy = np.where(ry, cx, cy), np.where(ry, cy, cx)
+        s >>= 1
+    return keys
+
+
+def hilbert_order(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Indices that sort the points along the Hilbert curve; points in the same cell keep their order."""
+    return np.argsort(hilbert_keys(x, y), kind="stable")
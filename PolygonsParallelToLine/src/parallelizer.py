@@ -3,18 +3,18 @@ from __future__ import annotations
 import math
 from typing import Literal
 
+import numpy as np
 from qgis.core import Qgis, QgsFeature, QgsGeometry
 
-from .azimuth import calc_delta_azimuth
-from .reference import ReferenceFeature, Segment, iter_segments
+from .azimuth import calc_delta_azimuth, calc_delta_azimuths
+from .kernel import ABSOLUTE_TOLERANCE
+from .reference import ReferenceFeature, Segment, SegmentIndex
 from .rotator import TargetRotator
 from .target import Target
 
-ABSOLUTE_TOLERANCE = 1e-8
-
 
 def compute_parallel_geometry(  # noqa: PLR0913
-    reference_geom: QgsGeometry,
+    reference: QgsGeometry | ReferenceFeature,
     target_geom: QgsGeometry,
     target_kind: Literal["line", "polygon"],
     *,
@@ -22,7 +22,12 @@ def compute_parallel_geometry(  # noqa: PLR0913
     target_segment: Segment | None = None,
     angle_threshold: float = math.inf,
 ) -> QgsGeometry | None:
-    reference = ReferenceFeature.from_geometry(reference_geom)
+    """
+    Rotation of one target parallel to `reference`, or None when it is left unchanged. Callers rotating several
+    targets against the same reference pass a ReferenceFeature, so its segment index is built only once.
+    """
+    if isinstance(reference, QgsGeometry):
+        reference = ReferenceFeature.from_geometry(reference)
 
     if target_kind == "polygon" and target_segment is None:
         target_feature = QgsFeature()
@@ -58,7 +63,8 @@ def compute_parallel_geometry(  # noqa: PLR0913
 
 
 def _pick_target_segment(target_geom: QgsGeometry, ref_segment: Segment, *, by_longest: bool) -> Segment:
-    segments = list(iter_segments(target_geom))
+    # argmax/argmin return the first of equal candidates, i.e. the first segment in ring order.
+    segments = SegmentIndex.from_any_geometry(target_geom)
     if by_longest:
-        return max(segments, key=lambda s: s.length)
-    return min(segments, key=lambda s: abs(calc_delta_azimuth(ref_segment.azimuth, s.azimuth)))
+        return segments.segment(int(np.argmax(segments.lengths)))
+    return segments.segment(int(np.argmin(np.abs(calc_delta_azimuths(ref_segment.azimuth, segments.azimuth)))))
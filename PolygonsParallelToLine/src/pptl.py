@@ -1,26 +1,73 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import dataclasses
-from functools import cached_property
-from typing import TYPE_CHECKING, Literal
+from functools import cached_property, partial
+from itertools import islice
+import math
+import multiprocessing
+from pathlib import Path
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Literal
 
+import numpy as np
 from qgis.core import (
     QgsFeature,
+    QgsFeatureRequest,
     QgsFeatureSink,
     QgsFields,
+    QgsGeometry,
     QgsProcessingException,
     QgsProcessingFeatureSource,
+    QgsRectangle,
     QgsWkbTypes,
 )
 
 from .const import COLUMN_NAME
-from .parallelizer import compute_parallel_geometry
-from .reference import ReferenceLayer
+from .incremental import IncrementalCache, run_key
+from .index_cache import CachedReferences
+from .ordering import hilbert_order
+from .processor import ShapelyTargetProcessor, TargetProcessor
+from .reference import ReferenceLayer, TileReferenceLayer
+from .shapely_backend import shapely_available
+from .sink import WRITE_BATCH_SIZE, DeferredResults, SpilledResults, buffered_sink
+from .stats import REUSED, RunStats
 from .target import Target
+from .worker import init_worker, process_chunk
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from concurrent.futures import Future
+    from multiprocessing.context import BaseContext
+
     from qgis.core import QgsProcessingFeedback
 
+    from .index_cache import CacheLocation
+    from .sink import BufferedSink
+
+# Most targets handed to the batch engine at once; large enough to amortise the NumPy call overhead.
+CHUNK_SIZE = 512
+# Cancellation and progress are checked between chunks, so chunks start small and are resized to take about
+# CHUNK_SECONDS each: doubled while faster than half of it, halved (down to one target) while slower.
+INITIAL_CHUNK_SIZE = 8
+CHUNK_SECONDS = 0.25
+# Chunks queued per worker process; bounds the memory held by features waiting for their results.
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+# Target traversal orders (Params.traversal): provider order; along a Hilbert curve over the target bounding
+# box centres with the output in provider order; along the curve with the output left in that order.
+PROVIDER_ORDER = "provider"
+SPATIAL_ORDER = "spatial"
+SPATIAL_ORDER_SORTED = "spatial_sorted"
+TRAVERSAL_ORDERS = (PROVIDER_ORDER, SPATIAL_ORDER, SPATIAL_ORDER_SORTED)
+# Geometry backends (Params.backend): QgsGeometry and the reference index of reference.py; Shapely 2 arrays and
+# an STRtree, see shapely_backend.py.
+QGIS_BACKEND = "qgis"
+SHAPELY_BACKEND = "shapely"
+GEOMETRY_BACKENDS = (QGIS_BACKEND, SHAPELY_BACKEND)
+
 
 @dataclasses.dataclass
 class Params:
@@ -32,6 +79,26 @@ class Params:
     angle: float
     fields: QgsFields
     sink: QgsFeatureSink
+    workers: int = 1
+    low_memory: bool = False
+    write_batch_size: int = WRITE_BATCH_SIZE
+    profile: bool = False
+    profile_report: str = ""
+    incremental_cache: str = ""
+    reference_index_cache: CacheLocation | None = None
+    traversal: str = PROVIDER_ORDER
+    tile_size: float = 0.0
+    candidates: int = 1
+    backend: str = QGIS_BACKEND
+
+
+@dataclasses.dataclass
+class _Split:
+    """A chunk split into results reused from the incremental cache and positions that need processing."""
+
+    digests: list[bytes]
+    rotated_wkbs: list[bytes | None]
+    misses: list[int]
 
 
 class ParallelToReference:
@@ -39,62 +106,404 @@ class ParallelToReference:
         self.feedback = feedback
         self.params = params
         self.total_number: int = self.params.target_layer.featureCount()
+        self.processed_number = 0
+        self.progress = -1
+        self.chunk_size = min(INITIAL_CHUNK_SIZE, CHUNK_SIZE)
+        self.stats = RunStats(enabled=self.params.profile or bool(self.params.profile_report))
+        self.cache: IncrementalCache | None = None
+        # Rotated WKB by target ID, held back until every target is processed when the output is in provider
+        # order but the targets are not (see defers_output).
+        self.deferred = SpilledResults() if self.tiled and self.defers_output else DeferredResults()
 
     @cached_property
     def reference_layer(self) -> ReferenceLayer:
-        return ReferenceLayer(self.params.reference_layer)
+        with self.stats.stage("reference index"):
+            if self.params.reference_index_cache is not None:
+                cached = self.load_cached_references(self.params.reference_index_cache)
+                if cached is not None:
+                    return ReferenceLayer.from_cache(self.params.reference_layer, cached)
+            return ReferenceLayer(self.params.reference_layer, low_memory=self.params.low_memory)
+
+    def load_cached_references(self, location: CacheLocation) -> CachedReferences | None:
+        if (cached := location.load()) is not None:
+            self.feedback.pushInfo(f"Reusing the reference index cached in {location.directory}")
+            return cached
+        request = QgsFeatureRequest().setNoAttributes()
+        cached = CachedReferences.from_features(self.params.reference_layer.getFeatures(request))
+        if cached is None:
+            self.feedback.pushInfo("Curved reference geometries cannot be cached; indexing them in memory")
+            return None
+        try:
+            location.save(cached)
+        except OSError as e:
+            self.feedback.pushWarning(f"Could not cache the reference index in {location.directory}: {e}")
+        return cached
 
     @cached_property
     def target_kind(self) -> Literal["line", "polygon"]:
         gtype = QgsWkbTypes.geometryType(self.params.target_layer.wkbType())
         return "line" if gtype == QgsWkbTypes.LineGeometry else "polygon"
 
+    @cached_property
+    def processor(self) -> TargetProcessor | ShapelyTargetProcessor:
+        if self.params.backend == SHAPELY_BACKEND:
+            options = {name: value for name, value in self.processor_options.items() if name != "candidates"}
+            reference_wkbs = (wkb for _, wkb in self.iter_reference_wkbs())
+            return ShapelyTargetProcessor(reference_wkbs, self.target_kind, **options, stats=self.stats)
+        return TargetProcessor(
+            self.reference_layer,
+            self.target_kind,
+            **self.processor_options,
+            reuse_nearest=self.reuse_nearest,
+            stats=self.stats,
+        )
+
+    @property
+    def reuse_nearest(self) -> bool:
+        return self.params.traversal != PROVIDER_ORDER
+
+    @property
+    def tiled(self) -> bool:
+        return self.params.backend != SHAPELY_BACKEND and self.params.tile_size > 0
+
+    @property
+    def defers_output(self) -> bool:
+        # Tiles are written as they are processed unless SPATIAL_ORDER asks for provider order.
+        return self.params.traversal == SPATIAL_ORDER
+
+    @property
+    def processor_options(self) -> dict[str, Any]:
+        return {
+            "by_longest": self.params.by_longest,
+            "no_multi": self.params.no_multi,
+            "distance": self.params.distance,
+            "angle": self.params.angle,
+            "candidates": self.params.candidates,
+        }
+
     def run(self) -> None:
         # pydevd_pycharm.settrace("127.0.0.1", port=53100, stdoutToServer=True, stderrToServer=True) # noqa: ERA001
         self.validate_target_layer()
-        self.rotate_features()
+        if self.params.incremental_cache:
+            self.cache = self.open_cache()
+        # A run that fails leaves the incremental cache as it was; a cancelled one still merges its results.
+        with self.cache or nullcontext():
+            self.rotate_all_features()
+            if self.cache is not None:
+                self.cache.close(completed=not self.feedback.isCanceled())
+        if self.stats.enabled:
+            self.stats.report(self.feedback, self.params.profile_report)
+
+    def rotate_all_features(self) -> None:
+        if self.params.backend == SHAPELY_BACKEND:
+            self.validate_shapely_backend()
+            self.rotate_features()
+        elif self.tiled:
+            self.validate_tiled_mode()
+            self.rotate_features_tiled()
+        elif self.params.workers > 1 and self.params.low_memory:
+            # Worker processes cannot read from the provider, so each would need its own copy of the references.
+            self.feedback.pushWarning("Low memory mode runs in the current process; the number of workers is ignored")
+            self.rotate_features()
+        elif self.params.workers > 1:
+            self.rotate_features_in_pool()
+        else:
+            self.rotate_features()
 
     def validate_target_layer(self) -> None:
         if not self.total_number:
             msg = "Target layer is empty"
             raise QgsProcessingException(msg)
 
+    def validate_shapely_backend(self) -> None:
+        if not shapely_available():
+            msg = "The Shapely geometry backend needs Shapely 2 or newer installed in the QGIS Python environment"
+            raise QgsProcessingException(msg)
+        ignored = [
+            name
+            for name, is_set in (
+                ("number of workers", self.params.workers > 1),
+                ("low memory mode", self.params.low_memory),
+                ("tile size", self.params.tile_size > 0),
+                ("reference candidates", self.params.candidates > 1),
+                ("reference index cache", self.params.reference_index_cache is not None),
+            )
+            if is_set
+        ]
+        if ignored:
+            self.feedback.pushWarning(
+                f"The Shapely geometry backend runs in the current process; ignoring the {', '.join(ignored)}"
+            )
+
+    def validate_tiled_mode(self) -> None:
+        ignored = [
+            name
+            for name, is_set in (
+                ("number of workers", self.params.workers > 1),
+                ("low memory mode", self.params.low_memory),
+                ("reference index cache", self.params.reference_index_cache is not None),
+            )
+            if is_set
+        ]
+        if ignored:
+            self.feedback.pushWarning(
+                f"Tiled mode runs in the current process and loads the references tile by tile; "
+                f"ignoring the {', '.join(ignored)}"
+            )
+
+    def open_cache(self) -> IncrementalCache:
+        options = {**self.processor_options, "target_kind": self.target_kind, "backend": self.params.backend}
+        key = run_key(self.iter_reference_wkbs(), options)
+        return IncrementalCache(self.params.incremental_cache, key)
+
     def rotate_features(self) -> None:
-        total = 100.0 / self.total_number
+        with buffered_sink(self.params.sink, self.params.write_batch_size, self.stats) as sink:
+            for chunk in self.iter_chunks():
+                if self.feedback.isCanceled():
+                    break
 
-        for i, feature in enumerate(self.params.target_layer.getFeatures(), start=1):
-            if self.feedback.isCanceled():
-                break
+                started = time.perf_counter()
+                self.write(sink, chunk, self.process_chunk(chunk))
+                self.adapt_chunk_size(time.perf_counter() - started)
+                self.report_progress(len(chunk))
+            self.write_deferred(sink)
 
-            processed = self.process_feature(feature)
-            self.params.sink.addFeature(processed, QgsFeatureSink.FastInsert)
-            self.feedback.setProgress(int(i * total))
+    def rotate_features_tiled(self) -> None:
+        # Only the targets and references around the current tile are held in memory; they are dropped with
+        # the tile.
+        with buffered_sink(self.params.sink, self.params.write_batch_size, self.stats) as sink:
+            for tile_fids, extent in self.iter_tiles():
+                if self.feedback.isCanceled():
+                    break
 
-    def process_feature(self, feature: QgsFeature) -> QgsFeature:
-        target = Target(feature)
+                with self.stats.stage("reference index"):
+                    references = TileReferenceLayer(self.params.reference_layer, extent)
+                processor = TargetProcessor(references, self.target_kind, **self.processor_options, stats=self.stats)
+                for chunk in self.iter_fid_chunks(tile_fids):
+                    if self.feedback.isCanceled():
+                        break
 
-        if self.params.no_multi and target.is_multi:
-            return self.create_new_feature(target)
+                    started = time.perf_counter()
+                    self.write(sink, chunk, self.process_chunk(chunk, processor))
+                    self.adapt_chunk_size(time.perf_counter() - started)
+                    self.report_progress(len(chunk))
+            if self.processed_number < self.total_number and not self.feedback.isCanceled():
+                self.write_untiled(sink)
+            self.write_deferred(sink)
 
-        # Selected by centroid distance; an edge of the target may be nearer to a different reference.
-        closest_reference = self.reference_layer.get_closest_feature(target.center_xy)
+    def iter_tiles(self) -> Iterator[tuple[list[int], QgsRectangle]]:
+        """
+        Group the targets into grid cells of `tile_size` over the layer extent by bounding box centre, in
+        row-major order, reading one cell at a time through a rectangle filter. Each tile comes with the
+        extent its references are loaded for: the bounding box of its targets, grown by the max distance.
+        """
+        layer_extent = self.params.target_layer.sourceExtent()
+        if layer_extent.isNull():
+            return
+        size = self.params.tile_size
+        x_origin, y_origin = layer_extent.xMinimum(), layer_extent.yMinimum()
+        columns = max(1, math.ceil(layer_extent.width() / size))
+        rows = max(1, math.ceil(layer_extent.height() / size))
 
-        if self.params.distance and closest_reference.geom.distance(target.geom) > self.params.distance:
-            return self.create_new_feature(target)
+        def cell_of(rect: QgsRectangle) -> tuple[int, int]:
+            center = rect.center()
+            column = min(columns - 1, int((center.x() - x_origin) // size))
+            return min(rows - 1, int((center.y() - y_origin) // size)), column
 
-        rotated_geom = compute_parallel_geometry(
-            closest_reference.geom,
-            target.geom,
-            self.target_kind,
-            by_longest=self.params.by_longest,
-            angle_threshold=self.params.angle,
+        for row in range(rows):
+            for column in range(columns):
+                x_min, y_min = x_origin + column * size, y_origin + row * size
+                cell = QgsRectangle(x_min, y_min, x_min + size, y_min + size)
+                request = QgsFeatureRequest().setFilterRect(cell).setNoAttributes()
+                fids, bboxes = [], []
+                for feature in self.params.target_layer.getFeatures(request):
+                    # A target meeting several cells belongs to the one holding its centre.
+                    rect = feature.geometry().boundingBox()
+                    if cell_of(rect) == (row, column):
+                        fids.append(feature.id())
+                        bboxes.append((rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum()))
+                if fids:
+                    tile_boxes = np.array(bboxes)
+                    extent = QgsRectangle(*tile_boxes[:, :2].min(axis=0), *tile_boxes[:, 2:].max(axis=0))
+                    yield fids, extent.buffered(self.params.distance)
+
+    def write_untiled(self, sink: BufferedSink) -> None:
+        # Targets without a geometry fall in no tile; they are written unchanged.
+        for chunk in self.iter_provider_chunks():
+            untiled = [feature for feature in chunk if feature.geometry().isEmpty()]
+            self.write(sink, untiled, [self.create_new_feature(Target(feature)) for feature in untiled])
+            self.report_progress(len(untiled))
+
+    def rotate_features_in_pool(self) -> None:
+        # Chunks are submitted in provider order and written back strictly in that order (FIFO), so
+        # the output is identical to a single-process run. Queued chunks keep the workers busy while the
+        # current one is awaited, so they are not resized.
+        self.chunk_size = CHUNK_SIZE
+        max_in_flight = self.params.workers * CHUNKS_IN_FLIGHT_PER_WORKER
+        pending: deque[tuple[list[QgsFeature], _Split, Future[tuple[list[bytes | None], dict[str, Any] | None]]]] = (
+            deque()
+        )
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.params.workers,
+            mp_context=_spawn_context(),
+            initializer=partial(init_worker, profile=self.stats.enabled, reuse_nearest=self.reuse_nearest),
+            initargs=(list(self.iter_reference_wkbs()), self.target_kind, self.processor_options),
+        )
+        with executor, buffered_sink(self.params.sink, self.params.write_batch_size, self.stats) as sink:
+            chunks = self.iter_chunks()
+            while not self.feedback.isCanceled():
+                while len(pending) < max_in_flight and (chunk := next(chunks, None)) is not None:
+                    split = self.split_cached(chunk)
+                    target_wkbs = [bytes(chunk[i].geometry().asWkb()) for i in split.misses]
+                    pending.append((chunk, split, executor.submit(process_chunk, target_wkbs)))
+                if not pending:
+                    break
+
+                chunk, split, future = pending.popleft()
+                rotated_wkbs, worker_stats = future.result()
+                if worker_stats is not None:
+                    self.stats.merge(worker_stats)
+                self.write(sink, chunk, self.finish_chunk(chunk, split, rotated_wkbs))
+                self.report_progress(len(chunk))
+
+            for _, _, future in pending:
+                future.cancel()
+            self.write_deferred(sink)
+
+    def iter_reference_wkbs(self) -> Iterator[tuple[int, bytes]]:
+        request = QgsFeatureRequest().setNoAttributes()
+        for feature in self.params.reference_layer.getFeatures(request):
+            yield feature.id(), bytes(feature.geometry().asWkb())
+
+    def iter_chunks(self) -> Iterator[list[QgsFeature]]:
+        if self.params.traversal == PROVIDER_ORDER:
+            yield from self.iter_provider_chunks()
+            return
+        yield from self.iter_fid_chunks(self.spatial_order_fids())
+
+    def iter_provider_chunks(self) -> Iterator[list[QgsFeature]]:
+        features = self.params.target_layer.getFeatures()
+        while chunk := list(islice(features, self.chunk_size)):
+            yield chunk
+
+    def iter_fid_chunks(self, fids: list[int]) -> Iterator[list[QgsFeature]]:
+        start = 0
+        while start < len(fids):
+            chunk_fids = fids[start : start + self.chunk_size]
+            start += len(chunk_fids)
+            request = QgsFeatureRequest().setFilterFids(chunk_fids)
+            features = {feature.id(): feature for feature in self.params.target_layer.getFeatures(request)}
+            yield [features[fid] for fid in chunk_fids]
+
+    def spatial_order_fids(self) -> list[int]:
+        # Consecutive targets along the curve tend to share their closest reference and the part of the
+        # spatial index that finds it.
+        fids, bboxes = self.target_bounding_boxes()
+        centers = (bboxes[:, :2] + bboxes[:, 2:]) / 2
+        return [fids[i] for i in hilbert_order(centers[:, 0], centers[:, 1])]
+
+    def target_bounding_boxes(self) -> tuple[list[int], np.ndarray]:
+        """A first pass over the targets that only reads geometries: IDs and (xmin, ymin, xmax, ymax) rows."""
+        fids, bboxes = [], []
+        for feature in self.params.target_layer.getFeatures(QgsFeatureRequest().setNoAttributes()):
+            rect = feature.geometry().boundingBox()
+            fids.append(feature.id())
+            bboxes.append((rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum()))
+        return fids, np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+
+    def process_chunk(
+        self, features: list[QgsFeature], processor: TargetProcessor | ShapelyTargetProcessor | None = None
+    ) -> list[QgsFeature]:
+        # `processor` replaces the run-wide one (e.g. with the one of the current tile).
+        if self.cache is None:
+            targets = [Target(feature) for feature in features]
+            (processor or self.processor).process(targets)
+            return [self.create_new_feature(target) for target in targets]
+
+        split = self.split_cached(features)
+        targets = [Target(features[i]) for i in split.misses]
+        if targets:
+            # Skipped when the whole chunk is cached, so a fully cached run never builds the reference index.
+            (processor or self.processor).process(targets)
+        rotated_wkbs = [bytes(target.geom.asWkb()) if target.is_rotated else None for target in targets]
+        return self.finish_chunk(features, split, rotated_wkbs)
+
+    def split_cached(self, features: list[QgsFeature]) -> _Split:
+        if self.cache is None:
+            return _Split(digests=[], rotated_wkbs=[None] * len(features), misses=list(range(len(features))))
+        digests, rotated_wkbs, misses = self.cache.split(features)
+        self.stats.count(REUSED, len(features) - len(misses))
+        return _Split(digests=digests, rotated_wkbs=rotated_wkbs, misses=misses)
+
+    def finish_chunk(
+        self, features: list[QgsFeature], split: _Split, rotated_wkbs: Iterable[bytes | None]
+    ) -> list[QgsFeature]:
+        # `rotated_wkbs` holds the results of the cache misses only, in order.
+        for i, rotated_wkb in zip(split.misses, rotated_wkbs):
+            split.rotated_wkbs[i] = rotated_wkb
+        if self.cache is not None:
+            self.cache.record(split.digests, split.rotated_wkbs)
+        return self.merge_chunk(features, split.rotated_wkbs)
+
+    def merge_chunk(self, features: list[QgsFeature], rotated_wkbs: list[bytes | None]) -> list[QgsFeature]:
+        targets = [Target(feature) for feature in features]
+        for target, rotated_wkb in zip(targets, rotated_wkbs):
+            if rotated_wkb is not None:
+                rotated_geom = QgsGeometry()
+                rotated_geom.fromWkb(rotated_wkb)
+                target.apply_rotated_geometry(rotated_geom)
+        return [self.create_new_feature(target) for target in targets]
+
+    def write(self, sink: BufferedSink, features: list[QgsFeature], new_features: list[QgsFeature]) -> None:
+        if not self.defers_output:
+            sink.add(new_features)
+            return
+        self.deferred.add(
+            (feature.id(), bytes(new_feature.geometry().asWkb()))
+            for feature, new_feature in zip(features, new_features)
+            if new_feature[COLUMN_NAME]
         )
-        if rotated_geom is not None:
-            target.apply_rotated_geometry(rotated_geom)
-        return self.create_new_feature(target)
+
+    def write_deferred(self, sink: BufferedSink) -> None:
+        # The output of a cancelled run would be an arbitrary subset in provider order; write nothing instead.
+        try:
+            if not self.defers_output or self.feedback.isCanceled():
+                return
+            for chunk in self.iter_provider_chunks():
+                sink.add(self.merge_chunk(chunk, self.deferred.take([feature.id() for feature in chunk])))
+        finally:
+            self.deferred.close()
+
+    def adapt_chunk_size(self, seconds: float) -> None:
+        if seconds > CHUNK_SECONDS:
+            self.chunk_size = max(1, self.chunk_size // 2)
+        elif seconds < CHUNK_SECONDS / 2:
+            self.chunk_size = min(CHUNK_SIZE, self.chunk_size * 2)
+
+    def report_progress(self, processed_number: int) -> None:
+        # setProgress() repaints the progress bar; only call it when the shown percentage changes.
+        self.processed_number += processed_number
+        progress = self.processed_number * 100 // self.total_number
+        if progress != self.progress:
+            self.progress = progress
+            self.feedback.setProgress(progress)
 
     def create_new_feature(self, target: Target) -> QgsFeature:
         new_feature = QgsFeature(self.params.fields)
         new_feature.setGeometry(target.geom)
         new_feature.setAttribute(COLUMN_NAME, target.is_rotated)
         return new_feature
+
+
+def _spawn_context() -> BaseContext:
+    # "spawn" is the only start method that is safe inside a Qt application. Inside QGIS Desktop
+    # sys.executable is the QGIS binary, so point the children at the bundled Python interpreter.
+    context = multiprocessing.get_context("spawn")
+    if not Path(sys.executable).name.lower().startswith("python"):
+        prefix = Path(sys.exec_prefix)
+        for candidate in (prefix / "python.exe", prefix / "bin" / "python3", prefix / "bin" / "python"):
+            if candidate.exists():
+                context.set_executable(str(candidate))
+                break
+    return context
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Literal
+
+from qgis.core import QgsProcessingException
+
+from .batch import compute_parallel_geometries
+from .reference import NearestReferenceCursor
+from .shapely_backend import ShapelyReferences, geometries_from_wkb
+from .stats import OUT_OF_RANGE, SKIPPED_MULTI, RunStats
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .reference import ReferenceFeature, ReferenceLayer
+    from .target import Target
+
+
+class TargetProcessor:
+    def __init__(  # noqa: PLR0913
+        self,
+        reference_layer: ReferenceLayer,
+        target_kind: Literal["line", "polygon"],
+        *,
+        by_longest: bool,
+        no_multi: bool,
+        distance: float,
+        angle: float,
+        candidates: int = 1,
+        reuse_nearest: bool = False,
+        stats: RunStats | None = None,
+    ):
+        self.reference_layer = reference_layer
+        self.target_kind = target_kind
+        self.by_longest = by_longest
+        self.no_multi = no_multi
+        self.distance = distance
+        self.angle = angle
+        self.candidates = candidates
+        # Worth its extra runner-up lookups only when consecutive targets are close, i.e. in spatial order.
+        self.nearest: ReferenceLayer | NearestReferenceCursor = (
+            NearestReferenceCursor(reference_layer) if reuse_nearest else reference_layer
+        )
+        self.stats = stats if stats is not None else RunStats(enabled=False)
+
+    def process(self, targets: list[Target]) -> None:
+        matched: list[tuple[Target, ReferenceFeature]] = []
+
+        for target in targets:
+            if self.no_multi and target.is_multi:
+                self.stats.count(SKIPPED_MULTI)
+                continue
+
+            if self.distance:
+                # Any geometry within the distance of the target has its bounding box inside this rectangle, so
+                # targets with no reference box in it are out of range without touching reference geometries.
+                with self.stats.stage("distance check"):
+                    search_rect = target.geom.boundingBox().buffered(self.distance)
+                    in_range = self.reference_layer.intersects(search_rect)
+                if not in_range:
+                    self.stats.count(OUT_OF_RANGE)
+                    continue
+
+            with self.stats.stage("nearest neighbour"):
+                closest_reference, target_distance = self.get_closest_reference(target)
+
+            if self.distance:
+                with self.stats.stage("distance check"):
+                    in_range = (
+                        target_distance <= self.distance
+                        if target_distance is not None
+                        else (
+                            closest_reference.geom.boundingBox().intersects(search_rect)
+                            and closest_reference.distance(target.geom) <= self.distance
+                        )
+                    )
+                if not in_range:
+                    self.stats.count(OUT_OF_RANGE)
+                    continue
+
+            matched.append((target, closest_reference))
+
+        outcomes: list[str] = []
+        with self.stats.stage("rotation"):
+            rotated_geoms = compute_parallel_geometries(
+                [reference for _, reference in matched],
+                [target.geom for target, _ in matched],
+                self.target_kind,
+                by_longest=self.by_longest,
+                angle_threshold=self.angle,
+                centers=[target.center_xy for target, _ in matched],
+                outcomes=outcomes if self.stats.enabled else None,
+            )
+            for (target, _), rotated_geom in zip(matched, rotated_geoms):
+                if rotated_geom is not None:
+                    target.apply_rotated_geometry(rotated_geom)
+        for outcome in outcomes:
+            self.stats.count(outcome)
+
+    def get_closest_reference(self, target: Target) -> tuple[ReferenceFeature, float | None]:
+        """Return the closest reference and, when it was measured on the way, its distance to the target."""
+        if self.candidates > 1:
+            return self.reference_layer.get_closest_feature_to_geometry(target.geom, self.candidates)
+        # Selected by centroid distance; an edge of the target may be nearer to a different reference.
+        return self.nearest.get_closest_feature(target.center_xy), None
+
+
+class ShapelyTargetProcessor:
+    """
+    TargetProcessor on the Shapely backend: targets cross over as WKB, the nearest reference lookup, distance
+    check and rotation angles run on whole chunks in shapely_backend.py, and QgsGeometry.rotate() applies the
+    angles, so Z and M values are kept. Curved geometries are not supported.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        reference_wkbs: Iterable[bytes],
+        target_kind: Literal["line", "polygon"],
+        *,
+        by_longest: bool,
+        no_multi: bool,
+        distance: float,
+        angle: float,
+        stats: RunStats | None = None,
+    ):
+        self.stats = stats if stats is not None else RunStats(enabled=False)
+        with self.stats.stage("reference index"):
+            try:
+                self.references = ShapelyReferences(geometries_from_wkb(list(reference_wkbs)))
+            except ValueError as e:
+                raise QgsProcessingException(str(e)) from e
+        self.target_kind = target_kind
+        self.by_longest = by_longest
+        self.no_multi = no_multi
+        self.distance = distance
+        self.angle = angle
+
+    def process(self, targets: list[Target]) -> None:
+        outcomes: list[str] = []
+        with self.stats.stage("rotation"):
+            try:
+                angles, _ = self.references.rotation_angles(
+                    geometries_from_wkb([bytes(target.geom.asWkb()) for target in targets]),
+                    self.target_kind,
+                    by_longest=self.by_longest,
+                    no_multi=self.no_multi,
+                    distance=self.distance,
+                    angle_threshold=self.angle,
+                    outcomes=outcomes if self.stats.enabled else None,
+                )
+            except ValueError as e:
+                raise QgsProcessingException(str(e)) from e
+            for target, angle in zip(targets, angles.tolist()):
+                if not math.isnan(angle):
+                    target.rotate(angle)
+        for outcome in outcomes:
+            self.stats.count(outcome)
@@ -1,20 +1,41 @@
 from __future__ import annotations
 
 from functools import cached_property
+import math
 from typing import TYPE_CHECKING
 
-from qgis.core import QgsPoint, QgsProcessingException, QgsSpatialIndex, QgsWkbTypes
+import numpy as np
+from qgis.core import (
+    QgsFeatureRequest,
+    QgsGeometry,
+    QgsPoint,
+    QgsPointXY,
+    QgsProcessingException,
+    QgsRectangle,
+    QgsSpatialIndex,
+    QgsWkbTypes,
+)
+
+from .cache import LRUCache
+from .index_cache import bulk_spatial_index
+from .kernel import SEGMENT_EPSILON, ring_segments, segment_azimuths, segment_sqr_distances
+from .wkb import parse_rings, read_xy
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator
+    from collections.abc import Iterable, Iterator
 
     from qgis.core import (
         QgsFeature,
-        QgsGeometry,
-        QgsPointXY,
+        QgsGeometryEngine,
         QgsProcessingFeatureSource,
     )
 
+    from .index_cache import CachedReferences
+
+# Vertex budget of the prepared references kept per layer. Least recently used ones are dropped beyond it
+# and rebuilt (or, in low-memory mode, re-fetched from the provider) when a target needs them again.
+REFERENCE_CACHE_VERTICES = 1_000_000
+
 
 class ReferenceFeature:
     def __init__(self, feature: QgsFeature):
@@ -26,29 +47,378 @@ class ReferenceFeature:
         obj.geom = geom
         return obj
 
+    @cached_property
+    def segment_index(self) -> SegmentIndex | None:
+        return SegmentIndex.from_geometry(self.geom)
+
+    @cached_property
+    def engine(self) -> QgsGeometryEngine:
+        # GEOS builds its prepared structures once and reuses them for every target sharing this reference.
+        engine = QgsGeometry.createGeometryEngine(self.geom.constGet())
+        engine.prepareGeometry()
+        return engine
+
+    @property
+    def vertex_count(self) -> int:
+        return self.geom.constGet().nCoordinates()
+
+    def distance(self, geom: QgsGeometry) -> float:
+        return self.engine.distance(geom.constGet())
+
     def get_closest_segment(self, point_xy: QgsPointXY) -> Segment:
-        sqr_dist, _, next_vertex_idx, _ = self.geom.closestSegmentWithContext(point_xy)
-        if sqr_dist < 0 or next_vertex_idx <= 0:
-            msg = f"Reference geometry has no valid segment near {point_xy}"
-            raise QgsProcessingException(msg)
-        start, end = self.geom.vertexAt(next_vertex_idx - 1), self.geom.vertexAt(next_vertex_idx)
-        return Segment(start=start, end=end)
+        if self.segment_index is not None:
+            return self.segment_index.segment(self.segment_index.closest(point_xy))
+
+        # Curved references have no plain vertex layout; let QGIS walk them.
+        return closest_segment(self.geom, point_xy)
+
+    def get_closest_azimuth(self, point_xy: QgsPointXY) -> float:
+        if self.segment_index is not None:
+            return float(self.segment_index.azimuth[self.segment_index.closest(point_xy)])
+        return self.get_closest_segment(point_xy).azimuth
 
 
 class ReferenceLayer:
-    def __init__(self, source: QgsProcessingFeatureSource):
-        self.id_feature_map: dict[int, QgsFeature] = {x.id(): x for x in source.getFeatures()}
+    def __init__(self, source: QgsProcessingFeatureSource, *, low_memory: bool = False):
+        if low_memory:
+            self.index_bounding_boxes(source)
+        else:
+            self.index_features(source.getFeatures())
+
+    @classmethod
+    def from_features(cls, features: Iterable[QgsFeature]) -> ReferenceLayer:
+        obj = cls.__new__(cls)
+        obj.index_features(features)
+        return obj
+
+    @classmethod
+    def from_cache(cls, source: QgsProcessingFeatureSource, cached: CachedReferences) -> ReferenceLayer:
+        # Looked up like low-memory mode, but bounding boxes and segments come from the memory-mapped cache
+        # instead of a full read of the provider; geometries are still fetched for the references in use.
+        obj = cls.__new__(cls)
+        obj.source = source
+        obj.id_feature_map = {}
+        obj.spatial_index = cached.spatial_index()
+        obj.cached = cached
+        obj.init_reference_cache()
+        return obj
+
+    def index_features(self, features: Iterable[QgsFeature]) -> None:
+        self.source: QgsProcessingFeatureSource | None = None
+        self.cached: CachedReferences | None = None
+        self.id_feature_map: dict[int, QgsFeature] = {x.id(): x for x in features}
         self.spatial_index = QgsSpatialIndex(flags=QgsSpatialIndex.FlagStoreFeatureGeometries)
         self.spatial_index.addFeatures(self.id_feature_map.values())
+        self.init_reference_cache()
+
+    def index_bounding_boxes(self, source: QgsProcessingFeatureSource) -> None:
+        # Only bounding boxes go into the index. Geometries are fetched from the provider by ID when a
+        # target needs them and kept in an LRU cache, so memory no longer grows with the reference layer.
+        self.source = source
+        self.cached = None
+        self.id_feature_map = {}
+        self.spatial_index = QgsSpatialIndex(source.getFeatures(QgsFeatureRequest().setNoAttributes()))
+        self.init_reference_cache()
+
+    def init_reference_cache(self) -> None:
+        # One ReferenceFeature per reference ID, built on first use, so its prepared engine and segment index
+        # are shared by every target that matches it; references that never match a target cost nothing.
+        self.references: LRUCache[int, ReferenceFeature] = LRUCache(
+            REFERENCE_CACHE_VERTICES, weigh=lambda reference: reference.vertex_count + 1
+        )
+
+    def intersects(self, rect: QgsRectangle) -> bool:
+        return bool(self.spatial_index.intersects(rect))
 
     def get_closest_feature(self, point: QgsPointXY) -> ReferenceFeature:
-        closest_id = self.spatial_index.nearestNeighbor(point, 1)
+        closest_id = self.nearest_ids(point, 1)
+        if self.source is not None:
+            return self.get_closest_fetched_feature(point, closest_id[0])[0]
+        return self.fetch(closest_id[:1])[closest_id[0]]
+
+    def get_closest_feature_and_gap(self, point: QgsPointXY) -> tuple[ReferenceFeature, float]:
+        """
+        Return the closest reference and how much farther from `point` every other reference is at least.
+        A point that moves by less than half the gap keeps the same closest reference.
+        """
+        closest_ids = self.nearest_ids(point, 2)
+        if self.source is not None:
+            return self.get_closest_fetched_feature(point, closest_ids[0])
+        references = self.fetch(closest_ids[:2])
+        closest = references[closest_ids[0]]
+        if len(closest_ids) < 2:  # noqa: PLR2004
+            return closest, math.inf
+        point_geom = QgsGeometry.fromPointXY(point)
+        return closest, references[closest_ids[1]].distance(point_geom) - closest.distance(point_geom)
 
-        if not closest_id:
+    def nearest_ids(self, point: QgsPointXY, neighbors: int) -> list[int]:
+        closest_ids = self.index_fids(self.spatial_index.nearestNeighbor(point, neighbors))
+        if not closest_ids:
             msg = f"No reference features found near point {point}"
             raise QgsProcessingException(msg)
+        return closest_ids
+
+    def get_closest_feature_to_geometry(self, geom: QgsGeometry, candidates: int) -> tuple[ReferenceFeature, float]:
+        """
+        Return the reference nearest to `geom` itself, not just to its centre, among the `candidates` references
+        the index ranks nearest to it, and its distance. Candidates are measured in order of the distance between
+        bounding boxes, a lower bound of the true one, until none of the rest can be nearer than the best so far.
+        """
+        rect = geom.boundingBox()
+        closest_ids = self.index_fids(self.spatial_index.nearestNeighbor(geom, candidates))
+        if not closest_ids:
+            msg = f"No reference features found near {rect.toString()}"
+            raise QgsProcessingException(msg)
+        bounds = sorted((_rect_distance(rect, self.bounding_box(fid)), fid) for fid in closest_ids)
+        closest, closest_distance = None, math.inf
+        for bound, fid in bounds:
+            if bound >= closest_distance:
+                break
+            reference = self.fetch([fid])[fid]
+            if (distance := reference.distance(geom)) < closest_distance:
+                closest, closest_distance = reference, distance
+        return closest, closest_distance
+
+    def index_fids(self, keys: list[int]) -> list[int]:
+        # A cached index is keyed by position in the cache arrays rather than by reference ID.
+        return keys if self.cached is None else self.cached.fids_at(keys)
 
-        return ReferenceFeature(self.id_feature_map[closest_id[0]])
+    def bounding_box(self, fid: int) -> QgsRectangle:
+        if self.cached is not None:
+            x_min, y_min, x_max, y_max = self.cached.bboxes[self.cached.position(fid)].tolist()
+            return QgsRectangle(x_min, y_min, x_max, y_max)
+        if fid in self.id_feature_map:
+            return self.id_feature_map[fid].geometry().boundingBox()
+        # Low-memory mode keeps the boxes inside the index only; the reference is fetched (and cached) instead.
+        return self.fetch([fid])[fid].geom.boundingBox()
+
+    def get_closest_fetched_feature(self, point: QgsPointXY, bbox_closest_id: int) -> tuple[ReferenceFeature, float]:
+        # The nearest bounding box only bounds the true distance: every reference that may be closer has
+        # its bounding box inside the window of that radius around the point, so refine over those.
+        # References outside the window are farther than the radius, which bounds the gap to the runner-up.
+        point_geom = QgsGeometry.fromPointXY(point)
+        radius = self.fetch([bbox_closest_id])[bbox_closest_id].distance(point_geom)
+        window = QgsRectangle(point.x() - radius, point.y() - radius, point.x() + radius, point.y() + radius)
+        candidates = self.fetch(sorted({bbox_closest_id, *self.index_fids(self.spatial_index.intersects(window))}))
+        distances = sorted(
+            ((reference.distance(point_geom), reference) for reference in candidates.values()), key=lambda x: x[0]
+        )
+        runner_up = distances[1][0] if len(distances) > 1 else math.inf
+        return distances[0][1], min(runner_up, radius) - distances[0][0]
+
+    def fetch(self, fids: list[int]) -> dict[int, ReferenceFeature]:
+        references = {fid: reference for fid in fids if (reference := self.references.get(fid)) is not None}
+        missing = [fid for fid in fids if fid not in references]
+        if missing and self.source is not None:
+            request = QgsFeatureRequest().setFilterFids(missing).setNoAttributes()
+            features: Iterable[QgsFeature] = self.source.getFeatures(request)
+        else:
+            features = [self.id_feature_map[fid] for fid in missing]
+        for feature in features:
+            references[feature.id()] = ReferenceFeature(feature)
+            if self.cached is not None:
+                position = self.cached.position(feature.id())
+                references[feature.id()].segment_index = SegmentIndex(*self.cached.segments(position))
+            self.references.put(feature.id(), references[feature.id()])
+        return {fid: references[fid] for fid in fids if fid in references}
+
+
+def _rect_distance(a: QgsRectangle, b: QgsRectangle) -> float:
+    dx = max(a.xMinimum() - b.xMaximum(), b.xMinimum() - a.xMaximum(), 0.0)
+    dy = max(a.yMinimum() - b.yMaximum(), b.yMinimum() - a.yMaximum(), 0.0)
+    return math.sqrt(dx * dx + dy * dy)
+
+
+class TileReferenceLayer(ReferenceLayer):
+    """
+    The references whose bounding box meets `extent`, held like the default mode, for the targets of one
+    tile. Answers stay exact for points and rectangles reaching beyond `extent`: whenever a reference
+    outside it could be closer or intersect, the provider is asked through a rectangle filter.
+    """
+
+    def __init__(self, source: QgsProcessingFeatureSource, extent: QgsRectangle):
+        self.extent = extent
+        self.provider_source = source
+        self.index_features(source.getFeatures(QgsFeatureRequest().setFilterRect(extent).setNoAttributes()))
+
+    def intersects(self, rect: QgsRectangle) -> bool:
+        if self.extent.contains(rect):
+            return super().intersects(rect)
+        request = QgsFeatureRequest().setFilterRect(rect).setNoAttributes().setFlags(QgsFeatureRequest.NoGeometry)
+        return next(iter(self.provider_source.getFeatures(request.setLimit(1))), None) is not None
+
+    def get_closest_feature(self, point: QgsPointXY) -> ReferenceFeature:
+        # A reference that was not loaded has its bounding box outside `extent`, so it is at least as far from
+        # the point as the border of `extent`.
+        point_geom = QgsGeometry.fromPointXY(point)
+        if not self.id_feature_map:
+            return self.get_closest_provider_feature(point_geom, self.max_extent_size)[0]
+        closest = super().get_closest_feature(point)
+        radius = closest.distance(point_geom)
+        if radius <= self.border_margin(QgsRectangle(point, point)):
+            return closest
+        return self.get_closest_provider_feature(point_geom, radius)[0]
+
+    def get_closest_feature_and_gap(self, point: QgsPointXY) -> tuple[ReferenceFeature, float]:
+        return self.get_closest_feature(point), 0.0
+
+    def get_closest_feature_to_geometry(self, geom: QgsGeometry, candidates: int) -> tuple[ReferenceFeature, float]:
+        # Past the border margin the provider fallback measures every reference in its window, which can
+        # only find a nearer reference than the capped candidate list.
+        if not self.id_feature_map:
+            return self.get_closest_provider_feature(geom, self.max_extent_size)
+        closest, distance = super().get_closest_feature_to_geometry(geom, candidates)
+        if distance <= self.border_margin(geom.boundingBox()):
+            return closest, distance
+        return self.get_closest_provider_feature(geom, distance)
+
+    @property
+    def max_extent_size(self) -> float:
+        return max(self.extent.width(), self.extent.height())
+
+    def border_margin(self, rect: QgsRectangle) -> float:
+        """Distance from `rect` to the border of `extent`; negative when `rect` reaches beyond it."""
+        return min(
+            rect.xMinimum() - self.extent.xMinimum(),
+            self.extent.xMaximum() - rect.xMaximum(),
+            rect.yMinimum() - self.extent.yMinimum(),
+            self.extent.yMaximum() - rect.yMaximum(),
+        )
+
+    def get_closest_provider_feature(self, geom: QgsGeometry, radius: float) -> tuple[ReferenceFeature, float]:
+        # Grows the window until it holds a reference no farther than its radius; every reference that could
+        # be closer has its bounding box inside that window.
+        source_extent = self.provider_source.sourceExtent()
+        rect = geom.boundingBox()
+        while True:
+            window = rect.buffered(radius)
+            request = QgsFeatureRequest().setFilterRect(window).setNoAttributes()
+            candidates = [self.provider_reference(feature) for feature in self.provider_source.getFeatures(request)]
+            if candidates:
+                closest = min(candidates, key=lambda reference: reference.distance(geom))
+                distance = closest.distance(geom)
+                if distance <= radius:
+                    return closest, distance
+                radius = distance
+            elif window.contains(source_extent):
+                msg = f"No reference features found near {rect.toString()}"
+                raise QgsProcessingException(msg)
+            else:
+                radius = radius * 2 or 1.0
+
+    def provider_reference(self, feature: QgsFeature) -> ReferenceFeature:
+        if (reference := self.references.get(feature.id())) is None:
+            reference = ReferenceFeature(feature)
+            self.references.put(feature.id(), reference)
+        return reference
+
+
+class NearestReferenceCursor:
+    """
+    ReferenceLayer.get_closest_feature() for a stream of points that are mostly close to each other, such as
+    targets in spatial order. A point within half the gap (see get_closest_feature_and_gap) of the last queried
+    point gets the same reference back without a spatial index query.
+    """
+
+    def __init__(self, reference_layer: ReferenceLayer):
+        self.reference_layer = reference_layer
+        self.anchor: QgsPointXY | None = None
+        self.closest: ReferenceFeature | None = None
+        self.gap = 0.0
+
+    def get_closest_feature(self, point: QgsPointXY) -> ReferenceFeature:
+        if self.closest is not None and 2 * self.anchor.distance(point) < self.gap:
+            return self.closest
+        self.closest, self.gap = self.reference_layer.get_closest_feature_and_gap(point)
+        self.anchor = point
+        return self.closest
+
+
+class SegmentIndex:
+    """
+    The segments of one reference geometry as coordinate arrays with precomputed azimuths. Nearest-segment
+    queries reproduce QgsGeometry.closestSegmentWithContext(), including its tie-breaking (first segment
+    wins), but go through an R-tree of segment bounding boxes once the geometry is long enough.
+    """
+
+    # Below this many segments a vectorised scan beats the R-tree round trip.
+    RTREE_MIN_SEGMENTS = 64
+    # The R-tree costs a feature per segment to bulk-load, so it is only built for an index that keeps being
+    # queried; the first queries scan all segments.
+    RTREE_MIN_QUERIES = 8
+
+    def __init__(self, start: np.ndarray, end: np.ndarray, azimuth: np.ndarray | None = None):
+        self.start = start
+        self.end = end
+        if azimuth is None:
+            dx, dy = (end - start).T
+            azimuth = segment_azimuths(dx, dy)
+        self.azimuth = azimuth
+        self.queries = 0
+
+    @classmethod
+    def from_geometry(cls, geom: QgsGeometry) -> SegmentIndex | None:
+        wkb = bytes(geom.asWkb())
+        try:
+            rings = parse_rings(wkb)
+        except ValueError:
+            return None
+        return cls.from_rings([read_xy(wkb, [ring]) for ring in rings])
+
+    @classmethod
+    def from_any_geometry(cls, geom: QgsGeometry) -> SegmentIndex:
+        """from_geometry(), falling back to the straight segments QGIS approximates curves with."""
+        segment_index = cls.from_geometry(geom)
+        if segment_index is not None:
+            return segment_index
+        rings = _polyline_rings(geom)
+        return cls.from_rings(
+            [np.array([(p.x(), p.y()) for p in ring], dtype=np.float64).reshape(-1, 2) for ring in rings]
+        )
+
+    @classmethod
+    def from_rings(cls, rings: list[np.ndarray]) -> SegmentIndex:
+        return cls(*ring_segments(rings))
+
+    @property
+    def count(self) -> int:
+        return len(self.start)
+
+    @cached_property
+    def lengths(self) -> np.ndarray:
+        # Same formula as QgsPoint.distance().
+        dx, dy = (self.end - self.start).T
+        return np.sqrt(dx * dx + dy * dy)
+
+    @cached_property
+    def rtree(self) -> QgsSpatialIndex:
+        """Segment bounding boxes, keyed by segment number + 1."""
+        return bulk_spatial_index(np.hstack([np.minimum(self.start, self.end), np.maximum(self.start, self.end)]))
+
+    def closest(self, point_xy: QgsPointXY) -> int:
+        if not self.count:
+            msg = f"Reference geometry has no valid segment near {point_xy}"
+            raise QgsProcessingException(msg)
+
+        x, y = point_xy.x(), point_xy.y()
+        self.queries += 1
+        if self.count < self.RTREE_MIN_SEGMENTS or self.queries < self.RTREE_MIN_QUERIES:
+            return int(np.argmin(self.sqr_distances(x, y, slice(None))))
+
+        # Bounding-box nearest gives an upper bound on the true distance; every segment that could tie
+        # or beat it (including the epsilon snapping of sqrDistToLine) lies in the window around it.
+        nearest = np.array(self.rtree.nearestNeighbor(QgsPointXY(x, y), 1), dtype=np.int64) - 1
+        radius = math.sqrt(float(self.sqr_distances(x, y, nearest).min())) + math.sqrt(SEGMENT_EPSILON)
+        window = QgsRectangle(x - radius, y - radius, x + radius, y + radius)
+        candidates = np.sort(np.array(self.rtree.intersects(window), dtype=np.int64)) - 1
+        return int(candidates[np.argmin(self.sqr_distances(x, y, candidates))])
+
+    def sqr_distances(self, x: float, y: float, selection: slice | np.ndarray) -> np.ndarray:
+        return segment_sqr_distances(x, y, self.start[selection], self.end[selection])
+
+    def segment(self, i: int) -> Segment:
+        (x1, y1), (x2, y2) = self.start[i].tolist(), self.end[i].tolist()
+        return Segment(start=QgsPoint(x1, y1), end=QgsPoint(x2, y2))
 
 
 class Segment:
@@ -66,18 +436,25 @@ class Segment:
         return self.start.azimuth(self.end)
 
 
-def iter_segments(geom: QgsGeometry) -> Iterator[Segment]:
+def closest_segment(geom: QgsGeometry, point_xy: QgsPointXY) -> Segment:
+    """
+    One-off closest segment lookup through QgsGeometry.closestSegmentWithContext(); for a geometry queried once,
+    one C++ scan is cheaper than building a SegmentIndex.
+    """
+    sqr_dist, _, next_vertex_idx, _ = geom.closestSegmentWithContext(point_xy)
+    if sqr_dist < 0 or next_vertex_idx <= 0:
+        msg = f"Reference geometry has no valid segment near {point_xy}"
+        raise QgsProcessingException(msg)
+    return Segment(start=geom.vertexAt(next_vertex_idx - 1), end=geom.vertexAt(next_vertex_idx))
+
+
+def _polyline_rings(geom: QgsGeometry) -> Iterator[list[QgsPointXY]]:
     # Per-ring iteration so polygons with interior rings (or multipart geometries)
     # never produce a spurious segment that jumps between rings/parts.
     for part in geom.asGeometryCollection() or [geom]:
         gtype = QgsWkbTypes.geometryType(part.wkbType())
         if gtype == QgsWkbTypes.LineGeometry:
-            rings = part.asMultiPolyline() if part.isMultipart() else [part.asPolyline()]
+            yield from part.asMultiPolyline() if part.isMultipart() else [part.asPolyline()]
         elif gtype == QgsWkbTypes.PolygonGeometry:
             polygons = part.asMultiPolygon() if part.isMultipart() else [part.asPolygon()]
-            rings = [ring for poly in polygons for ring in poly]
-        else:
-            continue
-        for ring in rings:
-            for i in range(len(ring) - 1):
-                yield Segment(start=QgsPoint(ring[i]), end=QgsPoint(ring[i + 1]))
+            yield from (ring for poly in polygons for ring in poly)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Literal
+
+import numpy as np
+
+from .kernel import (
+    Chunk,
+    line_angles,
+    needs_rotation,
+    polygon_angles,
+    ring_segments,
+    rotate_xy,
+    segment_azimuths,
+    segment_sqr_distances,
+)
+from .stats import ABOVE_ANGLE, ALREADY_PARALLEL, OUT_OF_RANGE, ROTATED, SKIPPED_MULTI, UNCHANGED
+from .wkb import parse_rings, read_xy, write_xy
+
+try:
+    import shapely
+except ImportError:  # Optional: only needed when this backend is selected.
+    shapely = None
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
+# Geometry backend on Shapely 2 arrays: nearest references from an STRtree, distances and nearest points in
+# bulk GEOS calls, rotation by the array kernel. Like kernel.py, this module must not import qgis, so batch jobs
+# that hold their data as Shapely geometries can use it without QgsApplication.
+
+# Largest (points x segments) distance matrix built at once when looking up the closest reference segments.
+DISTANCE_BLOCK_SIZE = 1 << 20
+# shapely.get_type_id() of MultiPoint, MultiLineString, MultiPolygon and GeometryCollection.
+MULTI_TYPE_IDS = (4, 5, 6, 7)
+
+
+def shapely_available() -> bool:
+    return shapely is not None and int(shapely.__version__.split(".")[0]) >= 2  # noqa: PLR2004
+
+
+def require_shapely() -> None:
+    if not shapely_available():
+        msg = "The Shapely geometry backend needs Shapely 2 or newer (pip install 'shapely>=2')"
+        raise ImportError(msg)
+
+
+def geometries_from_wkb(wkbs: list[bytes]) -> np.ndarray:
+    require_shapely()
+    try:
+        return shapely.from_wkb(wkbs) if wkbs else np.empty(0, dtype=object)
+    except shapely.errors.ShapelyError as e:
+        msg = f"Shapely cannot read the geometry: {e}"
+        raise ValueError(msg) from e
+
+
+class ShapelyReferences:
+    """
+    Reference geometries with an STRtree over them; the Shapely counterpart of ReferenceLayer. The segments of
+    a reference are extracted the first time a target is matched to it and kept for the rest of the run.
+    """
+
+    def __init__(self, geometries: ArrayLike):
+        require_shapely()
+        self.geometries = np.asarray(geometries, dtype=object).reshape(-1)
+        self.tree = shapely.STRtree(self.geometries)
+        self.segments: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def nearest(self, points: np.ndarray) -> np.ndarray:
+        """Index of the reference nearest to every point geometry, the lowest one on ties; -1 when there is none."""
+        nearest = np.full(len(points), -1, dtype=np.int64)
+        if not len(points) or not len(self.geometries):
+            return nearest
+        inputs, references = self.tree.query_nearest(points, all_matches=True)
+        order = np.lexsort((references, inputs))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = inputs[order][1:] != inputs[order][:-1]
+        nearest[inputs[order][first]] = references[order][first]
+        return nearest
+
+    def segment_arrays(self, index: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Start points, end points and azimuths of the segments of reference `index`."""
+        if (segments := self.segments.get(index)) is None:
+            wkb = shapely.to_wkb(self.geometries[index])
+            start, end = ring_segments([read_xy(wkb, [ring]) for ring in parse_rings(wkb)])
+            dx, dy = (end - start).T
+            segments = self.segments[index] = start, end, segment_azimuths(dx, dy)
+        return segments
+
+    def closest_azimuths(self, reference_ids: np.ndarray, xy: np.ndarray) -> np.ndarray:
+        """
+        Azimuth of the segment of reference ``reference_ids[i]`` closest to ``xy[i]``; the first segment wins
+        ties, as in QgsGeometry.closestSegmentWithContext().
+        """
+        azimuths = np.empty(len(reference_ids))
+        order = np.argsort(reference_ids, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(reference_ids[order])) + 1)
+        for positions in groups if len(order) else []:
+            index = int(reference_ids[positions[0]])
+            start, end, azimuth = self.segment_arrays(index)
+            if not len(start):
+                msg = f"Reference geometry {index} has no valid segment"
+                raise ValueError(msg)
+            rows = max(1, DISTANCE_BLOCK_SIZE // len(start))
+            for block in range(0, len(positions), rows):
+                selected = positions[block : block + rows]
+                sqr_distances = segment_sqr_distances(xy[selected, 0:1], xy[selected, 1:2], start, end)
+                azimuths[selected] = azimuth[np.argmin(sqr_distances, axis=1)]
+        return azimuths
+
+    def rotation_angles(  # noqa: PLR0913
+        self,
+        targets: ArrayLike,
+        target_kind: Literal["line", "polygon"],
+        *,
+        by_longest: bool,
+        no_multi: bool = False,
+        distance: float = 0.0,
+        angle_threshold: float = math.inf,
+        outcomes: list[str] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the clockwise rotation angle of every target, NaN where it is left unchanged, and the target
+        centres to rotate around. When `outcomes` is given, it is filled with the stats path of each target.
+        """
+        targets = np.asarray(targets, dtype=object).reshape(-1)
+        angles = np.full(len(targets), np.nan)
+        center_xy = np.full((len(targets), 2), np.nan)
+        paths = np.full(len(targets), UNCHANGED, dtype=object)
+
+        active = ~(shapely.is_missing(targets) | shapely.is_empty(targets))
+        if no_multi:
+            multi = np.isin(shapely.get_type_id(targets), MULTI_TYPE_IDS)
+            paths[active & multi] = SKIPPED_MULTI
+            active &= ~multi
+
+        positions = np.flatnonzero(active)
+        centers = shapely.centroid(targets[positions])
+        center_xy[positions] = shapely.get_coordinates(centers)
+        nearest = self.nearest(centers)
+        if distance:
+            found = nearest >= 0
+            in_range = np.zeros(len(positions), dtype=bool)
+            in_range[found] = shapely.distance(self.geometries[nearest[found]], targets[positions[found]]) <= distance
+            paths[positions[~in_range]] = OUT_OF_RANGE
+            positions, nearest = positions[in_range], nearest[in_range]
+        elif (nearest < 0).any():
+            msg = "No reference features found near the targets"
+            raise ValueError(msg)
+
+        if len(positions):
+            wkbs = list(shapely.to_wkb(targets[positions]))
+            chunk = Chunk.from_wkbs(wkbs, [parse_rings(wkb) for wkb in wkbs])
+            if target_kind == "polygon":
+                pivot_ids = self.pivots(chunk, targets[positions], nearest)
+                ref_azimuth = self.closest_azimuths(nearest, chunk.xy[pivot_ids])
+                chunk_angles = polygon_angles(chunk, pivot_ids, ref_azimuth, angle_threshold, by_longest=by_longest)
+            else:
+                ref_azimuth = self.closest_azimuths(nearest, center_xy[positions])
+                chunk_angles = line_angles(chunk, ref_azimuth, angle_threshold, by_longest=by_longest)
+            rotate = needs_rotation(chunk_angles)
+            angles[positions[rotate]] = chunk_angles[rotate]
+            paths[positions] = np.where(
+                rotate, ROTATED, np.where(np.isnan(chunk_angles), ABOVE_ANGLE, ALREADY_PARALLEL)
+            )
+
+        if outcomes is not None:
+            outcomes[:] = paths.tolist()
+        return angles, center_xy
+
+    def pivots(self, chunk: Chunk, targets: np.ndarray, nearest: np.ndarray) -> np.ndarray:
+        """
+        Index into `chunk.xy` of the target vertex closest to the point of its reference nearest to the target,
+        like Target.get_closest_vertex_id(); of equally close vertices the last one wins, as in QGIS.
+        """
+        lines = shapely.shortest_line(self.geometries[nearest], targets)
+        points = shapely.get_coordinates(shapely.get_point(lines, 0))
+        offset = chunk.xy - points[chunk.vertex_owner]
+        sqr_distances = offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1]
+        order = np.lexsort((-np.arange(len(chunk.xy)), sqr_distances, chunk.vertex_owner))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = chunk.vertex_owner[order][1:] != chunk.vertex_owner[order][:-1]
+        return order[first]
+
+    def compute_parallel_geometries(  # noqa: PLR0913
+        self,
+        targets: ArrayLike,
+        target_kind: Literal["line", "polygon"],
+        *,
+        by_longest: bool,
+        no_multi: bool = False,
+        distance: float = 0.0,
+        angle_threshold: float = math.inf,
+        outcomes: list[str] | None = None,
+    ) -> np.ndarray:
+        """
+        Rotate every target parallel to its nearest reference, like the Processing algorithm does; return an
+        array of the rotated geometries with None where a target is left unchanged.
+        """
+        targets = np.asarray(targets, dtype=object).reshape(-1)
+        angles, center_xy = self.rotation_angles(
+            targets,
+            target_kind,
+            by_longest=by_longest,
+            no_multi=no_multi,
+            distance=distance,
+            angle_threshold=angle_threshold,
+            outcomes=outcomes,
+        )
+        rotated = np.full(len(targets), None, dtype=object)
+        positions = np.flatnonzero(~np.isnan(angles))
+        if not len(positions):
+            return rotated
+
+        # All rotated targets go through the kernel as one coordinate array.
+        wkbs = list(shapely.to_wkb(targets[positions]))
+        chunk = Chunk.from_wkbs(wkbs, [parse_rings(wkb) for wkb in wkbs])
+        rotated_xy = rotate_xy(chunk.xy, chunk.vertex_owner, angles[positions], center_xy[positions])
+        rotated_wkbs = [
+            write_xy(wkb, rings, rotated_xy[chunk.vertex_start[owner] : chunk.vertex_start[owner + 1]])
+            for owner, (wkb, rings) in enumerate(zip(chunk.wkbs, chunk.rings))
+        ]
+        rotated[positions] = shapely.from_wkb(rotated_wkbs)
+        return rotated
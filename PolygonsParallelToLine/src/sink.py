@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import sqlite3
+from typing import TYPE_CHECKING
+
+from qgis.core import QgsFeatureSink, QgsProcessingException
+
+from .incremental import LOOKUP_BATCH_SIZE
+from .stats import RunStats
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from qgis.core import QgsFeature
+
+# Features collected before one addFeatures() call; per-call overhead dominates file-based sinks otherwise.
+WRITE_BATCH_SIZE = 1000
+
+
+class BufferedSink:
+    """Collects features and hands them to the sink in batches of `batch_size`."""
+
+    def __init__(self, sink: QgsFeatureSink, batch_size: int = WRITE_BATCH_SIZE, stats: RunStats | None = None):
+        self.sink = sink
+        self.batch_size = max(batch_size, 1)
+        self.stats = stats if stats is not None else RunStats(enabled=False)
+        self.buffer: list[QgsFeature] = []
+
+    def add(self, features: list[QgsFeature]) -> None:
+        self.buffer.extend(features)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        with self.stats.stage("write"):
+            written = self.sink.addFeatures(self.buffer, QgsFeatureSink.FastInsert)
+        if not written:
+            msg = f"Could not write features to the output layer: {self.sink.lastError()}"
+            raise QgsProcessingException(msg)
+        self.buffer = []
+
+
+@contextmanager
+def buffered_sink(
+    sink: QgsFeatureSink, batch_size: int = WRITE_BATCH_SIZE, stats: RunStats | None = None
+) -> Iterator[BufferedSink]:
+    # Leaving the block normally, including a `break` on cancellation, flushes the partial batch, so every
+    # feature passed to add() is written.
+    buffered = BufferedSink(sink, batch_size, stats)
+    yield buffered
+    buffered.flush()
+
+
+class DeferredResults:
+    """Rotated WKB by target ID, held back until the output can be written in provider order."""
+
+    def __init__(self):
+        self.results: dict[int, bytes] = {}
+
+    def add(self, results: Iterable[tuple[int, bytes]]) -> None:
+        self.results.update(results)
+
+    def take(self, fids: list[int]) -> list[bytes | None]:
+        return [self.results.pop(fid, None) for fid in fids]
+
+    def close(self) -> None:
+        self.results.clear()
+
+
+class SpilledResults(DeferredResults):
+    """
+    DeferredResults in a temporary SQLite database, which SQLite moves to disk as it grows and deletes on
+    close(), so a tiled run does not hold the results of every tile in memory.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.connection = sqlite3.connect("")
+        self.connection.execute("CREATE TABLE deferred (fid INTEGER PRIMARY KEY, rotated_wkb BLOB)")
+
+    def add(self, results: Iterable[tuple[int, bytes]]) -> None:
+        self.connection.executemany("INSERT OR REPLACE INTO deferred VALUES (?, ?)", results)
+
+    def take(self, fids: list[int]) -> list[bytes | None]:
+        found: dict[int, bytes] = {}
+        for start in range(0, len(fids), LOOKUP_BATCH_SIZE):
+            batch = fids[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            query = f"SELECT fid, rotated_wkb FROM deferred WHERE fid IN ({placeholders})"  # noqa: S608
+            found.update(self.connection.execute(query, batch).fetchall())
+        return [found.get(fid) for fid in fids]
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+import json
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from contextlib import AbstractContextManager
+
+    from qgis.core import QgsProcessingFeedback
+
+# Feature paths; "unchanged" covers curved targets, whose QGIS code path does not say why it left them as is.
+SKIPPED_MULTI = "skipped multi"
+OUT_OF_RANGE = "out of range"
+ABOVE_ANGLE = "above angle threshold"
+ALREADY_PARALLEL = "already parallel"
+UNCHANGED = "unchanged"
+ROTATED = "rotated"
+REUSED = "reused from incremental cache"
+# Stages and feature paths in reporting order.
+STAGES = ("reference index", "nearest neighbour", "distance check", "rotation", "write")
+PATHS = (SKIPPED_MULTI, OUT_OF_RANGE, ABOVE_ANGLE, ALREADY_PARALLEL, UNCHANGED, ROTATED, REUSED)
+
+_NO_STAGE = nullcontext()
+
+
+class RunStats:
+    """
+    Wall-clock seconds per stage and feature counts per path of one run. A disabled instance records
+    nothing, so callers can time and count unconditionally.
+    """
+
+    def __init__(self, *, enabled: bool = True):
+        self.enabled = enabled
+        self.seconds: Counter[str] = Counter()
+        self.counts: Counter[str] = Counter()
+        self.started = time.perf_counter()
+
+    def stage(self, name: str) -> AbstractContextManager[None]:
+        return self._timed(name) if self.enabled else _NO_STAGE
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def count(self, path: str, number: int = 1) -> None:
+        if self.enabled:
+            self.counts[path] += number
+
+    def merge(self, other: dict[str, Any]) -> None:
+        # `other` is as_dict() of a worker's stats; its stage times add up across processes.
+        self.seconds.update(other["seconds"])
+        self.counts.update(other["counts"])
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"seconds": dict(self.seconds), "counts": dict(self.counts)}
+
+    def take(self) -> dict[str, Any]:
+        """Return as_dict() and start counting from zero again."""
+        taken = self.as_dict()
+        self.seconds.clear()
+        self.counts.clear()
+        return taken
+
+    def report(self, feedback: QgsProcessingFeedback, report_path: str = "") -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        processed = sum(self.counts.values())
+        feedback.pushInfo(f"Processed {processed} features in {elapsed:.3f} s ({processed / elapsed:.1f} features/s)")
+        for name in STAGES:
+            feedback.pushInfo(f"  {name}: {self.seconds[name]:.3f} s")
+        for path in PATHS:
+            feedback.pushInfo(f"  {path}: {self.counts[path]}")
+
+        if report_path:
+            report = {
+                "elapsed_seconds": elapsed,
+                "features": processed,
+                "features_per_second": processed / elapsed,
+                "stage_seconds": {name: self.seconds[name] for name in STAGES},
+                "path_counts": {path: self.counts[path] for path in PATHS},
+            }
+            Path(report_path).write_text(json.dumps(report, indent=2))
@@ -3,12 +3,15 @@ from __future__ import annotations
 from functools import cached_property
 from typing import TYPE_CHECKING
 
-from qgis.core import Qgis, QgsGeometry, QgsProcessingException
+import numpy as np
+from qgis.core import Qgis, QgsGeometry, QgsPoint, QgsProcessingException
 
+from .kernel import Chunk, ExteriorRings, VertexNotFoundError
 from .reference import Segment
+from .wkb import parse_rings
 
 if TYPE_CHECKING:
-    from qgis.core import QgsFeature, QgsPoint, QgsPointXY
+    from qgis.core import QgsFeature, QgsPointXY
 
     from .reference import ReferenceFeature
 
@@ -24,18 +27,43 @@ class Target:
     def center_xy(self) -> QgsPointXY:
         return self.geom.centroid().asPoint()
 
-    def get_closest_vertex(self, closest_reference: ReferenceFeature) -> QgsPoint:
+    @cached_property
+    def exterior_rings(self) -> ExteriorRings | None:
+        """Cleaned exterior rings as coordinate arrays; None for curved geometries, which QGIS has to walk."""
+        wkb = bytes(self.geom.asWkb())
+        try:
+            rings = parse_rings(wkb)
+        except ValueError:
+            return None
+        return Chunk.from_wkbs([wkb], [rings]).exterior_rings
+
+    def get_closest_vertex_id(self, closest_reference: ReferenceFeature) -> int:
         nearest_point_on_ref = closest_reference.geom.nearestPoint(self.geom)
         _, closest_vertex_idx = self.geom.closestVertexWithContext(nearest_point_on_ref.asPoint())
-        return self.geom.vertexAt(closest_vertex_idx)
+        return closest_vertex_idx
+
+    def get_adjacent_segments(self, vertex_id: int) -> tuple[Segment, Segment]:
+        target_vertex = self.geom.vertexAt(vertex_id)
+        if self.exterior_rings is None:
+            return self.scan_adjacent_segments(target_vertex)
 
-    def get_adjacent_segments(self, target_vertex: QgsPoint) -> tuple[Segment, Segment]:
+        try:
+            prev_xy, next_xy = self.exterior_rings.adjacent_vertices(np.array([vertex_id]))
+        except VertexNotFoundError as e:
+            msg = f"Vertex {target_vertex} not found in target {self.feature.id()}"
+            raise QgsProcessingException(msg) from e
+        (prev_x, prev_y), (next_x, next_y) = prev_xy[0].tolist(), next_xy[0].tolist()
+        return (
+            Segment(start=target_vertex, end=QgsPoint(prev_x, prev_y)),
+            Segment(start=target_vertex, end=QgsPoint(next_x, next_y)),
+        )
+
+    def scan_adjacent_segments(self, target_vertex: QgsPoint) -> tuple[Segment, Segment]:
         # Strip interior rings and duplicate nodes on a copy so they don't influence the
         # rotation pivot; the original geom is preserved for the actual rotate.
         temp_geom = QgsGeometry(self.geom)
         temp_geom.removeInteriorRings()
         temp_geom.removeDuplicateNodes()
-
         for part_geom in temp_geom.asGeometryCollection():
             for i, current_vertex in enumerate(part_geom.vertices()):
                 if current_vertex == target_vertex:
@@ -44,7 +72,6 @@ class Target:
                         Segment(start=target_vertex, end=part_geom.vertexAt(prev_vertex_idx)),
                         Segment(start=target_vertex, end=part_geom.vertexAt(next_vertex_idx)),
                     )
-
         msg = f"Vertex {target_vertex} not found in target {self.feature.id()}"
         raise QgsProcessingException(msg)
 
@@ -52,10 +79,12 @@ class Target:
         # QgsGeometry.rotate: positive angle = clockwise, negative = counterclockwise.
         result = self.geom.rotate(angle, self.center_xy)
         if result == Qgis.GeometryOperationResult.Success:
+            self.__dict__.pop("exterior_rings", None)
             self.feature.setGeometry(self.geom)
             self.is_rotated = True
 
     def apply_rotated_geometry(self, geom: QgsGeometry) -> None:
+        self.__dict__.pop("exterior_rings", None)
         self.geom = geom
         self.feature.setGeometry(geom)
         self.is_rotated = True
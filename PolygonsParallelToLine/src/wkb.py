@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import dataclasses
+import struct
+
+import numpy as np
+
+_POINT = 1
+_LINESTRING = 2
+_POLYGON = 3
+_COLLECTIONS = (4, 5, 6, 7)
+# EWKB / QGIS 2.5D flags; ISO WKB encodes dimensions as +1000 (Z), +2000 (M), +3000 (ZM) instead.
+_EWKB_Z = 0x80000000
+_EWKB_M = 0x40000000
+_EWKB_SRID = 0x20000000
+_ISO_Z = 1
+_ISO_M = 2
+_ISO_ZM = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class Ring:
+    """Location of one contiguous coordinate sequence (a linestring or a polygon ring) inside a WKB buffer."""
+
+    offset: int
+    size: int
+    dims: int
+    byte_order: str
+    part: int
+    index: int
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(f"{self.byte_order}f8")
+
+
+def parse_rings(wkb: bytes) -> list[Ring]:
+    # Raises ValueError for geometry types without a plain vertex layout (points, curves, surfaces);
+    # callers fall back to the QgsGeometry code path for those.
+    rings: list[Ring] = []
+    end = _parse_geometry(wkb, 0, rings, part=0)
+    if end != len(wkb):
+        msg = f"Trailing bytes after WKB geometry ({len(wkb) - end})"
+        raise ValueError(msg)
+    return rings
+
+
+def read_xy(wkb: bytes, rings: list[Ring]) -> np.ndarray:
+    if not rings:
+        return np.empty((0, 2))
+    return np.concatenate([_ring_view(wkb, ring)[:, :2] for ring in rings]).astype(np.float64, copy=False)
+
+
+def write_xy(wkb: bytes, rings: list[Ring], xy: np.ndarray) -> bytes:
+    # Z and M ordinates are left untouched, matching QgsGeometry.rotate.
+    buffer = bytearray(wkb)
+    start = 0
+    for ring in rings:
+        _ring_view(buffer, ring)[:, :2] = xy[start : start + ring.size]
+        start += ring.size
+    return bytes(buffer)
+
+
+def _ring_view(wkb: bytes | bytearray, ring: Ring) -> np.ndarray:
+    return np.frombuffer(wkb, dtype=ring.dtype, count=ring.size * ring.dims, offset=ring.offset).reshape(
+        ring.size, ring.dims
+    )
+
+
+def _parse_geometry(wkb: bytes, pos: int, rings: list[Ring], part: int) -> int:
+    byte_order = _byte_order(wkb, pos)
+    (raw_type,) = struct.unpack_from(f"{byte_order}I", wkb, pos + 1)
+    pos += 5
+    if raw_type & _EWKB_SRID:
+        pos += 4
+    base_type, dims = _decode_type(raw_type)
+
+    if base_type == _LINESTRING:
+        return _parse_sequence(wkb, pos, byte_order, dims, rings, part, 0)
+    if base_type == _POLYGON:
+        (ring_count,) = struct.unpack_from(f"{byte_order}I", wkb, pos)
+        pos += 4
+        for index in range(ring_count):
+            pos = _parse_sequence(wkb, pos, byte_order, dims, rings, part, index)
+        return pos
+    if base_type in _COLLECTIONS:
+        (part_count,) = struct.unpack_from(f"{byte_order}I", wkb, pos)
+        pos += 4
+        for child in range(part_count):
+            pos = _parse_geometry(wkb, pos, rings, part=child)
+        return pos
+
+    msg = f"Unsupported WKB geometry type {raw_type}"
+    raise ValueError(msg)
+
+
+def _parse_sequence(  # noqa: PLR0913
+    wkb: bytes,
+    pos: int,
+    byte_order: str,
+    dims: int,
+    rings: list[Ring],
+    part: int,
+    index: int,
+) -> int:
+    (size,) = struct.unpack_from(f"{byte_order}I", wkb, pos)
+    pos += 4
+    end = pos + size * dims * 8
+    if end > len(wkb):
+        msg = "Truncated WKB coordinate sequence"
+        raise ValueError(msg)
+    rings.append(Ring(offset=pos, size=size, dims=dims, byte_order=byte_order, part=part, index=index))
+    return end
+
+
+def _byte_order(wkb: bytes, pos: int) -> str:
+    if pos >= len(wkb):
+        msg = "Truncated WKB header"
+        raise ValueError(msg)
+    flag = wkb[pos]
+    if flag == 0:
+        return ">"
+    if flag == 1:
+        return "<"
+    msg = f"Invalid WKB byte order flag {flag}"
+    raise ValueError(msg)
+
+
+def _decode_type(raw_type: int) -> tuple[int, int]:
+    iso_type = raw_type & 0x0FFFFFFF
+    base_type = iso_type % 1000
+    iso_dims = iso_type // 1000
+    if base_type == _POINT or iso_dims > _ISO_ZM:
+        msg = f"Unsupported WKB geometry type {raw_type}"
+        raise ValueError(msg)
+    has_z = bool(raw_type & _EWKB_Z) or iso_dims in (_ISO_Z, _ISO_ZM)
+    has_m = bool(raw_type & _EWKB_M) or iso_dims in (_ISO_M, _ISO_ZM)
+    return base_type, 2 + has_z + has_m
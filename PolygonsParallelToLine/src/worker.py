@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Literal
+
+from qgis.core import QgsFeature, QgsGeometry
+
+from .processor import TargetProcessor
+from .reference import ReferenceLayer
+from .stats import RunStats
+from .target import Target
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# Entry points for worker processes. Everything crossing the process boundary is WKB, so no
+# QGIS object is ever pickled; each worker builds its own reference index once in init_worker().
+_processor: TargetProcessor | None = None
+
+
+def init_worker(
+    reference_wkbs: list[tuple[int, bytes]],
+    target_kind: Literal["line", "polygon"],
+    options: dict[str, Any],
+    *,
+    profile: bool = False,
+    reuse_nearest: bool = False,
+) -> None:
+    global _processor  # noqa: PLW0603
+    stats = RunStats(enabled=profile)
+    with stats.stage("reference index"):
+        reference_layer = ReferenceLayer.from_features(_to_features(reference_wkbs))
+    _processor = TargetProcessor(reference_layer, target_kind, **options, reuse_nearest=reuse_nearest, stats=stats)
+
+
+def process_chunk(target_wkbs: list[bytes]) -> tuple[list[bytes | None], dict[str, Any] | None]:
+    """
+    Return the rotated WKB of each target (None where the target is left unchanged) and, when profiling,
+    the stage times and path counts gathered since the previous chunk.
+    """
+    if _processor is None:
+        msg = "init_worker() must run before process_chunk()"
+        raise RuntimeError(msg)
+    targets = [Target(feature) for feature in _to_features(enumerate(target_wkbs))]
+    _processor.process(targets)
+    rotated_wkbs = [bytes(target.geom.asWkb()) if target.is_rotated else None for target in targets]
+    return rotated_wkbs, _processor.stats.take() if _processor.stats.enabled else None
+
+
+def _to_features(id_wkbs: Iterable[tuple[int, bytes]]) -> list[QgsFeature]:
+    features = []
+    for fid, wkb in id_wkbs:
+        geom = QgsGeometry()
+        geom.fromWkb(wkb)
+        feature = QgsFeature(fid)
+        feature.setGeometry(geom)
+        features.append(feature)
+    return features
@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+import numpy as np
 import pytest
 
 from PolygonsParallelToLine.src.azimuth import (
+    calc_delta_azimuth,
+    calc_delta_azimuths,
     normalize_azimuth_to_90_range,
     normalize_azimuth_to_positive_range,
+    normalize_azimuths_to_90_range,
+    normalize_azimuths_to_positive_range,
+)
+
+# Boundaries of every branch, their float neighbours, and random azimuths in and slightly beyond -180..180.
+EDGES = np.array([-270, -180, -135, -90, -45, 0, 45, 90, 135, 180, 270], dtype=np.float64)
+AZIMUTHS = np.concatenate(
+    [
+        EDGES,
+        np.nextafter(EDGES, np.inf),
+        np.nextafter(EDGES, -np.inf),
+        np.random.default_rng(0).uniform(-190, 190, 2000),
+    ]
 )
 
 
@@ -44,3 +60,28 @@ def test_normalize_azimuth_to_90_range(azimuth, expected):
     """Test if the normalize_azimuth_to_90_range function correctly normalizes azimuth values."""
     result = normalize_azimuth_to_90_range(azimuth)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    "vectorized, scalar",
+    [
+        (normalize_azimuths_to_positive_range, normalize_azimuth_to_positive_range),
+        (normalize_azimuths_to_90_range, normalize_azimuth_to_90_range),
+    ],
+)
+def test_vectorized_normalization_matches_scalar(vectorized, scalar):
+    assert vectorized(AZIMUTHS).tolist() == [scalar(azimuth) for azimuth in AZIMUTHS.tolist()]
+
+
+def test_vectorized_delta_matches_scalar():
+    rng = np.random.default_rng(1)
+    segment_azimuths = np.concatenate([np.repeat(EDGES, len(EDGES)), rng.choice(AZIMUTHS, 5000)])
+    line_azimuths = np.concatenate([np.tile(EDGES, len(EDGES)), rng.choice(AZIMUTHS, 5000)])
+
+    expected = [calc_delta_azimuth(s, line) for s, line in zip(segment_azimuths.tolist(), line_azimuths.tolist())]
+
+    assert calc_delta_azimuths(segment_azimuths, line_azimuths).tolist() == expected
+    # A scalar broadcasts against the array, as when one reference azimuth meets every target segment.
+    assert calc_delta_azimuths(-180.0, line_azimuths).tolist() == [
+        calc_delta_azimuth(-180.0, line) for line in line_azimuths.tolist()
+    ]
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import pytest
+from qgis.core import QgsGeometry
+
+from PolygonsParallelToLine.src.batch import compute_parallel_geometries
+from PolygonsParallelToLine.src.parallelizer import compute_parallel_geometry
+from PolygonsParallelToLine.src.reference import ReferenceFeature
+
+REFERENCES = (
+    "LineString (0 0, 100 0)",
+    "LineString (0 0, 50 0, 100 5)",
+    "Polygon ((0 0, 100 5, 200 -3, 300 4, 0 0))",
+)
+POLYGONS = (
+    "Polygon ((10 50, 30 70, 50 55, 30 35, 10 50))",
+    "Polygon ((10 50, 10 50, 30 70, 50 55, 30 35, 10 50))",
+    "Polygon ((0 20, 40 25, 38 60, -2 55, 0 20), (10 30, 20 30, 20 40, 10 30))",
+    "MultiPolygon (((60 20, 80 24, 78 40, 60 20)), ((90 30, 95 31, 94 36, 90 30)))",
+    "Polygon ((10 40, 50 40, 50 60, 10 60, 10 40))",
+    "PolygonZ ((10 50 1, 30 70 2, 50 55 3, 30 35 4, 10 50 1))",
+)
+LINES = (
+    "LineString (40 50, 60 60)",
+    "LineString (40 50, 60 60, 80 55)",
+    "MultiLineString ((40 50, 60 70), (10 10, 20 20))",
+    "LineString (10 40, 50 40)",
+    "LineString (40 20, 40 80)",
+)
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+@pytest.mark.parametrize("by_longest", [False, True])
+@pytest.mark.parametrize("angle_threshold", [89.9, 20.0])
+@pytest.mark.parametrize("target_kind, targets", [("polygon", POLYGONS), ("line", LINES)], ids=["polygon", "line"])
+def test_batch_matches_scalar(qgis_app, reference, by_longest, angle_threshold, target_kind, targets):
+    reference_feature = ReferenceFeature.from_geometry(QgsGeometry.fromWkt(reference))
+    target_geoms = [QgsGeometry.fromWkt(wkt) for wkt in targets]
+
+    batched = compute_parallel_geometries(
+        [reference_feature] * len(target_geoms),
+        target_geoms,
+        target_kind,
+        by_longest=by_longest,
+        angle_threshold=angle_threshold,
+    )
+
+    for target_geom, batch_geom in zip(target_geoms, batched):
+        scalar_geom = compute_parallel_geometry(
+            reference_feature.geom, target_geom, target_kind, by_longest=by_longest, angle_threshold=angle_threshold
+        )
+        if scalar_geom is None:
+            assert batch_geom is None
+            continue
+        assert batch_geom is not None
+        assert batch_geom.wkbType() == scalar_geom.wkbType()
+        assert batch_geom.isGeosEqual(scalar_geom) or batch_geom.hausdorffDistance(scalar_geom) < 1e-9
+
+
+def test_batch_falls_back_for_curved_targets(qgis_app):
+    reference_feature = ReferenceFeature.from_geometry(QgsGeometry.fromWkt("LineString (0 0, 100 0)"))
+    curve = QgsGeometry.fromWkt("CircularString (40 50, 50 60, 60 55)")
+
+    (batched,) = compute_parallel_geometries([reference_feature], [curve], "line", by_longest=True)
+    scalar = compute_parallel_geometry(reference_feature.geom, curve, "line", by_longest=True)
+
+    assert (batched is None) == (scalar is None)
+    if scalar is not None:
+        assert batched.asWkt() == scalar.asWkt()
+
+
+def test_batch_empty_chunk(qgis_app):
+    assert compute_parallel_geometries([], [], "polygon", by_longest=False) == []
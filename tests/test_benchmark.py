@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import math
+import os
+from pathlib import Path
+import platform
+import subprocess
+import time
+from typing import Any
+
+import pytest
+from qgis import processing
+from qgis.core import (
+    Qgis,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsProcessingContext,
+    QgsProcessingOutputLayerDefinition,
+    QgsVectorLayer,
+)
+
+from PolygonsParallelToLine.src import const
+from PolygonsParallelToLine.src.algorithm import Algorithm
+
+# Scaling benchmarks (skipped by default; run with `make test-bench`). Cases above PPTL_BENCH_MAX_TARGETS are
+# skipped so a plain run stays short; raise it to 1000000 for the full sweep. Every measured run is appended
+# to the JSON Lines file PPTL_BENCH_HISTORY and compared with the previous run of the same case.
+REPO_ROOT = Path(__file__).parent.parent
+MAX_TARGETS = int(os.environ.get("PPTL_BENCH_MAX_TARGETS", "10000"))
+HISTORY_PATH = Path(os.environ.get("PPTL_BENCH_HISTORY", REPO_ROOT / ".benchmarks" / "history.jsonl"))
+
+TARGET_COUNTS = (1_000, 10_000, 100_000, 1_000_000)
+TARGET_VERTICES = (4, 64)
+REFERENCE_VERTICES = (2, 10_000)
+SETTINGS = {
+    "default": {},
+    "longest": {"LONGEST": True},
+    "distance": {"DISTANCE": 0.5},
+    "angle": {"ANGLE": 10.0},
+}
+SPACING = 2.0
+TARGET_RADIUS = 0.4
+REFERENCE_COUNT = 8
+
+
+def _target_geometry(kind: str, cx: float, cy: float, vertices: int, phase: float) -> QgsGeometry:
+    # Regular n-gons (polygons) or open arcs of one (lines), tilted by `phase` so most of them need a rotation.
+    angles = [phase + 2 * math.pi * i / vertices for i in range(vertices)]
+    points = [QgsPointXY(cx + TARGET_RADIUS * math.cos(a), cy + TARGET_RADIUS * math.sin(a)) for a in angles]
+    if kind == "polygon":
+        return QgsGeometry.fromPolygonXY([[*points, points[0]]])
+    return QgsGeometry.fromPolylineXY(points)
+
+
+def _reference_geometry(index: int, extent: float, vertices: int) -> QgsGeometry:
+    # Gently waving lines across the grid; the vertex count sets the reference length in segments.
+    y0 = extent * (index + 0.5) / REFERENCE_COUNT
+    points = [QgsPointXY(extent * i / (vertices - 1), y0 + math.sin(i * 0.37) * SPACING * 0.3) for i in range(vertices)]
+    return QgsGeometry.fromPolylineXY(points)
+
+
+def _memory_layer(geometry_type: str, geometries: list[QgsGeometry]) -> QgsVectorLayer:
+    layer = QgsVectorLayer(geometry_type, "bench", "memory")
+    features = []
+    for geom in geometries:
+        feature = QgsFeature()
+        feature.setGeometry(geom)
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    return layer
+
+
+def _layers(kind: str, count: int, target_vertices: int, reference_vertices: int) -> tuple[QgsVectorLayer, ...]:
+    side = math.ceil(math.sqrt(count))
+    targets = [
+        _target_geometry(kind, (i % side) * SPACING, (i // side) * SPACING, target_vertices, phase=0.1 + i % 7 * 0.2)
+        for i in range(count)
+    ]
+    extent = side * SPACING
+    references = [_reference_geometry(i, extent, reference_vertices) for i in range(REFERENCE_COUNT)]
+    return _memory_layer("linestring", references), _memory_layer(kind, targets)
+
+
+def _revision() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "describe", "--tags", "--always", "--dirty"],  # noqa: S607
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return result.stdout.strip()
+
+
+def _previous_record(case: str) -> dict[str, Any] | None:
+    if not HISTORY_PATH.exists():
+        return None
+    previous = None
+    for line in HISTORY_PATH.read_text().splitlines():
+        if line.strip() and (record := json.loads(line))["case"] == case:
+            previous = record
+    return previous
+
+
+def _append_record(record: dict[str, Any]) -> None:
+    HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with HISTORY_PATH.open("a") as history:
+        history.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("setting", SETTINGS)
+@pytest.mark.parametrize("reference_vertices", REFERENCE_VERTICES)
+@pytest.mark.parametrize("target_vertices", TARGET_VERTICES)
+@pytest.mark.parametrize("kind", ["polygon", "line"])
+@pytest.mark.parametrize("count", TARGET_COUNTS)
+def test_bench_scaling(count, kind, target_vertices, reference_vertices, setting, qgis_processing):
+    if count > MAX_TARGETS:
+        pytest.skip(f"{count} targets exceed PPTL_BENCH_MAX_TARGETS={MAX_TARGETS}")
+
+    reference_layer, target_layer = _layers(kind, count, target_vertices, reference_vertices)
+    params = {
+        "REFERENCE_LAYER": reference_layer,
+        "TARGET_LAYER": target_layer,
+        "LONGEST": False,
+        "NO_MULTI": False,
+        "DISTANCE": 0.0,
+        "ANGLE": 89.9,
+        "OUTPUT": QgsProcessingOutputLayerDefinition("TEMPORARY_OUTPUT"),
+        **SETTINGS[setting],
+    }
+    context = QgsProcessingContext()
+
+    start = time.perf_counter()
+    result = processing.run(algOrName=Algorithm(), parameters=params, context=context)
+    elapsed = time.perf_counter() - start
+
+    output_layer = context.getMapLayer(result[Algorithm.OUTPUT_LAYER])
+    rotated = sum(bool(feature[const.COLUMN_NAME]) for feature in output_layer.getFeatures())
+    assert output_layer.featureCount() == count
+
+    case = f"{kind}-{count}-t{target_vertices}-r{reference_vertices}-{setting}"
+    previous = _previous_record(case)
+    _append_record(
+        {
+            "case": case,
+            "kind": kind,
+            "targets": count,
+            "target_vertices": target_vertices,
+            "reference_vertices": reference_vertices,
+            "setting": setting,
+            "seconds": elapsed,
+            "rotated": rotated,
+            "revision": _revision(),
+            "qgis": Qgis.version(),
+            "python": platform.python_version(),
+            "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        }
+    )
+    if previous is not None:
+        ratio = elapsed / previous["seconds"] if previous["seconds"] else math.inf
+        print(f"{case}: {elapsed:.3f}s ({ratio:.2f}x of {previous['seconds']:.3f}s at {previous['revision']})")  # noqa: T201
+    else:
+        print(f"{case}: {elapsed:.3f}s")  # noqa: T201
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import pytest
+
+from PolygonsParallelToLine.src.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache: LRUCache[int, str] = LRUCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"  # 2 is now the least recently used entry
+
+    cache.put(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+
+
+def test_lru_cache_put_existing_key_refreshes_it():
+    cache: LRUCache[int, str] = LRUCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    cache.put(1, "z")
+
+    cache.put(3, "c")
+
+    assert cache.get(1) == "z"
+    assert cache.get(2) is None
+
+
+def test_lru_cache_evicts_by_weight():
+    cache: LRUCache[str, str] = LRUCache(5, weigh=len)
+    cache.put("a", "xx")
+    cache.put("b", "yy")
+    cache.put("c", "zz")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "yy"
+    assert cache.weight == 4
+
+
+def test_lru_cache_keeps_entry_heavier_than_budget():
+    cache: LRUCache[str, str] = LRUCache(2, weigh=len)
+    cache.put("a", "x")
+    cache.put("b", "long value")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "long value"
+
+
+def test_lru_cache_rejects_non_positive_size():
+    with pytest.raises(ValueError, match="at least 1"):
+        LRUCache(0)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+from qgis.core import QgsFeature, QgsGeometry
+
+from PolygonsParallelToLine.src.incremental import IncrementalCache, run_key
+
+
+def _features(*wkts: str) -> list[QgsFeature]:
+    features = []
+    for wkt in wkts:
+        feature = QgsFeature()
+        feature.setGeometry(QgsGeometry.fromWkt(wkt))
+        features.append(feature)
+    return features
+
+
+FIRST = "LineString (0 0, 1 1)"
+SECOND = "LineString (0 0, 2 1)"
+
+
+def test_cache_returns_results_of_previous_run(qgis_app, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = IncrementalCache(path, key="a")
+    digests, _, misses = cache.split(_features(FIRST, SECOND))
+    assert misses == [0, 1]
+    cache.record(digests, [b"rotated", None])
+    cache.close(completed=True)
+
+    cache = IncrementalCache(path, key="a")
+    _, rotated_wkbs, misses = cache.split(_features(SECOND, FIRST, "LineString (5 5, 6 6)"))
+
+    assert misses == [2]
+    assert rotated_wkbs[:2] == [None, b"rotated"]
+
+
+def test_cache_is_cleared_when_key_changes(qgis_app, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = IncrementalCache(path, key="a")
+    digests, _, _ = cache.split(_features(FIRST))
+    cache.record(digests, [None])
+    cache.close(completed=True)
+
+    _, _, misses = IncrementalCache(path, key="b").split(_features(FIRST))
+
+    assert misses == [0]
+
+
+def test_completed_run_drops_targets_it_did_not_see(qgis_app, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = IncrementalCache(path, key="a")
+    digests, _, _ = cache.split(_features(FIRST, SECOND))
+    cache.record(digests, [None, None])
+    cache.close(completed=True)
+
+    cache = IncrementalCache(path, key="a")
+    digests, _, _ = cache.split(_features(FIRST))
+    cache.record(digests, [None])
+    cache.close(completed=False)
+    cache = IncrementalCache(path, key="a")
+    assert cache.split(_features(SECOND))[2] == []  # a cancelled run keeps earlier results
+    cache.record(*cache.split(_features(FIRST))[:2])
+    cache.close(completed=True)
+
+    assert IncrementalCache(path, key="a").split(_features(SECOND))[2] == [0]
+
+
+def test_failed_run_closes_cache_and_keeps_earlier_results(qgis_app, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with IncrementalCache(path, key="a") as cache:
+        digests, _, _ = cache.split(_features(FIRST))
+        cache.record(digests, [b"rotated"])
+        cache.close(completed=True)
+
+    with pytest.raises(RuntimeError), IncrementalCache(path, key="b") as cache:  # noqa: PT012
+        cache.record(*cache.split(_features(SECOND))[:2])
+        raise RuntimeError
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.connection.execute("SELECT 1")
+    with IncrementalCache(path, key="a") as cache:
+        assert cache.split(_features(FIRST))[1] == [b"rotated"]
+
+
+def test_run_key_depends_on_references_and_options():
+    references = [(1, b"\x01\x02"), (2, b"\x03")]
+
+    assert run_key(references, {"angle": 89.9}) == run_key(list(references), {"angle": 89.9})
+    assert run_key(references, {"angle": 89.9}) != run_key(references, {"angle": 45.0})
+    assert run_key(references, {"angle": 89.9}) != run_key(references[:1], {"angle": 89.9})
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import numpy as np
+from qgis.core import QgsFeature, QgsGeometry, QgsPointXY, QgsRectangle, QgsSpatialIndex
+
+from PolygonsParallelToLine.src import index_cache
+from PolygonsParallelToLine.src.index_cache import CachedReferences, CacheLocation
+from PolygonsParallelToLine.src.reference import ReferenceLayer, SegmentIndex
+
+REFERENCES = ("LineString (0 0, 100 0)", "MultiLineString ((0 0, 10 10), (20 0, 30 10, 40 0))")
+
+
+def _features(*wkts: str, fids: tuple[int, ...] = ()) -> list[QgsFeature]:
+    features = []
+    for fid, wkt in zip(fids or range(1, len(wkts) + 1), wkts):
+        feature = QgsFeature(fid)
+        feature.setGeometry(QgsGeometry.fromWkt(wkt))
+        features.append(feature)
+    return features
+
+
+def test_cached_references_round_trip(qgis_app, tmp_path):
+    location = CacheLocation(tmp_path / "index", {"format": 1, "modified": 1})
+    location.save(CachedReferences.from_features(_features(*REFERENCES)))
+
+    cached = location.load()
+
+    assert cached.fids.tolist() == [1, 2]
+    assert cached.bboxes.tolist() == [[0.0, 0.0, 100.0, 0.0], [0.0, 0.0, 40.0, 10.0]]
+    for position, wkt in enumerate(REFERENCES):
+        expected = SegmentIndex.from_geometry(QgsGeometry.fromWkt(wkt))
+        for array, expected_array in zip(cached.segments(position), (expected.start, expected.end, expected.azimuth)):
+            np.testing.assert_array_equal(array, expected_array)
+
+
+def test_warm_index_is_bulk_loaded(qgis_app, tmp_path, monkeypatch):
+    wkts = ("LineString (0 0, 10 0)", "LineString (0 50, 10 50)", "LineString (0 100, 10 100)")
+    cold = CachedReferences.from_features(_features(*wkts, fids=(7, 3, 12)))
+    indexed_boxes = []
+    index_boxes = index_cache.bulk_spatial_index
+
+    def count_boxes(bboxes: np.ndarray) -> QgsSpatialIndex:
+        indexed_boxes.append(len(bboxes))
+        return index_boxes(bboxes)
+
+    monkeypatch.setattr(index_cache, "bulk_spatial_index", count_boxes)
+    ReferenceLayer.from_cache(None, cold)
+    assert indexed_boxes == [3]
+
+    location = CacheLocation(tmp_path / "index", {"modified": 1})
+    location.save(cold)
+    warm = ReferenceLayer.from_cache(None, location.load())
+
+    assert indexed_boxes == [3]
+    assert warm.nearest_ids(QgsPointXY(5, 45), 1) == [3]
+    assert warm.nearest_ids(QgsPointXY(5, 95), 1) == [12]
+    assert warm.bounding_box(12) == QgsRectangle(0, 100, 10, 100)
+    assert warm.intersects(QgsRectangle(-1, -1, 1, 1))
+    assert not warm.intersects(QgsRectangle(20, 20, 30, 30))
+
+
+def test_changed_key_misses(qgis_app, tmp_path):
+    CacheLocation(tmp_path, {"modified": 1}).save(CachedReferences.from_features(_features(*REFERENCES)))
+
+    assert CacheLocation(tmp_path, {"modified": 2}).load() is None
+    assert CacheLocation(tmp_path / "missing", {"modified": 1}).load() is None
+
+
+def test_curved_references_are_not_cached(qgis_app):
+    curved = "CircularString (0 0, 1 1, 2 0)"
+
+    assert CachedReferences.from_features(_features(REFERENCES[0], curved)) is None
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from pathlib import Path
+import struct
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from PolygonsParallelToLine.src.kernel import (
+    Chunk,
+    VertexNotFoundError,
+    adjacent_vertices,
+    angle_needs_rotation,
+    choose_polygon_angle,
+    choose_polygon_angles,
+    line_angles,
+    needs_rotation,
+    polygon_angles,
+    rotate_xy,
+)
+from PolygonsParallelToLine.src.wkb import parse_rings
+
+RECTANGLE = [(0.0, 0.0), (8.0, 0.0), (8.0, 2.0), (0.0, 2.0), (0.0, 0.0)]
+
+
+def _linestring(points: list[tuple[float, float]]) -> bytes:
+    return struct.pack("<BII", 1, 2, len(points)) + b"".join(struct.pack("<2d", *p) for p in points)
+
+
+def _polygon(rings: list[list[tuple[float, float]]]) -> bytes:
+    return struct.pack("<BII", 1, 3, len(rings)) + b"".join(
+        struct.pack("<I", len(ring)) + b"".join(struct.pack("<2d", *p) for p in ring) for ring in rings
+    )
+
+
+def _chunk(*wkbs: bytes) -> Chunk:
+    return Chunk.from_wkbs(list(wkbs), [parse_rings(wkb) for wkb in wkbs])
+
+
+def test_kernel_does_not_import_qgis():
+    code = "import sys, PolygonsParallelToLine.src.kernel; print(any(m.split('.')[0] == 'qgis' for m in sys.modules))"
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "False"
+
+
+def test_vertex_start_spans_every_ring_of_a_target():
+    chunk = _chunk(_polygon([RECTANGLE, [(1.0, 1.0), (2.0, 1.0), (2.0, 1.5), (1.0, 1.0)]]), _linestring(RECTANGLE))
+
+    assert chunk.vertex_start.tolist() == [0, 9, 14]
+
+
+@pytest.mark.parametrize(
+    ("by_longest", "angle_threshold", "expected"),
+    [(True, 89.9, [-60.0, 30.0]), (False, 89.9, [30.0, 30.0]), (False, 20.0, [np.nan, np.nan])],
+)
+def test_line_angles_pick_longest_or_smallest_angle_segment(by_longest, angle_threshold, expected):
+    # East (10 long) then north (3 long); the second target has two equal segments heading north.
+    chunk = _chunk(
+        _linestring([(0.0, 0.0), (10.0, 0.0), (10.0, 3.0)]), _linestring([(0.0, 0.0), (0.0, 5.0), (0.0, 10.0)])
+    )
+
+    angles = line_angles(chunk, np.array([30.0, 30.0]), angle_threshold, by_longest=by_longest)
+
+    np.testing.assert_allclose(angles, expected)
+
+
+@pytest.mark.parametrize(
+    ("by_longest", "angle_threshold", "expected"),
+    [(True, 89.9, -60.0), (False, 89.9, 30.0), (True, 40.0, 30.0), (True, 20.0, np.nan)],
+)
+def test_polygon_angles_use_segments_at_the_pivot(by_longest, angle_threshold, expected):
+    # At (8, 0), vertex 1, the previous segment heads west (8 long) and the next one north (2 long).
+    chunk = _chunk(_polygon([RECTANGLE]))
+
+    angles = polygon_angles(chunk, np.array([1]), np.array([30.0]), angle_threshold, by_longest=by_longest)
+
+    np.testing.assert_allclose(angles, [expected])
+
+
+def test_polygon_angles_reject_pivot_off_the_exterior_ring():
+    hole = [(2.0, 0.5), (3.0, 0.5), (3.0, 1.5), (2.0, 0.5)]
+    chunk = _chunk(_polygon([RECTANGLE, hole]))
+
+    with pytest.raises(VertexNotFoundError):
+        polygon_angles(chunk, np.array([6]), np.array([30.0]), 89.9, by_longest=False)
+    with pytest.raises(VertexNotFoundError):
+        polygon_angles(chunk, np.array([9]), np.array([30.0]), 89.9, by_longest=False)
+
+
+def test_adjacent_vertices_index_cleaned_rings_directly():
+    # The second target repeats (8, 0); both copies map to the same node of the cleaned ring.
+    with_duplicate = [(0.0, 0.0), (8.0, 0.0), (8.0, 0.0), (8.0, 2.0), (0.0, 2.0), (0.0, 0.0)]
+    chunk = _chunk(_polygon([RECTANGLE]), _polygon([with_duplicate]))
+
+    prev_xy, next_xy = adjacent_vertices(chunk, np.array([0, 4, 6, 7, 10]))
+
+    assert prev_xy.tolist() == [[0.0, 2.0], [0.0, 2.0], [0.0, 0.0], [0.0, 0.0], [0.0, 2.0]]
+    assert next_xy.tolist() == [[8.0, 0.0], [8.0, 0.0], [8.0, 2.0], [8.0, 2.0], [8.0, 0.0]]
+
+
+def test_rotate_xy_turns_clockwise_around_each_center():
+    xy = np.array([[1.0, 0.0], [11.0, 10.0]])
+
+    rotated = rotate_xy(xy, np.array([0, 1]), np.array([90.0, -90.0]), np.array([[0.0, 0.0], [10.0, 10.0]]))
+
+    np.testing.assert_allclose(rotated, [[0.0, -1.0], [10.0, 11.0]], atol=1e-12)
+
+
+def test_needs_rotation_skips_missing_and_negligible_angles():
+    assert needs_rotation(np.array([np.nan, 0.0, 1e-9, -1e-9, 0.5])).tolist() == [False, False, False, False, True]
+
+
+@pytest.mark.parametrize("by_longest", [False, True])
+@pytest.mark.parametrize("angle_threshold", [89.9, 30.0, 5.0])
+def test_choose_polygon_angle_matches_array_version(by_longest, angle_threshold):
+    deltas = [-60.0, -30.0, -10.0, 0.0, 10.0, 30.0, 45.0]
+    lengths = [1.0, 2.0]
+    cases = [(p, n, pl, nl) for p in deltas for n in deltas for pl in lengths for nl in lengths]
+    prev_delta, next_delta, prev_length, next_length = (np.array(column) for column in zip(*cases))
+
+    expected = choose_polygon_angles(
+        prev_delta, next_delta, prev_length, next_length, angle_threshold, by_longest=by_longest
+    )
+
+    angles = [choose_polygon_angle(*case, angle_threshold, by_longest=by_longest) for case in cases]
+    np.testing.assert_array_equal(angles, expected)
+    assert [angle_needs_rotation(angle) for angle in angles] == needs_rotation(expected).tolist()
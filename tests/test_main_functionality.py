@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from typing import TYPE_CHECKING
 
 import pytest
@@ -8,11 +9,13 @@ from qgis.core import (
     QgsFeature,
     QgsGeometry,
     QgsProcessingContext,
+    QgsProcessingFeedback,
     QgsProcessingOutputLayerDefinition,
+    QgsVectorFileWriter,
     QgsVectorLayer,
 )
 
-from PolygonsParallelToLine.src import const
+from PolygonsParallelToLine.src import const, index_cache, pptl, reference
 from PolygonsParallelToLine.src.algorithm import Algorithm
 
 if TYPE_CHECKING:
@@ -323,6 +326,233 @@ def test_line_target_exceeds_angle_threshold_unchanged(qgis_processing, add_feat
     assert [f[const.COLUMN_NAME] for f in features] == [False]
 
 
+def _run_algorithm(
+    reference_layer: QgsVectorLayer,
+    target_layer: QgsVectorLayer,
+    feedback: QgsProcessingFeedback | None = None,
+    **overrides: object,
+) -> list[tuple[str, bool]]:
+    params = {
+        "REFERENCE_LAYER": reference_layer,
+        "TARGET_LAYER": target_layer,
+        "LONGEST": False,
+        "NO_MULTI": False,
+        "DISTANCE": 0.0,
+        "ANGLE": 89.9,
+        "OUTPUT": QgsProcessingOutputLayerDefinition("TEMPORARY_OUTPUT"),
+        **overrides,
+    }
+    context = QgsProcessingContext()
+    result = processing.run(algOrName=Algorithm(), parameters=params, context=context, feedback=feedback)
+    output_layer = context.getMapLayer(result[Algorithm.OUTPUT_LAYER])
+    return [(f.geometry().asWkt(), f[const.COLUMN_NAME]) for f in output_layer.getFeatures()]
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [{}, {"LONGEST": True}, {"DISTANCE": 10.5, "ANGLE": 15.5}, {"NO_MULTI": True}],
+    ids=["standard", "by_longest", "distance_angle", "no_multi"],
+)
+def test_worker_processes_match_single_process(overrides, qgis_processing, layers, monkeypatch):
+    # Small chunks so several chunks are in flight and the in-order merge is exercised.
+    monkeypatch.setattr(pptl, "CHUNK_SIZE", 3)
+    line_layer, target_layer = layers
+
+    serial = _run_algorithm(line_layer, target_layer, **overrides)
+    parallel = _run_algorithm(line_layer, target_layer, WORKERS=2, **overrides)
+
+    assert parallel == serial
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [{}, {"LONGEST": True}, {"DISTANCE": 10.5, "ANGLE": 15.5}],
+    ids=["standard", "by_longest", "distance_angle"],
+)
+def test_low_memory_mode_matches_default(overrides, qgis_processing, layers, monkeypatch):
+    # A tiny cache forces geometries to be evicted and fetched again from the provider.
+    monkeypatch.setattr(reference, "REFERENCE_CACHE_VERTICES", 1)
+    line_layer, target_layer = layers
+
+    default = _run_algorithm(line_layer, target_layer, **overrides)
+    low_memory = _run_algorithm(line_layer, target_layer, LOW_MEMORY=True, **overrides)
+
+    assert low_memory == default
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_profile_report_counts_every_feature(workers, qgis_processing, layers, tmp_path):
+    line_layer, target_layer = layers
+    report_path = tmp_path / "report.json"
+
+    output = _run_algorithm(
+        line_layer, target_layer, NO_MULTI=True, DISTANCE=10.5, WORKERS=workers, PROFILE_REPORT=str(report_path)
+    )
+
+    report = json.loads(report_path.read_text())
+    assert report["features"] == len(POLYGONS)
+    assert report["path_counts"]["rotated"] == sum(rotated for _, rotated in output)
+    assert report["path_counts"]["skipped multi"] > 0
+    assert report["stage_seconds"]["reference index"] > 0
+
+
+def test_incremental_cache_reuses_unchanged_targets(qgis_processing, layers, tmp_path):
+    line_layer, target_layer = layers
+    cache_path = str(tmp_path / "cache.sqlite")
+    report_path = tmp_path / "report.json"
+
+    first = _run_algorithm(line_layer, target_layer, INCREMENTAL_CACHE=cache_path)
+    target_layer.dataProvider().changeGeometryValues({1: QgsGeometry.fromWkt(POLYGONS[1]).buffer(1.0, 4)})
+    second = _run_algorithm(line_layer, target_layer, INCREMENTAL_CACHE=cache_path, PROFILE_REPORT=str(report_path))
+    fresh = _run_algorithm(line_layer, target_layer)
+
+    assert second == fresh
+    assert second[1:] == first[1:]
+    assert json.loads(report_path.read_text())["path_counts"]["reused from incremental cache"] == len(POLYGONS) - 1
+
+
+def test_incremental_cache_is_invalidated_by_parameters(qgis_processing, layers, tmp_path):
+    line_layer, target_layer = layers
+    cache_path = str(tmp_path / "cache.sqlite")
+    report_path = tmp_path / "report.json"
+
+    _run_algorithm(line_layer, target_layer, INCREMENTAL_CACHE=cache_path)
+    cached = _run_algorithm(
+        line_layer, target_layer, LONGEST=True, INCREMENTAL_CACHE=cache_path, PROFILE_REPORT=str(report_path)
+    )
+
+    assert cached == _run_algorithm(line_layer, target_layer, LONGEST=True)
+    assert json.loads(report_path.read_text())["path_counts"]["reused from incremental cache"] == 0
+
+
+def test_cached_reference_index_matches_default(qgis_processing, layers, tmp_path, monkeypatch):
+    monkeypatch.setattr(index_cache, "cache_root", lambda: tmp_path / "index")
+    memory_layer, target_layer = layers
+    path = str(tmp_path / "lines.gpkg")
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    QgsVectorFileWriter.writeAsVectorFormatV3(memory_layer, path, QgsProcessingContext().transformContext(), options)
+    line_layer = QgsVectorLayer(path, "lines", "ogr")
+
+    default = _run_algorithm(line_layer, target_layer, DISTANCE=10.5)
+    first = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, CACHE_REFERENCE_INDEX=True)
+    second = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, CACHE_REFERENCE_INDEX=True)
+
+    assert len(list((tmp_path / "index").iterdir())) == 1
+    assert first == second == default
+
+
+def test_slow_chunks_shrink_to_single_targets(qgis_processing, layers, monkeypatch):
+    # Every chunk takes longer than this, so cancellation is checked after every target once chunks are halved.
+    monkeypatch.setattr(pptl, "CHUNK_SECONDS", 0.0)
+    chunk_sizes = []
+    process_chunk = pptl.ParallelToReference.process_chunk
+
+    def record_chunk_size(self: pptl.ParallelToReference, features: list[QgsFeature], *args: object) -> object:
+        chunk_sizes.append(len(features))
+        return process_chunk(self, features, *args)
+
+    monkeypatch.setattr(pptl.ParallelToReference, "process_chunk", record_chunk_size)
+    line_layer, target_layer = layers
+
+    result = _run_algorithm(line_layer, target_layer)
+
+    assert chunk_sizes[0] == pptl.INITIAL_CHUNK_SIZE
+    assert chunk_sizes[-1] == 1
+    assert chunk_sizes == sorted(chunk_sizes, reverse=True)
+    assert sum(chunk_sizes) == len(result) == len(POLYGONS)
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_spatial_order_matches_provider_order(low_memory, qgis_processing, layers, monkeypatch):
+    monkeypatch.setattr(pptl, "CHUNK_SIZE", 2)
+    line_layer, target_layer = layers
+
+    default = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, LOW_MEMORY=low_memory)
+    spatial = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, LOW_MEMORY=low_memory, TRAVERSAL_ORDER=1)
+    spatial_sorted = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, LOW_MEMORY=low_memory, TRAVERSAL_ORDER=2)
+
+    assert spatial == default
+    assert sorted(spatial_sorted) == sorted(default)
+
+
+@pytest.mark.parametrize(
+    "overrides", [{}, {"DISTANCE": 10.5}, {"LONGEST": True, "ANGLE": 15.5}, {"TRAVERSAL_ORDER": 1}]
+)
+def test_tiled_mode_matches_default(overrides, qgis_processing, layers, monkeypatch):
+    monkeypatch.setattr(pptl, "CHUNK_SIZE", 2)
+    line_layer, target_layer = layers
+
+    default = _run_algorithm(line_layer, target_layer, **overrides)
+    # Tiles smaller than the targets, so most nearest references lie outside the loaded extent.
+    tiled = _run_algorithm(line_layer, target_layer, TILE_SIZE=5.0, **overrides)
+    tiled_in_provider_order = _run_algorithm(
+        line_layer, target_layer, TILE_SIZE=5.0, **{**overrides, "TRAVERSAL_ORDER": 1}
+    )
+
+    assert sorted(tiled) == sorted(default)
+    assert tiled_in_provider_order == default
+
+
+@pytest.mark.parametrize("traversal_order", [0, 1])
+def test_tiled_mode_holds_no_results_across_tiles(traversal_order, qgis_processing, layers, monkeypatch):
+    held_results = []
+    write = pptl.ParallelToReference.write
+
+    def record_held_results(self: pptl.ParallelToReference, *args: object) -> None:
+        write(self, *args)
+        held_results.append(len(self.deferred.results))
+
+    def fail(self: pptl.ParallelToReference) -> None:
+        pytest.fail("tiled mode read the bounding boxes of every target up front")
+
+    monkeypatch.setattr(pptl.ParallelToReference, "write", record_held_results)
+    monkeypatch.setattr(pptl.ParallelToReference, "target_bounding_boxes", fail)
+    line_layer, target_layer = layers
+
+    tiled = _run_algorithm(line_layer, target_layer, TILE_SIZE=5.0, TRAVERSAL_ORDER=traversal_order)
+
+    assert len(held_results) > 1
+    assert set(held_results) == {0}
+    assert len(tiled) == len(POLYGONS)
+
+
+def test_tiled_mode_warns_about_ignored_options(qgis_processing, layers):
+    line_layer, target_layer = layers
+    warnings = []
+
+    class WarningFeedback(QgsProcessingFeedback):
+        def pushWarning(self, warning: str) -> None:  # noqa: N802
+            warnings.append(warning)
+
+    _run_algorithm(line_layer, target_layer, WarningFeedback(), TILE_SIZE=5.0, WORKERS=2, LOW_MEMORY=True)
+
+    assert any("number of workers, low memory mode" in warning for warning in warnings)
+
+
+@pytest.mark.parametrize("overrides", [{"LOW_MEMORY": True}, {"TILE_SIZE": 5.0, "TRAVERSAL_ORDER": 1}, {"WORKERS": 2}])
+def test_nearest_candidates_match_across_modes(overrides, qgis_processing, layers):
+    line_layer, target_layer = layers
+
+    default = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, NEAREST_CANDIDATES=4)
+    other = _run_algorithm(line_layer, target_layer, DISTANCE=10.5, NEAREST_CANDIDATES=4, **overrides)
+
+    assert other == default
+
+
+@pytest.mark.parametrize(
+    "overrides", [{}, {"LONGEST": True}, {"DISTANCE": 10.5, "ANGLE": 15.5}, {"NO_MULTI": True}, {"TRAVERSAL_ORDER": 1}]
+)
+def test_shapely_backend_matches_default(overrides, qgis_processing, layers):
+    pytest.importorskip("shapely", minversion="2.0")
+    line_layer, target_layer = layers
+
+    default = _run_algorithm(line_layer, target_layer, **overrides)
+    shapely_backend = _run_algorithm(line_layer, target_layer, GEOMETRY_BACKEND=1, **overrides)
+
+    assert shapely_backend == default
+
+
 @pytest.fixture(scope="module")
 def add_features():
     def add_wkt_features_to_layer(vector_layer: QgsVectorLayer, wkt_geometries: tuple[str, ...]) -> None:
@@ -335,6 +565,16 @@ def add_features():
     return add_wkt_features_to_layer
 
 
+@pytest.fixture
+def layers(add_features) -> tuple[QgsVectorLayer, QgsVectorLayer]:
+    """A line reference layer of LINES and a polygon target layer of POLYGONS."""
+    line_layer = QgsVectorLayer("linestring", "temp_line", "memory")
+    add_features(vector_layer=line_layer, wkt_geometries=LINES)
+    target_layer = QgsVectorLayer("polygon", "temp_poly", "memory")
+    add_features(vector_layer=target_layer, wkt_geometries=POLYGONS)
+    return line_layer, target_layer
+
+
 @pytest.fixture(scope="module")
 def converter():
     def wkt_to_polygon_geometry(wkt: str) -> list[list[QgsPointXY]] | list[list[list[QgsPointXY]]]:
@@ -1,16 +1,37 @@
 from __future__ import annotations
 
-from qgis.core import QgsGeometry, QgsRectangle
+from collections import Counter
 
-from PolygonsParallelToLine.src.map_tool import _pick_segment_in_rect
+import numpy as np
+import pytest
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsRectangle,
+    QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
+    QgsWkbTypes,
+)
+
+from PolygonsParallelToLine.src.map_tool import (
+    BulkRotationTask,
+    LayerJob,
+    ParallelToLineMapTool,
+    _clipped_lengths,
+    _commit_geometries,
+    _pick_segment_in_rect,
+)
+from PolygonsParallelToLine.src.reference import ReferenceFeature, SegmentIndex
+from PolygonsParallelToLine.src.settings import MapToolSettings
 
 
 def test_pick_segment_in_rect_returns_segment_with_largest_overlap(qgis_app):
     geom = QgsGeometry.fromWkt("LineString (0 10, 20 10, 80 10, 100 10)")
     rect = QgsRectangle(30, 0, 70, 20)
-    rect_geom = QgsGeometry.fromRect(rect)
 
-    seg = _pick_segment_in_rect(geom, rect_geom, rect.center())
+    seg = _pick_segment_in_rect(geom, rect, rect.center())
 
     # Middle segment (20,10)→(80,10) has the longest clip inside the rect.
     assert (seg.start.x(), seg.start.y()) == (20.0, 10.0)
@@ -20,9 +41,8 @@ def test_pick_segment_in_rect_returns_segment_with_largest_overlap(qgis_app):
 def test_pick_segment_in_rect_prefers_full_overlap_over_partial(qgis_app):
     geom = QgsGeometry.fromWkt("LineString (0 10, 50 10, 100 10)")
     rect = QgsRectangle(0, 0, 90, 20)
-    rect_geom = QgsGeometry.fromRect(rect)
 
-    seg = _pick_segment_in_rect(geom, rect_geom, rect.center())
+    seg = _pick_segment_in_rect(geom, rect, rect.center())
 
     # First segment is fully inside (length 50) — beats the partial second segment (length 40).
     assert (seg.start.x(), seg.end.x()) == (0.0, 50.0)
@@ -31,9 +51,8 @@ def test_pick_segment_in_rect_prefers_full_overlap_over_partial(qgis_app):
 def test_pick_segment_in_rect_falls_back_to_closest_when_rect_inside_polygon(qgis_app):
     geom = QgsGeometry.fromWkt("Polygon ((0 0, 100 0, 100 100, 0 100, 0 0))")
     rect = QgsRectangle(40, 40, 60, 60)
-    rect_geom = QgsGeometry.fromRect(rect)
 
-    seg = _pick_segment_in_rect(geom, rect_geom, rect.center())
+    seg = _pick_segment_in_rect(geom, rect, rect.center())
 
     edges = {
         ((0.0, 0.0), (100.0, 0.0)),
@@ -49,8 +68,207 @@ def test_pick_segment_in_rect_picks_polygon_edge_overlapping_rect(qgis_app):
     geom = QgsGeometry.fromWkt("Polygon ((0 0, 100 0, 100 100, 0 100, 0 0))")
     # Rect that straddles the bottom edge only.
     rect = QgsRectangle(10, -10, 90, 5)
-    rect_geom = QgsGeometry.fromRect(rect)
 
-    seg = _pick_segment_in_rect(geom, rect_geom, rect.center())
+    seg = _pick_segment_in_rect(geom, rect, rect.center())
 
     assert ((seg.start.x(), seg.start.y()), (seg.end.x(), seg.end.y())) == ((0.0, 0.0), (100.0, 0.0))
+
+
+@pytest.mark.parametrize(
+    "wkt",
+    [
+        "LineString (0 10, 20 10, 80 10, 100 10)",
+        "LineString (-5 -5, 35 25, 50 0, 50 30, 75 15, 120 21)",
+        "Polygon ((0 0, 100 0, 100 100, 0 100, 0 0), (45 45, 55 45, 55 55, 45 55, 45 45))",
+        "MultiLineString ((30 0, 30 20), (0 19, 100 19.5))",
+    ],
+)
+def test_clipped_lengths_match_geos_intersection(qgis_app, wkt):
+    geom = QgsGeometry.fromWkt(wkt)
+    rect = QgsRectangle(30, 0, 70, 20)
+    rect_geom = QgsGeometry.fromRect(rect)
+    segments = SegmentIndex.from_any_geometry(geom)
+
+    expected = []
+    for start_xy, end_xy in zip(segments.start.tolist(), segments.end.tolist()):
+        segment_geom = QgsGeometry.fromPolylineXY([QgsPointXY(*start_xy), QgsPointXY(*end_xy)])
+        clipped = segment_geom.intersection(rect_geom)
+        expected.append(-1.0 if clipped.isEmpty() else clipped.length())
+
+    np.testing.assert_allclose(_clipped_lengths(segments.start, segments.end, rect), expected)
+
+
+def _polygon_layer(*wkts: str) -> QgsVectorLayer:
+    layer = QgsVectorLayer("polygon", "targets", "memory")
+    features = []
+    for wkt in wkts:
+        feature = QgsFeature()
+        feature.setGeometry(QgsGeometry.fromWkt(wkt))
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    return layer
+
+
+def test_bulk_rotation_task_rotates_features_in_rect(qgis_app):
+    layer = _polygon_layer(
+        "Polygon ((0 10, 4 13, 7 9, 3 6, 0 10))",
+        "Polygon ((20 0, 30 0, 30 10, 20 10, 20 0))",
+        "Polygon ((100 110, 104 113, 107 109, 103 106, 100 110))",
+    )
+    job = LayerJob(
+        layer_id=layer.id(),
+        source=QgsVectorLayerFeatureSource(layer),
+        rect=QgsRectangle(-5, -5, 50, 50),
+        reference=ReferenceFeature.from_geometry(QgsGeometry.fromWkt("LineString (-100 0, 100 0)")),
+        kind="polygon",
+    )
+    task = BulkRotationTask([job], by_longest=False, pick_target_segment=False)
+
+    assert task.run()
+
+    # The tilted square is rotated; the axis-aligned one is already parallel and the third is outside the rect.
+    assert list(task.rotated[layer.id()]) == [1]
+    assert task.exception is None
+
+
+def test_bulk_rotation_task_skips_features_whose_bounding_box_only_meets_rect(qgis_app):
+    layer = _polygon_layer("Polygon ((0 0, 40 3, 3 40, 0 0))", "Polygon ((30 30, 34 33, 37 29, 33 26, 30 30))")
+    job = LayerJob(
+        layer_id=layer.id(),
+        source=QgsVectorLayerFeatureSource(layer),
+        rect=QgsRectangle(28, 25, 40, 40),
+        reference=ReferenceFeature.from_geometry(QgsGeometry.fromWkt("LineString (-100 0, 100 0)")),
+        kind="polygon",
+    )
+    task = BulkRotationTask([job], by_longest=False, pick_target_segment=False)
+
+    assert [fid for fid, _ in task.matching_features(job)] == [2]
+
+
+def test_bulk_rotation_task_stops_when_cancelled(qgis_app):
+    layer = _polygon_layer("Polygon ((0 10, 4 13, 7 9, 3 6, 0 10))")
+    job = LayerJob(
+        layer_id=layer.id(),
+        source=QgsVectorLayerFeatureSource(layer),
+        rect=QgsRectangle(-5, -5, 50, 50),
+        reference=ReferenceFeature.from_geometry(QgsGeometry.fromWkt("LineString (-100 0, 100 0)")),
+        kind="polygon",
+    )
+    task = BulkRotationTask([job], by_longest=False, pick_target_segment=False)
+    task.cancel()
+
+    assert not task.run()
+    assert not task.rotated.get(layer.id())
+
+
+def test_reprojected_reference_is_cached_per_layer_crs(qgis_iface, qgis_canvas):
+    qgis_canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+    tool = ParallelToLineMapTool(qgis_iface, MapToolSettings())
+    tool.activate()
+    set_reference = tool._set_reference  # noqa: SLF001
+    reference_for_layer = tool._reference_for_layer  # noqa: SLF001
+    set_reference(QgsGeometry.fromWkt("LineString (10 50, 11 50)"), QgsCoordinateReferenceSystem("EPSG:4326"))
+    layer = QgsVectorLayer("polygon?crs=EPSG:4326", "targets", "memory")
+
+    first = reference_for_layer(layer)
+    assert reference_for_layer(layer) is first
+    assert first.asWkt(6) == "LineString (10 50, 11 50)"
+
+    qgis_canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:32632"))
+    assert reference_for_layer(layer) is not first
+    assert reference_for_layer(layer).asWkt(6) == "LineString (10 50, 11 50)"
+    tool.deactivate()
+
+
+def test_reference_feature_is_shared_by_rotations_of_a_layer(qgis_iface, qgis_canvas):
+    qgis_canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+    tool = ParallelToLineMapTool(qgis_iface, MapToolSettings())
+    tool.activate()
+    set_reference = tool._set_reference  # noqa: SLF001
+    reference_feature_for_layer = tool._reference_feature_for_layer  # noqa: SLF001
+    set_reference(QgsGeometry.fromWkt("LineString (-100 0, 100 0)"), QgsCoordinateReferenceSystem("EPSG:3857"))
+    layer = QgsVectorLayer("polygon?crs=EPSG:3857", "targets", "memory")
+
+    first = reference_feature_for_layer(layer)
+
+    assert reference_feature_for_layer(layer) is first
+    set_reference(QgsGeometry.fromWkt("LineString (-100 5, 100 5)"), QgsCoordinateReferenceSystem("EPSG:3857"))
+    assert reference_feature_for_layer(layer) is not first
+    tool.deactivate()
+
+
+def test_rotations_are_cached_until_the_feature_changes(qgis_iface, qgis_canvas):
+    qgis_canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+    tool = ParallelToLineMapTool(qgis_iface, MapToolSettings())
+    tool.activate()
+    set_reference = tool._set_reference  # noqa: SLF001
+    rotated_geometry = tool._rotated_geometry  # noqa: SLF001
+    set_reference(QgsGeometry.fromWkt("LineString (-100 0, 100 0)"), QgsCoordinateReferenceSystem("EPSG:3857"))
+    layer = _polygon_layer("Polygon ((0 10, 4 13, 7 9, 3 6, 0 10))")
+    layer.setCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+    feature = next(layer.getFeatures())
+    point = QgsPointXY(3, 9)
+
+    first = rotated_geometry(layer, feature, QgsWkbTypes.PolygonGeometry, point)
+    assert rotated_geometry(layer, feature, QgsWkbTypes.PolygonGeometry, point) is first
+
+    feature.setGeometry(QgsGeometry.fromWkt("Polygon ((0 10, 5 13, 7 9, 3 6, 0 10))"))
+    assert rotated_geometry(layer, feature, QgsWkbTypes.PolygonGeometry, point) is not first
+    tool.deactivate()
+
+
+def test_rotations_are_not_reused_across_crs_changes(qgis_iface, qgis_canvas):
+    qgis_canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+    tool = ParallelToLineMapTool(qgis_iface, MapToolSettings())
+    tool.activate()
+    set_reference = tool._set_reference  # noqa: SLF001
+    rotated_geometry = tool._rotated_geometry  # noqa: SLF001
+    set_reference(QgsGeometry.fromWkt("LineString (-100 0, 100 0)"), QgsCoordinateReferenceSystem("EPSG:3857"))
+    layer = _polygon_layer("Polygon ((0 10, 4 13, 7 9, 3 6, 0 10))")
+    layer.setCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+    feature = next(layer.getFeatures())
+    point = QgsPointXY(3, 9)
+
+    first = rotated_geometry(layer, feature, QgsWkbTypes.PolygonGeometry, point)
+    qgis_canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:32632"))
+    second = rotated_geometry(layer, feature, QgsWkbTypes.PolygonGeometry, point)
+    assert second is not first
+
+    layer.setCrs(QgsCoordinateReferenceSystem("EPSG:4326"))
+    assert rotated_geometry(layer, feature, QgsWkbTypes.PolygonGeometry, point) is not second
+    tool.deactivate()
+
+
+def test_commit_geometries_is_one_undo_command(qgis_app):
+    layer = _polygon_layer("Polygon ((0 0, 1 0, 1 1, 0 0))", "Polygon ((5 5, 6 5, 6 6, 5 5))")
+    layer.startEditing()
+    geometries = {
+        1: QgsGeometry.fromWkt("Polygon ((0 0, 2 0, 2 2, 0 0))"),
+        2: QgsGeometry.fromWkt("Polygon ((5 5, 7 5, 7 7, 5 5))"),
+    }
+
+    assert _commit_geometries(layer, geometries, "Parallel to Line (bulk)") == 2
+    assert layer.undoStack().count() == 1
+    assert [f.geometry().asWkt() for f in layer.getFeatures()] == [g.asWkt() for g in geometries.values()]
+
+    layer.undoStack().undo()
+    assert [f.geometry().asWkt() for f in layer.getFeatures()] == [
+        "Polygon ((0 0, 1 0, 1 1, 0 0))",
+        "Polygon ((5 5, 6 5, 6 6, 5 5))",
+    ]
+
+
+def test_commit_geometries_emits_one_signal_for_bulk_commit(qgis_app):
+    layer = _polygon_layer(*(f"Polygon (({i} 0, {i + 1} 0, {i + 1} 1, {i} 0))" for i in range(5)))
+    layer.startEditing()
+    emitted: Counter[str] = Counter()
+    for name in ("geometryChanged", "dataChanged", "repaintRequested"):
+        getattr(layer, name).connect(lambda *_, name=name: emitted.update([name]))
+    geometries = {
+        fid: QgsGeometry.fromWkt(f"Polygon (({fid} 0, {fid} 2, {fid + 2} 2, {fid} 0))") for fid in range(1, 6)
+    }
+
+    assert _commit_geometries(layer, geometries, "Parallel to Line (bulk)") == 5
+    assert emitted == Counter(dataChanged=1, repaintRequested=1)
+    assert [f.geometry().asWkt() for f in layer.getFeatures()] == [g.asWkt() for g in geometries.values()]
+    layer.rollBack()
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import numpy as np
+
+from PolygonsParallelToLine.src.ordering import hilbert_keys, hilbert_order
+
+
+def test_hilbert_curve_visits_neighbouring_cells():
+    x, y = np.meshgrid(np.arange(8.0), np.arange(8.0))
+    x, y = x.ravel(), y.ravel()
+
+    keys = hilbert_keys(x, y, bits=3)
+    order = np.argsort(keys)
+
+    assert sorted(keys.tolist()) == list(range(64))
+    steps = np.abs(np.diff(x[order])) + np.abs(np.diff(y[order]))
+    assert (steps == 1).all()
+
+
+def test_hilbert_order_is_stable_for_degenerate_extents():
+    assert hilbert_order(np.array([5.0, 5.0, 5.0]), np.array([1.0, 1.0, 1.0])).tolist() == [0, 1, 2]
+    assert hilbert_order(np.array([]), np.array([])).tolist() == []
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+from qgis.core import QgsFeature, QgsGeometry
+
+from PolygonsParallelToLine.src.processor import TargetProcessor
+from PolygonsParallelToLine.src.reference import ReferenceLayer
+from PolygonsParallelToLine.src.target import Target
+
+TILTED_SQUARE = "Polygon ((0 10, 4 13, 7 9, 3 6, 0 10))"
+
+
+def _feature(wkt: str, fid: int = 0) -> QgsFeature:
+    feature = QgsFeature(fid)
+    feature.setGeometry(QgsGeometry.fromWkt(wkt))
+    return feature
+
+
+def _processor(distance: float) -> TargetProcessor:
+    reference_layer = ReferenceLayer.from_features([_feature("LineString (-100 0, 100 0)")])
+    return TargetProcessor(reference_layer, "polygon", by_longest=False, no_multi=False, distance=distance, angle=89.9)
+
+
+def test_out_of_range_target_skips_reference_lookup(qgis_app, monkeypatch):
+    processor = _processor(distance=5.0)
+
+    def fail(*_args: object) -> None:
+        pytest.fail("out-of-range target must not query the closest reference")
+
+    monkeypatch.setattr(processor.reference_layer, "get_closest_feature", fail)
+    target = Target(_feature(TILTED_SQUARE))
+
+    processor.process([target])
+
+    assert not target.is_rotated
+
+
+@pytest.mark.parametrize(("distance", "rotated"), [(6.5, True), (5.9, False), (0.0, True)])
+def test_distance_limit_is_exact(qgis_app, distance, rotated):
+    # The square's lowest vertex is 6 units away from the reference.
+    target = Target(_feature(TILTED_SQUARE))
+
+    _processor(distance).process([target])
+
+    assert target.is_rotated is rotated
+
+
+@pytest.mark.parametrize(("candidates", "rotated"), [(1, False), (2, True)])
+def test_candidates_rank_references_by_target_distance(qgis_app, candidates, rotated):
+    # The horizontal reference is nearest to the centre of the long target, the diagonal one to its right end.
+    reference_layer = ReferenceLayer.from_features(
+        [_feature("LineString (19 -3, 21 -3)", fid=0), _feature("LineString (42 0, 52 10)", fid=1)]
+    )
+    processor = TargetProcessor(
+        reference_layer, "polygon", by_longest=False, no_multi=False, distance=0.0, angle=89.9, candidates=candidates
+    )
+    target = Target(_feature("Polygon ((0 1, 40 1, 40 2, 0 2, 0 1))"))
+
+    processor.process([target])
+
+    assert target.is_rotated is rotated
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+from qgis.core import QgsFeature, QgsGeometry, QgsPointXY, QgsRectangle, QgsVectorLayer, QgsWkbTypes
+
+from PolygonsParallelToLine.src import reference as reference_module
+from PolygonsParallelToLine.src.reference import (
+    NearestReferenceCursor,
+    ReferenceFeature,
+    ReferenceLayer,
+    SegmentIndex,
+    TileReferenceLayer,
+)
+
+
+def _zigzag_wkt(count: int) -> str:
+    coords = ", ".join(f"{i * 2.0} {math.sin(i) * 5.0}" for i in range(count))
+    return f"LineString ({coords})"
+
+
+REFERENCES = (
+    "LineString (0 0, 100 0)",
+    "LineString (0 0, 50 0, 100 5)",
+    "Polygon ((0 0, 100 5, 200 -3, 300 4, 0 0), (10 0.5, 20 0.5, 20 1, 10 0.5))",
+    "MultiLineString ((0 0, 10 10), (20 0, 30 10, 40 0))",
+    _zigzag_wkt(500),
+)
+POINTS = ((50.0, 50.0), (5.0, 5.0), (25.0, 5.0), (0.0, 0.0), (150.0, -20.0), (999.0, 3.0), (400.0, 1.0))
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+def test_closest_segment_matches_closest_segment_with_context(qgis_app, reference):
+    geom = QgsGeometry.fromWkt(reference)
+    feature = ReferenceFeature.from_geometry(geom)
+
+    for x, y in POINTS:
+        point = QgsPointXY(x, y)
+        _, _, next_vertex_idx, _ = geom.closestSegmentWithContext(point)
+        expected_start, expected_end = geom.vertexAt(next_vertex_idx - 1), geom.vertexAt(next_vertex_idx)
+
+        segment = feature.get_closest_segment(point)
+
+        assert (segment.start.x(), segment.start.y()) == (expected_start.x(), expected_start.y())
+        assert (segment.end.x(), segment.end.y()) == (expected_end.x(), expected_end.y())
+        assert feature.get_closest_azimuth(point) == pytest.approx(segment.azimuth)
+
+
+def test_long_reference_uses_rtree(qgis_app, monkeypatch):
+    monkeypatch.setattr(SegmentIndex, "RTREE_MIN_QUERIES", 1)
+    index = SegmentIndex.from_geometry(QgsGeometry.fromWkt(_zigzag_wkt(500)))
+
+    assert index is not None
+    assert index.count >= SegmentIndex.RTREE_MIN_SEGMENTS
+    for x, y in POINTS:
+        brute_force = int(index.sqr_distances(x, y, slice(None)).argmin())
+        assert index.closest(QgsPointXY(x, y)) == brute_force
+
+
+def test_rtree_is_only_built_for_a_reused_index(qgis_app):
+    index = SegmentIndex.from_geometry(QgsGeometry.fromWkt(_zigzag_wkt(500)))
+
+    for x, y in POINTS[: SegmentIndex.RTREE_MIN_QUERIES - 1]:
+        index.closest(QgsPointXY(x, y))
+    assert "rtree" not in index.__dict__
+
+    index.closest(QgsPointXY(0, 0))
+    assert "rtree" in index.__dict__
+
+
+def test_curved_reference_falls_back_to_qgis(qgis_app):
+    geom = QgsGeometry.fromWkt("CircularString (0 0, 50 50, 100 0)")
+    feature = ReferenceFeature.from_geometry(geom)
+
+    assert feature.segment_index is None
+    segment = feature.get_closest_segment(QgsPointXY(50, 60))
+    assert segment.length > 0
+
+
+@pytest.mark.parametrize(
+    "wkt",
+    [
+        *REFERENCES,
+        "MultiPolygon (((0 0, 10 0, 10 10, 0 0)), ((20 20, 30 20, 30 30, 20 20), (22 21, 28 21, 28 27, 22 21)))",
+        "CompoundCurve (CircularString (0 0, 50 50, 100 0), (100 0, 120 -10))",
+    ],
+)
+def test_segment_columns_match_qgis_points(qgis_app, wkt):
+    geom = QgsGeometry.fromWkt(wkt)
+    expected = []
+    for part in geom.asGeometryCollection() or [geom]:
+        if part.type() == QgsWkbTypes.LineGeometry:
+            rings = part.asMultiPolyline() if part.isMultipart() else [part.asPolyline()]
+        else:
+            polygons = part.asMultiPolygon() if part.isMultipart() else [part.asPolygon()]
+            rings = [ring for polygon in polygons for ring in polygon]
+        expected.extend((a.distance(b), a.azimuth(b)) for ring in rings for a, b in zip(ring, ring[1:]))
+
+    segments = SegmentIndex.from_any_geometry(geom)
+
+    assert segments.count == len(expected)
+    assert segments.lengths.tolist() == pytest.approx([length for length, _ in expected])
+    assert segments.azimuth.tolist() == pytest.approx([azimuth for _, azimuth in expected])
+
+
+def _feature_from_wkt(wkt: str) -> QgsFeature:
+    feature = QgsFeature()
+    feature.setGeometry(QgsGeometry.fromWkt(wkt))
+    return feature
+
+
+def _reference_layer(*wkts: str) -> ReferenceLayer:
+    features = []
+    for fid, wkt in enumerate(wkts):
+        feature = QgsFeature(fid)
+        feature.setGeometry(QgsGeometry.fromWkt(wkt))
+        features.append(feature)
+    return ReferenceLayer.from_features(features)
+
+
+def test_reference_layer_reuses_reference_feature(qgis_app):
+    layer = _reference_layer("LineString (0 0, 100 0)", "LineString (0 50, 100 50)")
+
+    first = layer.get_closest_feature(QgsPointXY(10, 1))
+    second = layer.get_closest_feature(QgsPointXY(90, 2))
+
+    assert first is second
+    assert layer.get_closest_feature(QgsPointXY(10, 49)) is not first
+
+
+def test_reference_layer_evicts_least_recently_used(qgis_app, monkeypatch):
+    # Each two-vertex reference weighs 3, so only one fits into the budget.
+    monkeypatch.setattr(reference_module, "REFERENCE_CACHE_VERTICES", 4)
+    layer = _reference_layer("LineString (0 0, 100 0)", "LineString (0 50, 100 50)")
+
+    first = layer.get_closest_feature(QgsPointXY(10, 1))
+    layer.get_closest_feature(QgsPointXY(10, 49))
+    again = layer.get_closest_feature(QgsPointXY(10, 1))
+
+    assert again is not first
+    assert again.geom.equals(first.geom)
+
+
+def test_cursor_matches_closest_feature_along_a_walk(qgis_app, monkeypatch):
+    layer = _reference_layer("LineString (0 0, 100 0)", "LineString (0 50, 100 50)", "LineString (50 0, 50 50)")
+    cursor = NearestReferenceCursor(layer)
+    queries = []
+    query = layer.get_closest_feature_and_gap
+
+    def counted_query(point: QgsPointXY) -> tuple[ReferenceFeature, float]:
+        queries.append(point)
+        return query(point)
+
+    monkeypatch.setattr(layer, "get_closest_feature_and_gap", counted_query)
+
+    for i in range(100):
+        point = QgsPointXY(i * 0.9, 10 + i * 0.3)
+        assert cursor.get_closest_feature(point) is layer.get_closest_feature(point)
+    assert len(queries) < 100
+
+
+def test_tile_reference_layer_looks_beyond_its_extent(qgis_app):
+    source = QgsVectorLayer("linestring", "references", "memory")
+    source.dataProvider().addFeatures(
+        [_feature_from_wkt("LineString (0 0, 10 0)"), _feature_from_wkt("LineString (0 100, 10 100)")]
+    )
+    tile = TileReferenceLayer(source, QgsRectangle(0, 80, 10, 120))
+    empty_tile = TileReferenceLayer(source, QgsRectangle(50, 50, 60, 60))
+
+    assert tile.get_closest_feature(QgsPointXY(5, 98)).geom.asWkt() == "LineString (0 100, 10 100)"
+    assert tile.get_closest_feature(QgsPointXY(5, 81)).geom.asWkt() == "LineString (0 100, 10 100)"
+    assert tile.get_closest_feature(QgsPointXY(5, 30)).geom.asWkt() == "LineString (0 0, 10 0)"
+    assert tile.intersects(QgsRectangle(0, -1, 10, 1))
+    assert not tile.intersects(QgsRectangle(0, 40, 10, 60))
+    assert empty_tile.get_closest_feature(QgsPointXY(55, 10)).geom.asWkt() == "LineString (0 0, 10 0)"
+
+
+def test_closest_feature_to_geometry_stops_at_bounding_box_bound(qgis_app, monkeypatch):
+    layer = _reference_layer(*(f"LineString (0 {y}, 100 {y})" for y in range(0, 100, 10)))
+    target = QgsGeometry.fromWkt("Polygon ((40 1, 60 1, 60 2, 40 2, 40 1))")
+    measured = []
+    distance = ReferenceFeature.distance
+
+    def counted_distance(reference: ReferenceFeature, geom: QgsGeometry) -> float:
+        measured.append(reference)
+        return distance(reference, geom)
+
+    monkeypatch.setattr(ReferenceFeature, "distance", counted_distance)
+
+    closest, closest_distance = layer.get_closest_feature_to_geometry(target, 5)
+
+    assert closest.geom.asWkt() == "LineString (0 0, 100 0)"
+    assert closest_distance == pytest.approx(1.0)
+    assert len(measured) == 1
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+def test_prepared_distance_matches_geometry_distance(qgis_app, reference):
+    feature = ReferenceFeature.from_geometry(QgsGeometry.fromWkt(reference))
+    target = QgsGeometry.fromWkt("Polygon ((40 20, 60 20, 60 30, 40 30, 40 20))")
+
+    assert feature.distance(target) == pytest.approx(feature.geom.distance(target))
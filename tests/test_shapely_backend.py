@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import pytest
+from qgis.core import QgsGeometry
+
+from PolygonsParallelToLine.src.parallelizer import compute_parallel_geometry
+from PolygonsParallelToLine.src.shapely_backend import ShapelyReferences
+from PolygonsParallelToLine.src.stats import ABOVE_ANGLE, ALREADY_PARALLEL, OUT_OF_RANGE, ROTATED, SKIPPED_MULTI
+
+shapely = pytest.importorskip("shapely", minversion="2.0")
+
+REFERENCES = (
+    "LineString (0 0, 100 0)",
+    "LineString (0 0, 50 0, 100 5)",
+    "Polygon ((0 0, 100 5, 200 -3, 300 4, 0 0))",
+    "MultiLineString ((0 0, 10 10), (20 0, 30 10, 40 0))",
+)
+POLYGONS = (
+    "Polygon ((10 50, 30 70, 50 55, 30 35, 10 50))",
+    "Polygon ((10 50, 10 50, 30 70, 50 55, 30 35, 10 50))",
+    "Polygon ((0 20, 40 25, 38 60, -2 55, 0 20), (10 30, 20 30, 20 40, 10 30))",
+    "MultiPolygon (((60 20, 80 24, 78 40, 60 20)), ((90 30, 95 31, 94 36, 90 30)))",
+    "Polygon ((10 40, 50 40, 50 60, 10 60, 10 40))",
+    "Polygon Z ((10 50 1, 30 70 2, 50 55 3, 30 35 4, 10 50 1))",
+)
+LINES = (
+    "LineString (40 50, 60 60)",
+    "LineString (40 50, 60 60, 80 55)",
+    "MultiLineString ((40 50, 60 70), (10 10, 20 20))",
+    "LineString (10 40, 50 40)",
+    "LineString (40 20, 40 80)",
+)
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+@pytest.mark.parametrize("by_longest", [False, True])
+@pytest.mark.parametrize("angle_threshold", [89.9, 20.0])
+@pytest.mark.parametrize("target_kind, targets", [("polygon", POLYGONS), ("line", LINES)], ids=["polygon", "line"])
+def test_shapely_backend_matches_compute_parallel_geometry(
+    qgis_app, reference, by_longest, angle_threshold, target_kind, targets
+):
+    references = ShapelyReferences(shapely.from_wkt([reference]))
+
+    rotated = references.compute_parallel_geometries(
+        shapely.from_wkt(list(targets)), target_kind, by_longest=by_longest, angle_threshold=angle_threshold
+    )
+
+    for wkt, shapely_geom in zip(targets, rotated):
+        expected = compute_parallel_geometry(
+            QgsGeometry.fromWkt(reference),
+            QgsGeometry.fromWkt(wkt),
+            target_kind,
+            by_longest=by_longest,
+            angle_threshold=angle_threshold,
+        )
+        if expected is None:
+            assert shapely_geom is None
+            continue
+        assert shapely_geom is not None
+        geom = QgsGeometry()
+        geom.fromWkb(shapely.to_wkb(shapely_geom))
+        assert geom.hausdorffDistance(expected) < 1e-9
+
+
+def test_nearest_prefers_lowest_reference_on_ties():
+    references = ShapelyReferences(shapely.from_wkt(["LineString (0 10, 10 10)", "LineString (0 -10, 10 -10)"]))
+
+    nearest = references.nearest(shapely.points([(5, 0), (5, -1), (5, 20)]))
+
+    assert nearest.tolist() == [0, 1, 0]
+
+
+def test_rotation_angles_report_outcomes():
+    references = ShapelyReferences(shapely.from_wkt(["LineString (0 0, 100 0)"]))
+    targets = shapely.from_wkt(
+        [
+            "LineString (40 5, 60 10)",
+            "LineString (40 5, 60 5)",
+            "LineString (40 500, 60 510)",
+            "MultiLineString ((40 5, 60 10))",
+            "LineString (40 5, 40 50)",
+        ]
+    )
+    outcomes: list[str] = []
+
+    angles, _ = references.rotation_angles(
+        targets, "line", by_longest=True, no_multi=True, distance=100.0, angle_threshold=45.0, outcomes=outcomes
+    )
+
+    assert outcomes == [ROTATED, ALREADY_PARALLEL, OUT_OF_RANGE, SKIPPED_MULTI, ABOVE_ANGLE]
+    assert angles[0] == pytest.approx(14.036243467926479)
+
+
+def test_rotation_angles_without_references():
+    references = ShapelyReferences(shapely.from_wkt([]))
+    targets = shapely.from_wkt(["LineString (0 0, 10 0)"])
+    outcomes: list[str] = []
+
+    references.rotation_angles(targets, "line", by_longest=True, distance=1.0, outcomes=outcomes)
+
+    assert outcomes == [OUT_OF_RANGE]
+    with pytest.raises(ValueError, match="No reference features"):
+        references.rotation_angles(targets, "line", by_longest=True)
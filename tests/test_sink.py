@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+from qgis.core import QgsFeature, QgsProcessingException
+
+from PolygonsParallelToLine.src.sink import buffered_sink
+
+
+class RecordingSink:
+    def __init__(self, *, fail: bool = False):
+        self.batches: list[list[int]] = []
+        self.fail = fail
+
+    def addFeatures(self, features, _flags) -> bool:  # noqa: N802
+        self.batches.append([feature.id() for feature in features])
+        return not self.fail
+
+    def lastError(self) -> str:  # noqa: N802
+        return "disk full"
+
+
+def _features(*fids: int) -> list[QgsFeature]:
+    return [QgsFeature(fid) for fid in fids]
+
+
+def test_buffered_sink_writes_in_batches(qgis_app):
+    recorder = RecordingSink()
+
+    with buffered_sink(recorder, batch_size=3) as sink:
+        sink.add(_features(0, 1))
+        assert recorder.batches == []
+        sink.add(_features(2, 3))
+        sink.add(_features(4))
+
+    assert recorder.batches == [[0, 1, 2, 3], [4]]
+
+
+def test_buffered_sink_flushes_partial_batch_on_break(qgis_app):
+    recorder = RecordingSink()
+
+    with buffered_sink(recorder, batch_size=100) as sink:
+        for fid in range(10):
+            if fid == 5:
+                break
+            sink.add(_features(fid))
+
+    assert recorder.batches == [[0, 1, 2, 3, 4]]
+
+
+def test_buffered_sink_raises_on_write_error(qgis_app):
+    with pytest.raises(QgsProcessingException, match="disk full"), buffered_sink(RecordingSink(fail=True)) as sink:
+        sink.add(_features(0))
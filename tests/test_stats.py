@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+
+from PolygonsParallelToLine.src.stats import PATHS, ROTATED, SKIPPED_MULTI, STAGES, RunStats
+
+
+class RecordingFeedback:
+    def __init__(self):
+        self.messages: list[str] = []
+
+    def pushInfo(self, message: str) -> None:  # noqa: N802
+        self.messages.append(message)
+
+
+def test_disabled_stats_record_nothing():
+    stats = RunStats(enabled=False)
+
+    with stats.stage("rotation"):
+        stats.count(ROTATED)
+
+    assert stats.as_dict() == {"seconds": {}, "counts": {}}
+
+
+def test_stats_time_stages_and_count_paths():
+    stats = RunStats()
+
+    with stats.stage("rotation"):
+        stats.count(ROTATED, 3)
+    stats.count(SKIPPED_MULTI)
+
+    assert stats.seconds["rotation"] > 0
+    assert stats.counts == {ROTATED: 3, SKIPPED_MULTI: 1}
+
+
+def test_take_resets_and_merge_adds_up():
+    worker = RunStats()
+    worker.count(ROTATED, 2)
+    main = RunStats()
+    main.count(ROTATED)
+
+    main.merge(worker.take())
+
+    assert main.counts[ROTATED] == 3
+    assert not worker.counts
+
+
+def test_report_writes_json(tmp_path):
+    stats = RunStats()
+    stats.count(ROTATED, 4)
+    feedback = RecordingFeedback()
+    report_path = tmp_path / "report.json"
+
+    stats.report(feedback, str(report_path))
+
+    report = json.loads(report_path.read_text())
+    assert report["features"] == 4
+    assert list(report["stage_seconds"]) == list(STAGES)
+    assert list(report["path_counts"]) == list(PATHS)
+    assert report["path_counts"][ROTATED] == 4
+    assert feedback.messages[0].startswith("Processed 4 features")
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import pytest
+from qgis.core import QgsFeature, QgsGeometry, QgsProcessingException
+
+from PolygonsParallelToLine.src.kernel import ExteriorRings
+from PolygonsParallelToLine.src.target import Target
+
+TARGETS = (
+    "Polygon ((0 0, 10 0, 10 10, 0 10, 0 0))",
+    "Polygon ((0 0, 10 0, 10 0, 10 10, 0 10, 0 0), (2 2, 4 2, 4 4, 2 2))",
+    "Polygon ((0 0, 10 0, 10 10, 5 10, 5 10, 0 10, 0 0), (0 0, 4 2, 4 4, 0 0))",
+    "MultiPolygon (((0 0, 10 0, 10 10, 0 0)), ((20 0, 30 0, 30 10, 20 10, 20 0)))",
+    "CurvePolygon (CompoundCurve (CircularString (0 0, 5 5, 10 0), (10 0, 0 0)))",
+)
+
+
+def _scan_adjacent(geom: QgsGeometry, vertex_id: int) -> tuple[tuple[float, float], tuple[float, float]] | None:
+    # The linear scan Target.get_adjacent_segments() used to run for every lookup.
+    target_vertex = geom.vertexAt(vertex_id)
+    temp_geom = QgsGeometry(geom)
+    temp_geom.removeInteriorRings()
+    temp_geom.removeDuplicateNodes()
+    for part_geom in temp_geom.asGeometryCollection():
+        for i, current_vertex in enumerate(part_geom.vertices()):
+            if current_vertex == target_vertex:
+                prev_idx, next_idx = part_geom.adjacentVertices(i)
+                prev_vertex, next_vertex = part_geom.vertexAt(prev_idx), part_geom.vertexAt(next_idx)
+                return (prev_vertex.x(), prev_vertex.y()), (next_vertex.x(), next_vertex.y())
+    return None
+
+
+@pytest.mark.parametrize("wkt", TARGETS)
+def test_adjacent_segments_match_vertex_scan(qgis_app, wkt):
+    feature = QgsFeature()
+    feature.setGeometry(QgsGeometry.fromWkt(wkt))
+    target = Target(feature)
+
+    for vertex_id in range(target.geom.constGet().nCoordinates()):
+        _, vertex = target.geom.vertexIdFromVertexNr(vertex_id)
+        # The scan also matched interior ring vertices lying on the exterior ring; the pivot's ID does not.
+        expected = _scan_adjacent(target.geom, vertex_id) if vertex.ring == 0 else None
+        if expected is None:
+            with pytest.raises(QgsProcessingException, match="not found in target"):
+                target.get_adjacent_segments(vertex_id)
+            continue
+
+        prev_segment, next_segment = target.get_adjacent_segments(vertex_id)
+        expected_prev, expected_next = expected
+        assert (prev_segment.end.x(), prev_segment.end.y()) == expected_prev
+        assert (next_segment.end.x(), next_segment.end.y()) == expected_next
+
+
+def test_exterior_rings_are_built_once_per_geometry(qgis_app, monkeypatch):
+    built = []
+    from_chunk = ExteriorRings.from_chunk
+
+    def counted_from_chunk(chunk: object) -> ExteriorRings:
+        built.append(chunk)
+        return from_chunk(chunk)
+
+    monkeypatch.setattr(ExteriorRings, "from_chunk", counted_from_chunk)
+    feature = QgsFeature()
+    feature.setGeometry(QgsGeometry.fromWkt(TARGETS[2]))
+    target = Target(feature)
+
+    for vertex_id in range(5):
+        target.get_adjacent_segments(vertex_id)
+    assert len(built) == 1
+
+    target.rotate(10.0)
+    target.get_adjacent_segments(0)
+    assert len(built) == 2
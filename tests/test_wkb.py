@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import struct
+
+import numpy as np
+import pytest
+
+from PolygonsParallelToLine.src.wkb import parse_rings, read_xy, write_xy
+
+
+def _sequence(points: list[tuple[float, ...]], byte_order: str = "<") -> bytes:
+    return struct.pack(f"{byte_order}I", len(points)) + b"".join(
+        struct.pack(f"{byte_order}{len(p)}d", *p) for p in points
+    )
+
+
+def _linestring(points: list[tuple[float, ...]], wkb_type: int = 2, byte_order: str = "<") -> bytes:
+    flag = 1 if byte_order == "<" else 0
+    return struct.pack(f"{byte_order}BI", flag, wkb_type) + _sequence(points, byte_order)
+
+
+def _polygon(rings: list[list[tuple[float, float]]]) -> bytes:
+    return struct.pack("<BII", 1, 3, len(rings)) + b"".join(_sequence(ring) for ring in rings)
+
+
+def _multipolygon(polygons: list[bytes]) -> bytes:
+    return struct.pack("<BII", 1, 6, len(polygons)) + b"".join(polygons)
+
+
+SQUARE = [(0.0, 0.0), (4.0, 0.0), (4.0, 4.0), (0.0, 4.0), (0.0, 0.0)]
+HOLE = [(1.0, 1.0), (2.0, 1.0), (2.0, 2.0), (1.0, 1.0)]
+
+
+def test_parse_rings_polygon_with_hole():
+    rings = parse_rings(_polygon([SQUARE, HOLE]))
+
+    assert [(r.size, r.part, r.index) for r in rings] == [(5, 0, 0), (4, 0, 1)]
+
+
+def test_parse_rings_multipolygon_numbers_parts():
+    wkb = _multipolygon([_polygon([SQUARE]), _polygon([SQUARE, HOLE])])
+
+    rings = parse_rings(wkb)
+
+    assert [(r.part, r.index) for r in rings] == [(0, 0), (1, 0), (1, 1)]
+
+
+@pytest.mark.parametrize(
+    "wkb_type, dims",
+    [(2, 2), (1002, 3), (2002, 3), (3002, 4), (0x80000002, 3)],
+    ids=["xy", "iso_z", "iso_m", "iso_zm", "qgis_25d"],
+)
+def test_parse_rings_dimensions(wkb_type, dims):
+    points = [tuple(float(i + d) for d in range(dims)) for i in range(3)]
+
+    (ring,) = parse_rings(_linestring(points, wkb_type))
+
+    assert ring.dims == dims
+
+
+def test_read_xy_big_endian():
+    wkb = _linestring([(1.0, 2.0), (3.0, 4.0)], byte_order=">")
+
+    xy = read_xy(wkb, parse_rings(wkb))
+
+    assert xy.tolist() == [[1.0, 2.0], [3.0, 4.0]]
+
+
+def test_write_xy_keeps_z_and_structure():
+    wkb = _linestring([(1.0, 2.0, 7.0), (3.0, 4.0, 8.0)], wkb_type=1002)
+    rings = parse_rings(wkb)
+
+    updated = write_xy(wkb, rings, np.array([[10.0, 20.0], [30.0, 40.0]]))
+
+    assert len(updated) == len(wkb)
+    assert struct.unpack_from("<6d", updated, 9) == (10.0, 20.0, 7.0, 30.0, 40.0, 8.0)
+
+
+@pytest.mark.parametrize(
+    "wkb",
+    [
+        struct.pack("<BIdd", 1, 1, 0.0, 0.0),  # point
+        struct.pack("<BII", 1, 8, 0),  # circular string
+        _linestring(SQUARE)[:-8],  # truncated
+        b"\x02" + _linestring(SQUARE)[1:],  # bad byte order flag
+    ],
+    ids=["point", "curve", "truncated", "byte_order"],
+)
+def test_parse_rings_rejects_unsupported(wkb):
+    with pytest.raises(ValueError):  # noqa: PT011
+        parse_rings(wkb)